@@ -0,0 +1,153 @@
+import argparse
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import matplotlib
+matplotlib.use('Agg')
+from data_load import load_pitch_data, load_statcast_grouped, fangraphs_pitching_leaderboards
+from dashboard import pitching_dashboard, DashboardTemplate
+from mlb_api import prefetch_team_logos, reset_session
+from store import has_league_store, read_league
+from league import load_league_velocity_curves, load_league_percentiles
+from output import dashboard_path, output_formats
+from constants import stats
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# League data shared by every dashboard in a batch; set once per worker process
+shared = {}
+
+
+def init_worker(statcast_grouped_df, fangraphs_df, league_curves, league_percentiles):
+    matplotlib.use('Agg')
+    reset_session()
+    shared['statcast_grouped_df'] = statcast_grouped_df
+    shared['fangraphs_df'] = fangraphs_df
+    shared['league_curves'] = league_curves
+    shared['league_percentiles'] = league_percentiles
+    # One figure per worker, refilled for every pitcher it renders
+    shared['template'] = DashboardTemplate()
+
+
+def render_pitcher(pitcher_id: int, season: int, output_dir: str, save_options: dict = None):
+    """
+    Loads, processes and renders one pitcher's dashboard without showing it.
+
+    `save_options` go to output.save_dashboard. Returns a result dict, including the file
+    size and save time, instead of raising so one bad pitcher does not stop the batch.
+    """
+    start = time.perf_counter()
+    save_options = save_options or {}
+    output_path = dashboard_path(pitcher_id, season, output_dir, save_options.get('fmt') or 'pdf')
+    save_report = {}
+    try:
+        df_pyb = load_pitch_data(pitcher_id, season)
+        if df_pyb.empty:
+            raise ValueError("no pitch data")
+        save_report = pitching_dashboard(pitcher_id, df_pyb, stats, shared['statcast_grouped_df'], season,
+                                         fangraphs_df=shared['fangraphs_df'], output_path=output_path, show=False,
+                                         league_curves=shared['league_curves'],
+                                         league_percentiles=shared['league_percentiles'], template=shared['template'],
+                                         **save_options)
+        error = None
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+    return {'pitcher_id': pitcher_id, 'ok': error is None, 'error': error,
+            'output_path': output_path if error is None else None,
+            'bytes': save_report.get('bytes'), 'save_seconds': save_report.get('seconds'),
+            'within_budget': save_report.get('within_budget'),
+            'seconds': time.perf_counter() - start}
+
+
+def select_pitchers(season: int, pitcher_ids: list = None, team: str = None, min_pitches: int = None):
+    """
+    Resolves the batch selection to a list of pitcher IDs.
+
+    Team and pitch-count selections are read from the local league store.
+    """
+    if pitcher_ids:
+        return list(pitcher_ids)
+    if not has_league_store(season):
+        raise RuntimeError(f"Team and pitch-count selection need the league store for {season}; build it first.")
+
+    df = read_league(season, columns=['pitcher', 'inning_topbot', 'home_team', 'away_team'])
+    if team:
+        # The pitching team fields in the top of the inning and bats in the bottom
+        df = df.assign(pitcher_team=df['home_team'].where(df['inning_topbot'] == 'Top', df['away_team']))
+        df = df[df['pitcher_team'] == team]
+    counts = df['pitcher'].value_counts()
+    if min_pitches:
+        counts = counts[counts >= min_pitches]
+    return [int(p) for p in counts.index]
+
+
+def run_batch(pitcher_ids: list, season: int, output_dir: str = 'dashboards', workers: int = None,
+              save_options: dict = None):
+    """
+    Renders dashboards for many pitchers in a process pool, loading league data only once.
+    `save_options` go to output.save_dashboard for every render.
+
+    Returns the per-pitcher results and logs a throughput summary.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    start = time.perf_counter()
+
+    logging.info(f"Loading shared league data for {season}...")
+    statcast_grouped_df = load_statcast_grouped(season)
+    fangraphs_df = fangraphs_pitching_leaderboards(season)
+    league_curves = load_league_velocity_curves(season)
+    league_percentiles = load_league_percentiles(season)
+    prefetch_team_logos()
+
+    results = []
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker,
+                             initargs=(statcast_grouped_df, fangraphs_df, league_curves, league_percentiles)) as pool:
+        futures = [pool.submit(render_pitcher, pitcher_id, season, output_dir, save_options) for pitcher_id in pitcher_ids]
+        for future in as_completed(futures):
+            result = future.result()
+            results.append(result)
+            if result['ok']:
+                logging.info(f"Rendered {result['pitcher_id']} in {result['seconds']:.1f}s "
+                             f"({result['bytes'] / 2 ** 20:.2f} MB, saved in {result['save_seconds']:.2f}s)")
+            else:
+                logging.warning(f"Failed {result['pitcher_id']}: {result['error']}")
+
+    elapsed = time.perf_counter() - start
+    rendered = sum(r['ok'] for r in results)
+    per_minute = rendered / elapsed * 60 if elapsed > 0 else 0.0
+    logging.info(f"Batch done: {rendered}/{len(results)} dashboards in {elapsed:.1f}s ({per_minute:.1f} dashboards/min)")
+    over_budget = [r['pitcher_id'] for r in results if r['ok'] and not r['within_budget']]
+    if over_budget:
+        logging.warning(f"{len(over_budget)} dashboards were over the output budget: {over_budget}")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Render pitching dashboards for many pitchers.")
+    parser.add_argument('--season', type=int, required=True)
+    selection = parser.add_mutually_exclusive_group(required=True)
+    selection.add_argument('--pitchers', type=int, nargs='+', help="MLBAM pitcher IDs")
+    selection.add_argument('--team', help="Team abbreviation, e.g. NYY")
+    selection.add_argument('--min-pitches', type=int, help="Every pitcher with at least this many pitches")
+    parser.add_argument('--output-dir', default='dashboards')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--format', choices=output_formats, default='pdf')
+    parser.add_argument('--dpi', type=int, default=300)
+    parser.add_argument('--rasterize', action='store_true', help="Draw scatter and fill layers as images inside vector files")
+    parser.add_argument('--max-mb', type=float, default=None, help="File size budget per dashboard")
+    parser.add_argument('--warn-seconds', type=float, default=None,
+                        help="Log dashboards whose save takes longer than this (they are not saved differently)")
+    args = parser.parse_args()
+    save_options = {'fmt': args.format, 'dpi': args.dpi, 'rasterize': args.rasterize,
+                    'max_bytes': int(args.max_mb * 2 ** 20) if args.max_mb else None,
+                    'warn_seconds': args.warn_seconds}
+
+    pitcher_ids = select_pitchers(args.season, args.pitchers, args.team, args.min_pitches)
+    if not pitcher_ids:
+        logging.error("No pitchers matched the selection.")
+        sys.exit(1)
+
+    results = run_batch(pitcher_ids, args.season, args.output_dir, args.workers, save_options)
+    sys.exit(0 if all(r['ok'] for r in results) else 1)
@@ -0,0 +1,179 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import tempfile
+import time
+import tracemalloc
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+from preprocessing import df_processing, df_grouping, tto_grouping, get_cell_colors, cmap_sum, cmap_sum_r
+from fatigue import create_fatigue_features
+from league import (daily_sums, reference_from_sums, daily_velocity_bins, velocity_curves_from_bins,
+                    pitcher_values_from_sums, percentile_table)
+from visuals import rolling_pitch_usage, velocity_kdes
+from usage import rolling_usage_table
+from fatigue_scan import league_fatigue_features
+from dashboard import pitching_dashboard, DashboardTemplate
+import pipeline
+from synthetic import synthetic_scale, synthetic_leaderboard, seed_offline_mlb_api
+from constants import color_stats, stats
+
+default_results_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'benchmarks', 'results.jsonl')
+
+# A stage is slower than the last recorded commit by more than this factor -> reported as a regression
+regression_threshold = 1.2
+
+
+def rolling_usage_stage(df):
+    fig, ax = plt.subplots()
+    rolling_pitch_usage(df, ax=ax, window=5)
+    plt.close(fig)
+
+
+def velocity_kdes_stage(df, df_statcast_group, league_curves):
+    fig = plt.figure()
+    gs = plt.GridSpec(1, 1)
+    velocity_kdes(df, fig.add_subplot(gs[0, 0]), gs, [0, 1], [0, 1], fig, df_statcast_group, league_curves)
+    plt.close(fig)
+
+
+def dashboard_stage(df_raw, df_statcast_group, fangraphs_df, league_curves, output_path, template=None):
+    pitcher_id = int(df_raw['pitcher'].iloc[0])
+    seed_offline_mlb_api(pitcher_id)
+    # Clear memoized artifacts so every timed render does the full work
+    pipeline.artifact_memo.clear()
+    pitching_dashboard(pitcher_id, df_raw, stats, df_statcast_group, 2024, None,
+                       fangraphs_df=fangraphs_df, output_path=output_path, show=False,
+                       league_curves=league_curves, template=template)
+    if template is None:
+        plt.close('all')
+
+
+def build_stages(scale: str, output_dir: str):
+    """
+    Returns (stage name, callable) pairs for one data scale. Inputs for each stage are
+    prepared up front so only the stage itself is timed.
+    """
+    df_raw = synthetic_scale(scale)
+    df = df_processing(df_raw)
+    df_group, _ = df_grouping(df)
+    df_statcast_group = reference_from_sums(daily_sums(df_raw))
+    fangraphs_df = synthetic_leaderboard(sorted(df_raw['pitcher'].unique()))
+    league_curves = velocity_curves_from_bins(daily_velocity_bins(df_raw))
+    league_percentiles = percentile_table(pitcher_values_from_sums(daily_sums(df_raw, by='pitcher')))
+
+    stages = [
+        ('df_processing', lambda: df_processing(df_raw)),
+        ('df_grouping', lambda: df_grouping(df)),
+        ('get_cell_colors', lambda: get_cell_colors(df_group, df_statcast_group, color_stats, cmap_sum, cmap_sum_r)),
+        ('get_cell_colors_percentiles', lambda: get_cell_colors(df_group, df_statcast_group, color_stats, cmap_sum,
+                                                                cmap_sum_r, league_percentiles)),
+        ('percentile_table', lambda: percentile_table(pitcher_values_from_sums(daily_sums(df_raw, by='pitcher')))),
+        ('create_fatigue_features', lambda: create_fatigue_features(df)),
+        ('league_fatigue_features', lambda: league_fatigue_features(df_raw)),
+        ('rolling_usage_table', lambda: rolling_usage_table(df, window=5)),
+        ('tto_grouping', lambda: tto_grouping(df, by='pitcher')),
+    ]
+    # Plotting stages only make sense for a single pitcher with enough games for a rolling window
+    if scale == 'season':
+        output_path = os.path.join(output_dir, 'benchmark_dashboard.pdf')
+        template = DashboardTemplate()
+        stages += [
+            ('rolling_pitch_usage', lambda: rolling_usage_stage(df)),
+            ('velocity_kdes', lambda: velocity_kdes_stage(df, df_statcast_group, league_curves)),
+            ('pitching_dashboard', lambda: dashboard_stage(df_raw, df_statcast_group, fangraphs_df, league_curves,
+                                                           output_path)),
+            ('pitching_dashboard_template', lambda: dashboard_stage(df_raw, df_statcast_group, fangraphs_df,
+                                                                    league_curves, output_path, template)),
+        ]
+    return stages, len(df_raw)
+
+
+def time_stage(fn, repeat: int):
+    """
+    Runs `fn` `repeat` times for timing, then once more under tracemalloc for peak memory.
+    """
+    seconds = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        seconds.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return min(seconds), statistics.median(seconds), peak / 2 ** 20
+
+
+def current_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def load_results(path: str):
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def previous_result(results: list, commit: str, scale: str, stage: str):
+    """
+    The most recent recorded result for the same scale and stage from a different commit.
+    """
+    for result in reversed(results):
+        if result['scale'] == scale and result['stage'] == stage and result['commit'] != commit:
+            return result
+    return None
+
+
+def run_benchmarks(scales: list, repeat: int = 3, results_path: str = default_results_path):
+    """
+    Times and memory-profiles every pipeline stage on synthetic data, appends the results
+    to `results_path` as JSON lines and prints a comparison with the last recorded commit.
+    """
+    # Time the real work, not reuse of artifacts persisted by earlier runs
+    pipeline.persist_artifacts = False
+    commit = current_commit()
+    history = load_results(results_path)
+    run_at = time.strftime('%Y-%m-%dT%H:%M:%S')
+    new_results = []
+
+    with tempfile.TemporaryDirectory() as output_dir:
+        for scale in scales:
+            stages, rows = build_stages(scale, output_dir)
+            for stage, fn in stages:
+                seconds_min, seconds_median, peak_mb = time_stage(fn, repeat)
+                result = {'run_at': run_at, 'commit': commit, 'scale': scale, 'rows': rows, 'stage': stage,
+                          'seconds_min': seconds_min, 'seconds_median': seconds_median, 'peak_mb': peak_mb}
+                new_results.append(result)
+
+                line = f"{scale:>7} {stage:<24} {seconds_min * 1000:10.1f} ms {peak_mb:9.1f} MB"
+                previous = previous_result(history, commit, scale, stage)
+                if previous:
+                    ratio = seconds_min / previous['seconds_min']
+                    flag = '  REGRESSION' if ratio > regression_threshold else ''
+                    line += f"   {ratio:5.2f}x vs {previous['commit']}{flag}"
+                print(line)
+
+    os.makedirs(os.path.dirname(results_path), exist_ok=True)
+    with open(results_path, 'a') as f:
+        for result in new_results:
+            f.write(json.dumps(result) + '\n')
+    return new_results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the pitching pipeline on synthetic Statcast data.")
+    parser.add_argument('--scales', nargs='+', default=['start', 'season'], choices=['start', 'season', 'league'])
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--results', default=default_results_path)
+    args = parser.parse_args()
+    run_benchmarks(args.scales, args.repeat, os.path.abspath(args.results))
@@ -0,0 +1,97 @@
+import argparse
+import logging
+import pandas as pd
+from preprocessing import df_processing, df_grouping
+from fatigue import create_fatigue_features, season_totals, fatigue_columns
+from data_load import load_pitch_data
+from pipeline import build_artifacts
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# Share of the previous seasons' baseline carried into the next one. Each season's carry is
+# weight * (its own totals + the carry it received), so older seasons fade geometrically.
+default_prior_weight = 0.5
+
+
+def fatigue_with_prior(processed, prior_totals):
+    return create_fatigue_features(processed, prior_totals=prior_totals)
+
+
+# Per-season artifacts. Each season is keyed by its own data (and, for fatigue, the prior it
+# was scored against), so adding a season reuses every earlier season's artifacts.
+season_graph = {
+    'processed': (df_processing, ['raw']),
+    'grouped': (df_grouping, ['processed']),
+    'totals': (season_totals, ['processed']),
+    'fatigue': (fatigue_with_prior, ['processed', 'prior_totals']),
+}
+
+
+def load_career_data(pitcher_id: int, seasons: list, postseason: bool = False):
+    """
+    Loads a pitcher's Statcast data for each season (see load_pitch_data).
+
+    Returns a dict of season -> DataFrame, in season order, skipping seasons without pitches.
+    """
+    season_frames = {}
+    for season in sorted(seasons):
+        df = load_pitch_data(pitcher_id, season, postseason=postseason)
+        if df.empty:
+            logging.info(f"No pitches for pitcher {pitcher_id} in {season}")
+            continue
+        season_frames[season] = df
+    return season_frames
+
+
+def career_fatigue_features(season_frames: dict, prior_weight: float = default_prior_weight):
+    """
+    Fatigue features across seasons, each season's baseline starting from the weighted
+    totals of the seasons before it instead of from zero. `prior_weight=0` scores every
+    season on its own, as create_fatigue_features does.
+
+    Returns create_fatigue_features' columns plus 'season'.
+    """
+    carry = pd.DataFrame()
+    frames = []
+    for season, df in sorted(season_frames.items()):
+        artifacts = build_artifacts(['fatigue', 'totals'], graph=season_graph, raw=df, prior_totals=carry)
+        frames.append(artifacts['fatigue'].assign(season=season))
+        totals = artifacts['totals'].add(carry, fill_value=0) if len(carry) else artifacts['totals']
+        carry = totals * prior_weight if prior_weight else pd.DataFrame()
+    if not frames:
+        return pd.DataFrame(columns=['season'] + fatigue_columns)
+    return pd.concat(frames, ignore_index=True)[['season'] + fatigue_columns]
+
+
+def career_pitch_summary(season_frames: dict):
+    """
+    The dashboard's pitch table per season, stacked with a 'season' column.
+    """
+    tables = [build_artifacts(['grouped'], graph=season_graph, raw=df)['grouped'][0].assign(season=season)
+              for season, df in sorted(season_frames.items())]
+    if not tables:
+        return pd.DataFrame(columns=['season'])
+    df_summary = pd.concat(tables, ignore_index=True)
+    return df_summary[['season'] + [c for c in df_summary.columns if c != 'season']]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pitch summary and fatigue features across a pitcher's seasons.")
+    parser.add_argument('pitcher_id', type=int)
+    parser.add_argument('--first-season', type=int, required=True)
+    parser.add_argument('--last-season', type=int, required=True)
+    parser.add_argument('--postseason', action='store_true', help="Include postseason games")
+    parser.add_argument('--prior-weight', type=float, default=default_prior_weight,
+                        help="Weight of earlier seasons in each season's fatigue baseline (0 to reset every season)")
+    args = parser.parse_args()
+
+    season_frames = load_career_data(args.pitcher_id, range(args.first_season, args.last_season + 1),
+                                     args.postseason)
+    summary = career_pitch_summary(season_frames)
+    print(summary[['season', 'pitch_type', 'pitch', 'pitch_usage', 'release_speed', 'whiff_rate', 'xwoba']]
+          .to_string(index=False))
+    fatigue_df = career_fatigue_features(season_frames, args.prior_weight)
+    flagged = fatigue_df[fatigue_df['fatigue_flag'] == 1]
+    print(f"\n{len(flagged)} flagged game/pitch types out of {len(fatigue_df)}")
+    if len(flagged):
+        print(flagged.to_string(index=False))
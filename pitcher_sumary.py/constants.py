@@ -1,3 +1,4 @@
+import os
 from matplotlib import colors as mcolors
 import pandas as pd
 
@@ -88,6 +89,15 @@ table_columns = [
     'xwoba',
 ]
 
+# Times-through-the-order table: columns in order, and headers/formats for those not in pitch_stats_dict
+tto_table_columns = ['pass', 'pa', 'pitch', 'primary_speed', 'whiff_rate', 'chase_rate', 'xwoba',
+                     'delta_run_exp_per_100']
+tto_stats_dict = {
+    'pass': {'table_header': '$\\bf{Time\\ Through}$'},
+    'pa': {'table_header': '$\\bf{PA}$', 'format': '.0f'},
+    'primary_speed': {'table_header': '$\\bf{Primary\\ Velo}$', 'format': '.1f'},
+}
+
 color_stats = ['release_speed', 'release_extension', 'delta_run_exp_per_100',
                 'whiff_rate', 'in_zone_rate', 'chase_rate', 'xwoba']
 
@@ -127,4 +137,68 @@ mlb_teams = [
     {"team": "TOR", "logo_url": "https://a.espncdn.com/combiner/i?img=/i/teamlogos/mlb/500/scoreboard/tor.png&h=500&w=500"},
     {"team": "WSH", "logo_url": "https://a.espncdn.com/combiner/i?img=/i/teamlogos/mlb/500/scoreboard/wsh.png&h=500&w=500"}
     ]
-image_dict = pd.DataFrame(mlb_teams).set_index('team')['logo_url'].to_dict()
\ No newline at end of file
+image_dict = pd.DataFrame(mlb_teams).set_index('team')['logo_url'].to_dict()
+# Local on-disk cache for downloaded data (override with PITCHER_CACHE_DIR)
+cache_dir = os.path.expanduser(os.environ.get('PITCHER_CACHE_DIR', '~/.cache/pitcher_analysis'))
+
+# Cached Statcast pulls younger than this are served without checking for new games
+statcast_max_age_hours = 12
+
+# FanGraphs leaderboards are re-downloaded once they are older than this
+leaderboard_max_age_hours = 24
+
+# Decoded headshots and logos are re-downloaded once they are older than this
+image_max_age_hours = 24 * 30
+
+# MLB API responses (players' current teams, bios) are fetched again once they are older than this
+mlb_api_max_age_hours = 6
+
+# Statcast columns the pipeline reads, with the compact dtype each is stored as after ingest.
+# Integer columns that contain missing values fall back to float32.
+statcast_schema = {
+    'pitch_type': 'category',
+    'game_date': 'datetime64[ns]',
+    'release_speed': 'float32',
+    'release_pos_x': 'float32',
+    'release_pos_z': 'float32',
+    'pitcher': 'int32',
+    'batter': 'int32',
+    'description': 'category',
+    'zone': 'float32',
+    'stand': 'category',
+    'p_throws': 'category',
+    'home_team': 'category',
+    'away_team': 'category',
+    'balls': 'int8',
+    'strikes': 'int8',
+    'pfx_x': 'float32',
+    'pfx_z': 'float32',
+    'inning': 'int8',
+    'inning_topbot': 'category',
+    'estimated_woba_using_speedangle': 'float32',
+    'release_spin_rate': 'float32',
+    'release_extension': 'float32',
+    'game_pk': 'int32',
+    'at_bat_number': 'int16',
+    'pitch_number': 'int8',
+    'n_thruorder_pitcher': 'int8',
+    'delta_run_exp': 'float32',
+}
+
+# Regular season and postseason date ranges (first, last day) per season. Seasons not listed
+# use default_season_calendar.
+season_calendar = {
+    2015: {'regular_season': ('2015-04-05', '2015-10-04'), 'postseason': ('2015-10-06', '2015-11-01')},
+    2016: {'regular_season': ('2016-04-03', '2016-10-02'), 'postseason': ('2016-10-04', '2016-11-02')},
+    2017: {'regular_season': ('2017-04-02', '2017-10-01'), 'postseason': ('2017-10-03', '2017-11-01')},
+    2018: {'regular_season': ('2018-03-29', '2018-10-01'), 'postseason': ('2018-10-02', '2018-10-28')},
+    2019: {'regular_season': ('2019-03-20', '2019-09-29'), 'postseason': ('2019-10-01', '2019-10-30')},
+    2020: {'regular_season': ('2020-07-23', '2020-09-27'), 'postseason': ('2020-09-29', '2020-10-27')},
+    2021: {'regular_season': ('2021-04-01', '2021-10-03'), 'postseason': ('2021-10-05', '2021-11-02')},
+    2022: {'regular_season': ('2022-04-07', '2022-10-05'), 'postseason': ('2022-10-07', '2022-11-05')},
+    2023: {'regular_season': ('2023-03-30', '2023-10-01'), 'postseason': ('2023-10-03', '2023-11-01')},
+    2024: {'regular_season': ('2024-03-20', '2024-09-30'), 'postseason': ('2024-10-01', '2024-10-30')},
+    2025: {'regular_season': ('2025-03-18', '2025-09-28'), 'postseason': ('2025-09-30', '2025-11-01')},
+}
+default_season_calendar = {'regular_season': ('{season}-03-28', '{season}-10-01'),
+                           'postseason': ('{season}-10-02', '{season}-11-05')}
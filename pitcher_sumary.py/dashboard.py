@@ -1,84 +1,197 @@
 import matplotlib.pyplot as plt
 import matplotlib.gridspec as gridspec
 import pandas as pd
-from preprocessing import df_processing
 from visuals import (
     player_headshot, player_bio, plot_logo,
     velocity_kdes, rolling_pitch_usage, break_plot,
-    fangraphs_pitcher_stats, pitch_table, plot_fatigue_trend
+    fangraphs_pitcher_stats, pitch_table, plot_fatigue_trend, plot_velocity_decay, tto_table
 )
-from fatigue import create_fatigue_features
-
-def pitching_dashboard(pitcher_id: str, df: pd.DataFrame, stats: list, df_statcast_group: pd.DataFrame, season: int, fatigue_df: pd.DataFrame):
-    # Process the data
-    df = df_processing(df)
-
-    fatigue_df = create_fatigue_features(df)
-
-    # Update grid layout
-    fig = plt.figure(figsize=(20, 28))  # Increased height
-    gs = gridspec.GridSpec(7, 8,  # Added row for fatigue chart
-                         height_ratios=[2, 14, 5, 36, 36, 36, 8],
-                         width_ratios=[1, 18, 18, 18, 18, 18, 18, 1])
-
-    # Add fatigue axis
-    ax_fatigue = fig.add_subplot(gs[5, 1:7])
-    
-    # Existing axes setup...
-    ax_table = fig.add_subplot(gs[4, 1:7])  # Moved table up
-    ax_fatigue = fig.add_subplot(gs[5, 1:7])  # New fatigue chart
-
-    # Add fatigue plot call
-
-    # Create figure and layout grid
-    fig = plt.figure(figsize=(20, 24))
-    gs = gridspec.GridSpec(6, 8,
-                           height_ratios=[2, 10, 5, 30, 30, 8],
-                           width_ratios=[1, 18, 18, 18, 18, 18, 18, 1])
-
-    # Axes layout
-    ax_headshot = fig.add_subplot(gs[1, 1:2])
-    ax_bio = fig.add_subplot(gs[1, 2:4])
-    ax_logo = fig.add_subplot(gs[1, 5:6])
-    ax_season_table = fig.add_subplot(gs[2, 1:7])
-    ax_plot_1 = fig.add_subplot(gs[3, 1:3])
-    ax_plot_2 = fig.add_subplot(gs[3, 3:5])
-    ax_plot_3 = fig.add_subplot(gs[3, 5:7])
-    ax_table = fig.add_subplot(gs[4, 1:7])
-    ax_footer = fig.add_subplot(gs[-1, 1:7])
-    ax_header = fig.add_subplot(gs[0, 1:7])
-    ax_left = fig.add_subplot(gs[:, 0])
-    ax_right = fig.add_subplot(gs[:, -1])
-
-    # Hide unused frames
-    for ax in [ax_footer, ax_header, ax_left, ax_right]:
-        ax.axis('off')
+from pipeline import build_artifacts
+from output import dashboard_path, save_dashboard
+from instrumentation import stage
+
+# Spacing fields of Figure.subplotpars that tight_layout sets
+subplot_params = ['left', 'right', 'top', 'bottom', 'wspace', 'hspace']
+
+# velocity_kdes hides the x ticks of all but the last row; reused rows get these back
+x_tick_color = plt.rcParams['xtick.color']
+x_tick_label_color = (x_tick_color if plt.rcParams['xtick.labelcolor'] == 'inherit'
+                      else plt.rcParams['xtick.labelcolor'])
+
+
+class DashboardTemplate:
+    """
+    The dashboard figure, grid and axes, built once and refilled for each pitcher.
+
+    reset() empties every panel and fit_layout() reuses the spacing an earlier render settled
+    on, so a render into a reused template matches a render into a new one pixel for pixel.
+    """
+    def __init__(self):
+        # Create figure and layout grid, with rows for the times-through-the-order table and
+        # the velocity decay and fatigue charts
+        self.fig = plt.figure(figsize=(20, 28))
+        self.gs = gridspec.GridSpec(8, 8, figure=self.fig,
+                                    height_ratios=[2, 14, 5, 36, 36, 9, 36, 8],
+                                    width_ratios=[1, 18, 18, 18, 18, 18, 18, 1])
+        fig, gs = self.fig, self.gs
+
+        # Axes layout
+        self.ax_headshot = fig.add_subplot(gs[1, 1:2])
+        self.ax_bio = fig.add_subplot(gs[1, 2:4])
+        self.ax_logo = fig.add_subplot(gs[1, 5:6])
+        self.ax_season_table = fig.add_subplot(gs[2, 1:7])
+        self.ax_plot_1 = fig.add_subplot(gs[3, 1:3])
+        self.ax_plot_2 = fig.add_subplot(gs[3, 3:5])
+        self.ax_plot_3 = fig.add_subplot(gs[3, 5:7])
+        self.ax_table = fig.add_subplot(gs[4, 1:7])
+        self.ax_tto = fig.add_subplot(gs[5, 1:7])
+        self.ax_decay = fig.add_subplot(gs[6, 1:4])
+        self.ax_fatigue = fig.add_subplot(gs[6, 4:7])
+        self.ax_footer = fig.add_subplot(gs[-1, 1:7])
+        self.ax_header = fig.add_subplot(gs[0, 1:7])
+        self.ax_left = fig.add_subplot(gs[:, 0])
+        self.ax_right = fig.add_subplot(gs[:, -1])
+        # Per-pitch-type velocity axes, created on first use and reused after
+        self.kde_axes = []
+
+        # Hide unused frames
+        for ax in [self.ax_footer, self.ax_header, self.ax_left, self.ax_right]:
+            ax.axis('off')
+        # Panels whose axes settings are the same for every pitcher vs. panels redrawn from scratch
+        self.static_axes = [self.ax_headshot, self.ax_bio, self.ax_logo, self.ax_season_table, self.ax_table,
+                            self.ax_tto, self.ax_footer]
+        self.plot_axes = [self.ax_plot_1, self.ax_plot_2, self.ax_plot_3, self.ax_decay, self.ax_fatigue]
+        self.used = False
+        # Subplot spacing fitted by tight_layout, per combination of plot panels with axes drawn
+        self.layouts = {}
+
+    def fit_layout(self):
+        """
+        Fits the subplot spacing to the drawn panels with tight_layout. The spacing only depends
+        on which plot panels draw their axes (a panel without data hides them), so it is fitted
+        once per combination and reapplied with subplots_adjust after.
+        """
+        key = tuple(ax.axison for ax in self.plot_axes)
+        # tight_layout's result depends on the spacing it starts from, so start from a new figure's
+        self.fig.subplots_adjust(**{name: plt.rcParams[f'figure.subplot.{name}'] for name in subplot_params})
+        if key in self.layouts:
+            # Tables shift their cells by float rounding each time they are measured; measuring them
+            # where tight_layout would on a new figure keeps the file identical to a new figure's
+            renderer = self.fig._get_renderer()
+            for ax in self.static_axes:
+                for table in ax.tables:
+                    table.get_window_extent(renderer)
+            self.fig.subplots_adjust(**self.layouts[key])
+        else:
+            self.fig.tight_layout()
+            self.layouts[key] = {name: getattr(self.fig.subplotpars, name) for name in subplot_params}
+
+    def reset(self):
+        """
+        Empties every panel for the next pitcher. Panels that only hold text, images and
+        tables have those removed; plotting axes are cleared. A new template is left as is.
+        """
+        if not self.used:
+            self.used = True
+            return
+        for ax in self.static_axes:
+            for artist in ax.texts + ax.images + ax.tables:
+                artist.remove()
+        for ax in self.plot_axes + self.kde_axes:
+            ax.clear()
+        for ax in self.kde_axes:
+            # clear() keeps tick colors
+            ax.tick_params(axis='x', color=x_tick_color, labelcolor=x_tick_label_color)
+            ax.set_visible(False)
+        self.fig.legends.clear()
+
+    def close(self):
+        plt.close(self.fig)
+
+
+def pitching_dashboard(pitcher_id: str, df: pd.DataFrame, stats: list, df_statcast_group: pd.DataFrame, season: int, fatigue_df: pd.DataFrame = None,
+                       fangraphs_df: pd.DataFrame = None, output_path: str = None, show: bool = True,
+                       league_curves: pd.DataFrame = None, league_percentiles: pd.DataFrame = None,
+                       template: DashboardTemplate = None, **save_options):
+    """
+    Renders the pitcher's season dashboard from their raw Statcast frame `df`.
+
+    Processed data, the pitch and times-through-the-order tables, fatigue features and usage
+    trends come from the pipeline graph, so each is computed once per distinct input and
+    reused across calls.
+    `league_curves` (see league.load_league_velocity_curves) overlays the league velocity
+    distribution on each pitch type's density, and `league_percentiles` (see
+    league.load_league_percentiles) colors the pitch table by league percentile.
+
+    Pass a DashboardTemplate to draw into a figure kept from an earlier render instead of
+    building a new one; the caller owns (and closes) it. Without one the figure is built
+    for this render and left open for show().
+
+    The figure is written to `output_path` (by default a per-pitcher PDF in the working
+    directory); `save_options` go to output.save_dashboard (format, dpi, rasterize, size
+    and time budget). Returns save_dashboard's report of the file size and save time.
+    """
+    artifacts = build_artifacts(['processed', 'table_cells', 'tto', 'usage'] + (['fatigue'] if fatigue_df is None else []),
+                                raw=df, league_reference=df_statcast_group, league_percentiles=league_percentiles,
+                                usage_window=5)
+    df = artifacts['processed']
+    if fatigue_df is None:
+        fatigue_df = artifacts['fatigue']
+
+    with stage('layout'):
+        if template is None:
+            template = DashboardTemplate()
+        template.reset()
+    t = template
 
     # Visual content
-    player_headshot(pitcher_id, ax_headshot)
-    player_bio(pitcher_id, ax_bio)
-    plot_logo(pitcher_id, ax_logo)
+    with stage('player_headshot'):
+        player_headshot(pitcher_id, t.ax_headshot)
+    with stage('player_bio'):
+        player_bio(pitcher_id, t.ax_bio)
+    with stage('plot_logo'):
+        plot_logo(pitcher_id, t.ax_logo)
 
     # Top stats
-    fangraphs_pitcher_stats(pitcher_id, ax_season_table, stats, season=season, fontsize=20)
-    plot_fatigue_trend(fatigue_df, ax_fatigue)
+    with stage('fangraphs_pitcher_stats'):
+        fangraphs_pitcher_stats(pitcher_id, t.ax_season_table, stats, season=season, fontsize=20, df=fangraphs_df)
+    with stage('plot_fatigue_trend'):
+        plot_fatigue_trend(fatigue_df, t.ax_fatigue)
+    with stage('plot_velocity_decay'):
+        plot_velocity_decay(fatigue_df, t.ax_decay)
 
     # Pitch visuals
-    pitch_table(df, ax_table, df_statcast_group, fontsize=16)
-    velocity_kdes(df=df, ax=ax_plot_1, gs=gs, gs_x=[3, 4], gs_y=[1, 3], fig=fig, df_statcast_group=df_statcast_group)
-    rolling_pitch_usage(df, ax=ax_plot_2, window=5)
-    break_plot(df=df, ax=ax_plot_3)
+    with stage('pitch_table'):
+        pitch_table(df, t.ax_table, df_statcast_group, fontsize=16, table_cells=artifacts['table_cells'])
+    with stage('velocity_kdes'):
+        velocity_kdes(df=df, ax=t.ax_plot_1, gs=t.gs, gs_x=[3, 4], gs_y=[1, 3], fig=t.fig, df_statcast_group=df_statcast_group,
+                      league_curves=league_curves, kde_axes=t.kde_axes)
+    with stage('tto_table'):
+        tto_table(df, t.ax_tto, fontsize=16, df_tto=artifacts['tto'])
+    with stage('rolling_pitch_usage'):
+        rolling_pitch_usage(df, ax=t.ax_plot_2, window=5, usage=artifacts['usage'])
+    with stage('break_plot'):
+        break_plot(df=df, ax=t.ax_plot_3)
 
     # Footer text
-    ax_footer.text(0, 1, 'By: Moses TS', ha='left', va='top', fontsize=22)
-    ax_footer.text(0.5, 1, 'Color Coding Compares to League Average By Pitch', ha='center', va='top', fontsize=16)
-    ax_footer.text(1, 1, 'Data: MLB, Fangraphs\nImages: MLB, ESPN', ha='right', va='top', fontsize=20)
+    t.ax_footer.text(0, 1, 'By: Moses TS', ha='left', va='top', fontsize=22)
+    color_note = 'League Percentile' if league_percentiles is not None else 'League Average'
+    t.ax_footer.text(0.5, 1, f'Color Coding Compares to {color_note} By Pitch', ha='center', va='top', fontsize=16)
+    t.ax_footer.text(1, 1, 'Data: MLB, Fangraphs\nImages: MLB, ESPN', ha='right', va='top', fontsize=20)
 
     # Optional: add pitch-type legend from break plot
-    handles, labels = ax_plot_3.get_legend_handles_labels()
+    handles, labels = t.ax_plot_3.get_legend_handles_labels()
     if handles:
-        fig.legend(handles, labels, loc='lower center', ncol=6, fontsize=13)
+        t.fig.legend(handles, labels, loc='lower center', ncol=6, fontsize=13)
+
+    with stage('tight_layout'):
+        t.fit_layout()
 
-    plt.tight_layout()
-    fig.savefig("pitching_dashboard.pdf", format="pdf", bbox_inches="tight", dpi=300)
-    plt.show()
+    if output_path is None:
+        output_path = dashboard_path(pitcher_id, season, fmt=save_options.get('fmt') or 'pdf')
+    with stage('savefig'):
+        # fit_layout leaves no margin to trim, so the figure is saved whole
+        save_report = save_dashboard(t.fig, output_path, **{'crop': False, **save_options})
+    if show:
+        plt.show()
+    return save_report
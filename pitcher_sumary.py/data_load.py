@@ -1,44 +1,199 @@
+import json
+import logging
+import os
+import time
 import pandas as pd
 import requests
 import pybaseball as pyb
 from io import StringIO
-from pybaseball import playerid_lookup
+from constants import cache_dir, statcast_max_age_hours, leaderboard_max_age_hours
+from constants import season_calendar, default_season_calendar
+from instrumentation import count, count_cache, count_http
+from preprocessing import compact_statcast
+from store import has_league_store, league_store_current, read_pitcher
+from league import load_league_reference
+from players import load_register
 
 
 def get_player_id(pitcher_name):
-    parts = pitcher_name.split()
-    if len(parts) < 2:
-        print("Please enter both first and last name.")
-        return None
-    first, last = parts[0], parts[1]
-    result = playerid_lookup(last, first)
-    if result.empty:
+    """
+    Resolves a name to an MLBAM id with the local player register (see players.py).
+    Accents, suffixes, initials and small misspellings are tolerated.
+    """
+    player_id = load_register().lookup(pitcher_name)
+    if player_id is None:
         print(f"Could not find player ID for {pitcher_name}")
-        return None
-    return int(result.iloc[0]["key_mlbam"])
+    return player_id
 
 
-def load_pitch_data(pitcher_id, season: int):
-    if season == 2023:
-        start_date = "2023-03-30"
-        end_date = "2023-10-01"
-    elif season == 2024:
-        start_date = "2024-03-20"
-        end_date = "2024-10-01"
-    else:
-        start_date = f"{season}-03-28"
-        end_date = f"{season}-10-01"
-    return pyb.statcast_pitcher(start_date, end_date, pitcher_id)
+def get_player_ids(pitcher_names: list):
+    """
+    Resolves a batch of names (e.g. a roster) in one call; unresolved names map to None.
+    """
+    return load_register().lookup_many(pitcher_names)
+
+
+def season_calendar_for(season: int):
+    """
+    The season's {'regular_season': (start, end), 'postseason': (start, end)} date ranges.
+    """
+    if season in season_calendar:
+        return season_calendar[season]
+    return {phase: tuple(d.format(season=season) for d in dates) for phase, dates in default_season_calendar.items()}
+
+
+def season_dates(season: int, postseason: bool = False):
+    """
+    First and last day of the regular season, or through the end of the postseason.
+    """
+    calendar = season_calendar_for(season)
+    start_date, end_date = calendar['regular_season']
+    if postseason:
+        end_date = calendar['postseason'][1]
+    return start_date, end_date
+
+
+def pitch_cache_path(pitcher_id, season: int):
+    return os.path.join(cache_dir, 'statcast', f"{pitcher_id}_{season}.parquet")
+
+
+def load_pitch_data(pitcher_id, season: int, refresh: bool = False, max_age_hours: float = statcast_max_age_hours,
+                    columns: list = None, postseason: bool = False):
+    """
+    Loads a pitcher's Statcast season, serving it from local data when possible.
+
+    The frame is projected to the columns the pipeline uses and stored in compact dtypes
+    (see `statcast_schema`). Only regular season games are returned unless `postseason`.
+
+    If the league store holds the season and is current through the requested end (see
+    league_store_current), the pitcher is read straight from it (only the requested
+    `columns`, no network). Otherwise the per-pitcher Parquet cache is used; it covers the
+    postseason too, so both views are served from one file.
+
+    A cache written less than `max_age_hours` ago, or one that already covers the end of the
+    season, is returned as is. Otherwise only the dates from the last cached game_date onward
+    are downloaded and merged in. `refresh=True` ignores the cache and re-downloads the season.
+    """
+    end_date = season_dates(season, postseason)[1]
+    if not refresh and has_league_store(season):
+        if league_store_current(season, end_date, max_age_hours):
+            df = read_pitcher(pitcher_id, season, columns=columns, end_date=end_date)
+            count_cache('league_store', hit=not df.empty)
+            if not df.empty:
+                return compact_statcast(df)
+        else:
+            logging.info(f"League store for {season} is not current through {end_date}; using the pitcher cache.")
+            count_cache('league_store', hit=False)
+
+    df = compact_statcast(load_cached_pitch_data(pitcher_id, season, refresh, max_age_hours))
+    if not df.empty:
+        df = df[df['game_date'] <= pd.Timestamp(end_date)]
+    return df[columns] if columns is not None else df
+
+
+def load_cached_pitch_data(pitcher_id, season: int, refresh: bool, max_age_hours: float):
+    start_date, end_date = season_dates(season, postseason=True)
+    path = pitch_cache_path(pitcher_id, season)
+
+    if refresh or not os.path.exists(path):
+        logging.info(f"Downloading Statcast season {season} for pitcher {pitcher_id}...")
+        count_cache('statcast', hit=False)
+        df = pyb.statcast_pitcher(start_date, end_date, pitcher_id)
+        count('rows_downloaded.statcast', len(df))
+        save_pitch_cache(df, path)
+        return df
+
+    cached = pd.read_parquet(path)
+    last_date = pd.to_datetime(cached['game_date']).max()
+    age_hours = (time.time() - os.path.getmtime(path)) / 3600
+    # A cache written after the season ended is complete even if the pitcher's last game was earlier
+    written_after_end = os.path.getmtime(path) > (pd.Timestamp(end_date) + pd.Timedelta(days=1)).timestamp()
+    if age_hours < max_age_hours or last_date >= pd.Timestamp(end_date) or written_after_end:
+        logging.info(f"Serving pitcher {pitcher_id}, season {season} from cache ({len(cached)} pitches).")
+        count_cache('statcast', hit=True)
+        return cached
+
+    # Re-pull the last cached date too, in case that game was still in progress
+    fetch_start = last_date.strftime('%Y-%m-%d')
+    logging.info(f"Refreshing pitcher {pitcher_id}, season {season} from {fetch_start}...")
+    count_cache('statcast', hit=False)
+    new = pyb.statcast_pitcher(fetch_start, end_date, pitcher_id)
+    count('rows_downloaded.statcast', len(new))
+    if new.empty:
+        os.utime(path)
+        return cached
+
+    kept = cached[pd.to_datetime(cached['game_date']) < last_date]
+    df = pd.concat([kept, new], ignore_index=True)
+    save_pitch_cache(df, path)
+    return df
+
+
+def save_pitch_cache(df: pd.DataFrame, path: str):
+    if df.empty:
+        return
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + '.tmp'
+    df.to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, path)
 
 
 def load_statcast_grouped(season:int):
+    """
+    Returns the per-pitch-type league reference table for a season.
+
+    The table is built from the local league store and kept on disk. Without a league
+    store this falls back to the published 2024 table.
+    """
+    reference = load_league_reference(season)
+    if reference is not None:
+        return reference
+
+    logging.warning(f"No league store for {season}; using the published 2024 league reference table.")
     url = f"https://github.com/tnestico/pitching_summary/raw/main/statcast_2024_grouped.csv"
     response = requests.get(url)
+    count_http(response)
     return pd.read_csv(StringIO(response.content.decode('utf-8')))
 
 
-def fangraphs_pitching_leaderboards(season:int):
-    url = f"https://www.fangraphs.com/api/leaders/major-league/data?age=&pos=all&stats=pit&lg=all&season={season}&season1={season}&ind=0&qual=0&type=8&month=0&pageitems=500000"
-    data = requests.get(url).json()
-    df = pd.DataFrame(data=data['data'])
-    return df
\ No newline at end of file
+# In-process memo of FanGraphs leaderboards: season -> (load time, DataFrame)
+leaderboard_memo = {}
+
+
+def fangraphs_pitching_leaderboards(season:int, refresh: bool = False, max_age_hours: float = leaderboard_max_age_hours):
+    """
+    Returns the FanGraphs pitching leaderboard for a season, indexed by xMLBAMID.
+
+    The leaderboard is memoized in process and the raw JSON is kept on disk, both for
+    `max_age_hours`. `refresh=True` downloads it again.
+    """
+    now = time.time()
+    if not refresh and season in leaderboard_memo:
+        loaded_at, df = leaderboard_memo[season]
+        if now - loaded_at < max_age_hours * 3600:
+            count_cache('fangraphs_memory', hit=True)
+            return df
+
+    path = os.path.join(cache_dir, 'fangraphs', f"leaderboard_{season}.json")
+    if not refresh and os.path.exists(path) and now - os.path.getmtime(path) < max_age_hours * 3600:
+        with open(path) as f:
+            rows = json.load(f)
+        loaded_at = os.path.getmtime(path)
+        count_cache('fangraphs_disk', hit=True)
+    else:
+        url = f"https://www.fangraphs.com/api/leaders/major-league/data?age=&pos=all&stats=pit&lg=all&season={season}&season1={season}&ind=0&qual=0&type=8&month=0&pageitems=500000"
+        count_cache('fangraphs_disk', hit=False)
+        response = requests.get(url)
+        count_http(response)
+        rows = response.json()['data']
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path + '.tmp', 'w') as f:
+            json.dump(rows, f)
+        os.replace(path + '.tmp', path)
+        loaded_at = now
+
+    df = pd.DataFrame(data=rows)
+    df = df.drop_duplicates(subset='xMLBAMID')
+    df.index = df['xMLBAMID'].to_numpy()
+    leaderboard_memo[season] = (loaded_at, df)
+    return df
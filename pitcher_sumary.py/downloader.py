@@ -0,0 +1,149 @@
+import argparse
+import json
+import logging
+import os
+import random
+import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from itertools import islice
+import pandas as pd
+from instrumentation import count
+from constants import cache_dir
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# Days per request. A week of league pitches is ~30k rows; a failed chunk only costs its own retry.
+default_chunk_days = 7
+
+# Chunks fetched at once. Also bounds memory: at most this many chunks are held before being written.
+default_workers = 4
+
+# Attempts per chunk, with exponential backoff (and jitter) between them
+max_attempts = 5
+backoff_seconds = 2
+max_backoff_seconds = 60
+
+
+def date_chunks(start_date: str, end_date: str, chunk_days: int = default_chunk_days):
+    """
+    Splits an inclusive date range into consecutive (start, end) ranges of `chunk_days` days.
+    """
+    start, end = pd.Timestamp(start_date), pd.Timestamp(end_date)
+    chunks = []
+    while start <= end:
+        chunk_end = min(start + pd.Timedelta(days=chunk_days - 1), end)
+        chunks.append((start.strftime('%Y-%m-%d'), chunk_end.strftime('%Y-%m-%d')))
+        start = chunk_end + pd.Timedelta(days=1)
+    return chunks
+
+
+def fetch_with_retry(fetch, start_date: str, end_date: str, attempts: int = max_attempts):
+    """
+    Calls `fetch(start_date, end_date)`, retrying failures with exponential backoff.
+    The last failure is re-raised.
+    """
+    for attempt in range(1, attempts + 1):
+        try:
+            return fetch(start_date, end_date)
+        except Exception as e:
+            if attempt == attempts:
+                raise
+            delay = min(max_backoff_seconds, backoff_seconds * 2 ** (attempt - 1)) * random.uniform(0.5, 1)
+            logging.warning(f"Fetching {start_date}..{end_date} failed ({type(e).__name__}: {e}); "
+                            f"retry {attempt}/{attempts - 1} in {delay:.1f}s")
+            count('download_retries')
+            time.sleep(delay)
+
+
+def checkpoint_dir(name: str):
+    return os.path.join(cache_dir, 'downloads', name)
+
+
+def pending_downloads(prefix: str = ''):
+    """
+    Names of downloads that were started but not finished, optionally only those
+    starting with `prefix`.
+    """
+    root = os.path.join(cache_dir, 'downloads')
+    if not os.path.isdir(root):
+        return []
+    return sorted(name for name in os.listdir(root)
+                  if name.startswith(prefix) and os.path.exists(os.path.join(root, name, 'manifest.json')))
+
+
+def download_range(name: str, start_date: str, end_date: str, fetch, sink, chunk_days: int = default_chunk_days,
+                   workers: int = default_workers):
+    """
+    Downloads a date range in chunks, `workers` at a time, handing each chunk to
+    `sink(df, (chunk start, chunk end))` as soon as it arrives.
+
+    Finished chunks are checkpointed under cache_dir/downloads/`name`, so calling this
+    again after an interruption (or a chunk that ran out of retries) only fetches the
+    chunks that are missing. The checkpoint is removed once every chunk is done. `sink`
+    runs in the calling thread and should be idempotent per chunk, since a chunk written
+    just before a crash is written again on resume.
+
+    Returns the number of rows downloaded by this call.
+    """
+    path = checkpoint_dir(name)
+    manifest_path = os.path.join(path, 'manifest.json')
+    if os.path.exists(manifest_path):
+        with open(manifest_path) as f:
+            chunks = [tuple(chunk) for chunk in json.load(f)['chunks']]
+    else:
+        chunks = date_chunks(start_date, end_date, chunk_days)
+        os.makedirs(path, exist_ok=True)
+        with open(manifest_path + '.tmp', 'w') as f:
+            json.dump({'start_date': start_date, 'end_date': end_date, 'chunks': chunks}, f)
+        os.replace(manifest_path + '.tmp', manifest_path)
+
+    def done_path(chunk):
+        return os.path.join(path, f"{chunk[0]}_{chunk[1]}.done")
+
+    pending = [chunk for chunk in chunks if not os.path.exists(done_path(chunk))]
+    if len(pending) < len(chunks):
+        logging.info(f"Resuming {name}: {len(chunks) - len(pending)} of {len(chunks)} chunks already done")
+
+    rows = 0
+    queue = iter(pending)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        running = {}
+
+        def submit():
+            for chunk in islice(queue, workers - len(running)):
+                running[pool.submit(fetch_with_retry, fetch, *chunk)] = chunk
+
+        submit()
+        while running:
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                chunk = running.pop(future)
+                df = future.result()
+                sink(df, chunk)
+                open(done_path(chunk), 'w').close()
+                rows += len(df)
+                count('download_chunks')
+                count('download_rows', len(df))
+                logging.info(f"{name}: {chunk[0]}..{chunk[1]} done ({len(df)} rows)")
+            submit()
+
+    shutil.rmtree(path, ignore_errors=True)
+    return rows
+
+
+if __name__ == "__main__":
+    from store import build_league_store
+
+    parser = argparse.ArgumentParser(description="Download league Statcast seasons into the local store.")
+    parser.add_argument('--seasons', type=int, nargs='+', required=True)
+    parser.add_argument('--postseason', action='store_true', help="Include postseason games")
+    parser.add_argument('--chunk-days', type=int, default=default_chunk_days)
+    parser.add_argument('--workers', type=int, default=default_workers)
+    args = parser.parse_args()
+
+    for season in args.seasons:
+        start = time.perf_counter()
+        rows = build_league_store(season, postseason=args.postseason, chunk_days=args.chunk_days,
+                                  workers=args.workers)
+        logging.info(f"Stored {rows} pitches for {season} in {time.perf_counter() - start:.0f}s")
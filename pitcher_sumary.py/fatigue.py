@@ -1,75 +1,207 @@
 import pandas as pd
 import numpy as np
+from instrumentation import count
 
-def create_fatigue_features(df: pd.DataFrame, debug: bool = False) -> pd.DataFrame:
+fatigue_columns = [
+    'game_pk', 'game_date', 'game_number', 'pitch_type', 'total_pitches',
+    'release_speed_mean', 'release_spin_mean', 'season_avg_velocity', 'season_avg_spin',
+    'velocity_drop', 'spin_drop', 'ball_strike_ratio', 'season_ball_strike_ratio',
+    'command_drop', 'velocity_decay', 'spin_decay', 'fatigue_flag'
+]
+
+# Per-(game, pitch_type) sums that the season-to-date baselines are built from
+sum_columns = ['total_pitches', 'speed_sum', 'speed_n', 'spin_sum', 'spin_n', 'balls', 'strikes']
+
+
+# Decay slopes are reported as the fitted change over this many pitches of the pitcher's game,
+# and only fitted for a pitch type thrown at least min_decay_pitches times in the game
+decay_pitches = 100
+min_decay_pitches = 5
+
+# How each per-game sum is aggregated from pitch rows (see pitch_measurements). The count_*
+# sums are the least-squares terms for measurement vs. pitch count within the game.
+sum_aggregations = dict(
+    game_date=('game_date', 'first'),
+    total_pitches=('pitch_type', 'size'),
+    speed_sum=('release_speed', 'sum'),
+    speed_n=('release_speed', 'count'),
+    spin_sum=('release_spin_rate', 'sum'),
+    spin_n=('release_spin_rate', 'count'),
+    balls=('ball', 'sum'),
+    strikes=('strike', 'sum'),
+    speed_count_sum=('speed_count', 'sum'),
+    speed_count_sq_sum=('speed_count_sq', 'sum'),
+    speed_count_product_sum=('speed_count_product', 'sum'),
+    spin_count_sum=('spin_count', 'sum'),
+    spin_count_sq_sum=('spin_count_sq', 'sum'),
+    spin_count_product_sum=('spin_count_product', 'sum'),
+)
+
+
+def pitch_count_in_game(df: pd.DataFrame) -> np.ndarray:
+    """
+    Each pitch's number within its pitcher's game (1 for the first pitch), from at_bat_number
+    and pitch_number. NaN if the frame does not have them.
+    """
+    if 'at_bat_number' not in df or 'pitch_number' not in df:
+        return np.full(len(df), np.nan)
+    keys = [df[c].to_numpy() for c in ('pitcher', 'game_pk') if c in df]
+    order = np.lexsort([df['pitch_number'].to_numpy(), df['at_bat_number'].to_numpy()] + keys[::-1])
+    new_game = np.ones(len(df), dtype=bool)
+    if len(df):
+        new_game[1:] = np.any([k[order][1:] != k[order][:-1] for k in keys], axis=0)
+    position = np.arange(len(df))
+    game_start = np.maximum.accumulate(np.where(new_game, position, 0))
+    counts = np.empty(len(df))
+    counts[order] = position - game_start + 1
+    return counts
+
+
+def pitch_measurements(df: pd.DataFrame, columns: list) -> pd.DataFrame:
+    """
+    The pitches with a pitch_type, as `columns` plus the measurements sum_aggregations reads.
+    """
+    has_type = df['pitch_type'].notna().to_numpy()
+    # Sum in float64 even when the frame stores measurements as float32
+    speed = df['release_speed'].to_numpy(dtype='float64')[has_type]
+    spin = df['release_spin_rate'].to_numpy(dtype='float64')[has_type]
+    # Pitch counts are taken over every pitch, typed or not, then paired with each measurement
+    pitch_count = pitch_count_in_game(df)[has_type]
+    speed_count = np.where(np.isnan(speed), np.nan, pitch_count)
+    spin_count = np.where(np.isnan(spin), np.nan, pitch_count)
+    return df.loc[has_type, columns].assign(
+        release_speed=speed,
+        release_spin_rate=spin,
+        ball=(df['balls'].to_numpy() > 0)[has_type],
+        strike=(df['strikes'].to_numpy() > 0)[has_type],
+        speed_count=speed_count,
+        speed_count_sq=speed_count ** 2,
+        speed_count_product=speed_count * speed,
+        spin_count=spin_count,
+        spin_count_sq=spin_count ** 2,
+        spin_count_product=spin_count * spin,
+    )
+
+
+def game_pitch_sums(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Collapses pitch-level data to one row of sums per (game_number, pitch_type).
+
+    Games are numbered in game_date order, matching the order the dashboard plots them.
+    """
+    # Stable, so games on the same date keep their row order
+    df_sorted = df.sort_values(by='game_date', kind='stable')
+    games = df_sorted['game_pk'].unique()
+    game_numbers = pd.Series(np.arange(1, len(games) + 1), index=games)
+
+    df_pitch = pitch_measurements(df, ['game_pk', 'game_date', 'pitch_type'])
+    df_pitch['game_number'] = df_pitch['game_pk'].map(game_numbers).to_numpy()
+
+    sums = df_pitch.groupby(['pitch_type', 'game_number'], sort=True, observed=True).agg(
+        game_pk=('game_pk', 'first'), **sum_aggregations).reset_index()
+    sums['pitch_type'] = sums['pitch_type'].astype(object)
+
+    # Keep the pitch type order the pitcher first threw them in: the first game's in row order,
+    # then the ones each later game adds
+    first_thrown = df_pitch.sort_values(by='game_number', kind='stable')['pitch_type'].unique()
+    pitch_order = {pt: i for i, pt in enumerate(first_thrown)}
+    sums['pitch_order'] = sums['pitch_type'].map(pitch_order).astype(int)
+    return sums
+
+
+def season_totals(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Whole-season sum_columns per pitch type, indexed by pitch_type, for use as a later
+    season's prior baseline (see create_fatigue_features).
+    """
+    if df.empty:
+        return pd.DataFrame(columns=sum_columns, index=pd.Index([], name='pitch_type'))
+    return game_pitch_sums(df).groupby('pitch_type', sort=False)[sum_columns].sum()
+
+
+def decay_slope(game_sums: pd.DataFrame, prefix: str) -> pd.Series:
+    """
+    Least-squares slope of a measurement against pitch count within each game, from the
+    per-game sums (all games at once), scaled to the change over decay_pitches pitches.
+    NaN where fewer than min_decay_pitches pitches were measured or the counts do not vary.
+    """
+    n = game_sums[f'{prefix}_n']
+    x, y = game_sums[f'{prefix}_count_sum'], game_sums[f'{prefix}_sum']
+    denominator = n * game_sums[f'{prefix}_count_sq_sum'] - x ** 2
+    slope = (n * game_sums[f'{prefix}_count_product_sum'] - x * y) / denominator.where(denominator > 1e-9)
+    return (slope * decay_pitches).where(n >= min_decay_pitches)
+
+
+def fatigue_from_sums(game_sums: pd.DataFrame, past_sums: pd.DataFrame) -> pd.DataFrame:
+    """
+    Scores each game row in `game_sums` against the matching season-to-date row in `past_sums`.
+
+    Both frames carry the `sum_columns`; rows with no prior pitches of that type are dropped.
+    """
+    has_past = past_sums['total_pitches'].fillna(0).to_numpy() > 0
+    game_sums = game_sums[has_past]
+    past_sums = past_sums[has_past]
+
+    out = game_sums[['game_pk', 'game_date', 'game_number', 'pitch_type', 'total_pitches']].copy()
+    out['release_speed_mean'] = game_sums['speed_sum'] / game_sums['speed_n'].replace(0, np.nan)
+    out['release_spin_mean'] = game_sums['spin_sum'] / game_sums['spin_n'].replace(0, np.nan)
+    out['season_avg_velocity'] = past_sums['speed_sum'] / past_sums['speed_n'].replace(0, np.nan)
+    out['season_avg_spin'] = past_sums['spin_sum'] / past_sums['spin_n'].replace(0, np.nan)
+    out['velocity_drop'] = out['release_speed_mean'] - out['season_avg_velocity']
+    out['spin_drop'] = out['release_spin_mean'] - out['season_avg_spin']
+
+    game_counts = game_sums['balls'] + game_sums['strikes']
+    past_counts = past_sums['balls'] + past_sums['strikes']
+    out['ball_strike_ratio'] = game_sums['balls'] / game_counts.replace(0, np.nan)
+    out['season_ball_strike_ratio'] = past_sums['balls'] / past_counts.replace(0, np.nan)
+    out['command_drop'] = out['ball_strike_ratio'] - out['season_ball_strike_ratio']
+    out['velocity_decay'] = decay_slope(game_sums, 'speed')
+    out['spin_decay'] = decay_slope(game_sums, 'spin')
+
+    out['fatigue_flag'] = ((out['velocity_drop'] < -1.0) &
+                           (out['command_drop'] > 0.05) &
+                           (out['spin_drop'] < -50)).astype(int)
+    return out
+
+
+def create_fatigue_features(df: pd.DataFrame, debug: bool = False, prior_totals: pd.DataFrame = None) -> pd.DataFrame:
     """
     Generates game-level fatigue features for each pitch type using pitch-level Statcast data.
 
+    Each game is compared to a season-to-date baseline built from cumulative per-game sums,
+    shifted so a game only sees the games before it. velocity_decay and spin_decay are the
+    fitted change in velocity (mph) and spin (rpm) over decay_pitches pitches of the game.
+
     Parameters:
         df (pd.DataFrame): Statcast data for a single pitcher, one season
         debug (bool): If True, prints intermediate values for inspection
+        prior_totals (pd.DataFrame): Optional sums carried in from earlier seasons (see
+            season_totals), already weighted; added to every game's baseline, so the
+            season's first games are scored too
 
     Returns:
         pd.DataFrame: Fatigue feature set with one row per game-pitch_type combo
     """
-    df = df.sort_values(by='game_date')
-    df['game_number'] = df['game_pk'].rank(method='dense').astype(int)
-
-    fatigue_rows = []
-    games = df['game_pk'].unique()
-    pitch_types = df['pitch_type'].dropna().unique()
-
-    for idx, game_id in enumerate(games):
-        game_df = df[df['game_pk'] == game_id]
-        past_df = df[df['game_pk'].isin(games[:idx])]
-
-        if past_df.empty:
-            continue
-
-        for pt in pitch_types:
-            game_pitch_df = game_df[game_df['pitch_type'] == pt]
-            past_pitch_df = past_df[past_df['pitch_type'] == pt]
-
-            if game_pitch_df.empty or past_pitch_df.empty:
-                continue
-
-            release_speed_mean = game_pitch_df['release_speed'].mean()
-            release_spin_mean = game_pitch_df['release_spin_rate'].mean()
-            balls = (game_pitch_df['balls'] > 0).sum()
-            strikes = (game_pitch_df['strikes'] > 0).sum()
-            ball_strike_ratio = balls / (balls + strikes) if (balls + strikes) > 0 else np.nan
-
-            season_avg_velocity = past_pitch_df['release_speed'].mean()
-            season_avg_spin = past_pitch_df['release_spin_rate'].mean()
-            past_balls = (past_pitch_df['balls'] > 0).sum()
-            past_strikes = (past_pitch_df['strikes'] > 0).sum()
-            season_ball_strike_ratio = past_balls / (past_balls + past_strikes) if (past_balls + past_strikes) > 0 else np.nan
-
-            velocity_drop = release_speed_mean - season_avg_velocity
-            spin_drop = release_spin_mean - season_avg_spin
-            command_drop = ball_strike_ratio - season_ball_strike_ratio
-
-            fatigue_flag = int((velocity_drop < -1.0) and (command_drop > 0.05) and (spin_drop < -50))
-
-            fatigue_rows.append({
-                'game_pk': game_id,
-                'game_date': game_pitch_df['game_date'].iloc[0],
-                'game_number': idx + 1,
-                'pitch_type': pt,
-                'total_pitches': len(game_pitch_df),
-                'release_speed_mean': release_speed_mean,
-                'release_spin_mean': release_spin_mean,
-                'season_avg_velocity': season_avg_velocity,
-                'season_avg_spin': season_avg_spin,
-                'velocity_drop': velocity_drop,
-                'spin_drop': spin_drop,
-                'ball_strike_ratio': ball_strike_ratio,
-                'season_ball_strike_ratio': season_ball_strike_ratio,
-                'command_drop': command_drop,
-                'fatigue_flag': fatigue_flag
-            })
-
-            if debug:
-                print(f"Game {idx + 1}, {pt}: velo_drop={velocity_drop:.2f}, spin_drop={spin_drop:.1f}, command_drop={command_drop:.2f}, fatigue={fatigue_flag}")
-
-    return pd.DataFrame(fatigue_rows)
+    if df.empty:
+        return pd.DataFrame(columns=fatigue_columns)
+
+    count('rows_processed.fatigue', len(df))
+    sums = game_pitch_sums(df)
+
+    # Season to date: running totals per pitch type, shifted one game back
+    past = sums.groupby('pitch_type', sort=False, observed=True)[sum_columns].cumsum()
+    past = past.groupby(sums['pitch_type'], sort=False, observed=True).shift(1)
+    if prior_totals is not None and len(prior_totals):
+        prior = prior_totals.reindex(sums['pitch_type'])[sum_columns].fillna(0).to_numpy(dtype='float64')
+        past = past.fillna(0) + prior
+
+    fatigue_df = fatigue_from_sums(sums, past)
+    fatigue_df['pitch_order'] = sums['pitch_order']
+    fatigue_df = fatigue_df.sort_values(by=['game_number', 'pitch_order'])
+    fatigue_df = fatigue_df[fatigue_columns].reset_index(drop=True)
+
+    if debug:
+        for row in fatigue_df.itertuples():
+            print(f"Game {row.game_number}, {row.pitch_type}: velo_drop={row.velocity_drop:.2f}, spin_drop={row.spin_drop:.1f}, command_drop={row.command_drop:.2f}, fatigue={row.fatigue_flag}")
+
+    return fatigue_df
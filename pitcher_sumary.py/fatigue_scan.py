@@ -0,0 +1,86 @@
+import argparse
+import logging
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+import pyarrow.dataset as ds
+from fatigue_state import empty_fatigue_state, fold_games, fatigue_input_columns
+from store import read_league, stored_pitchers
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# A pitcher counts as currently fatigued if a pitch type was flagged in one of their last this many games
+default_recent_games = 3
+
+
+def league_fatigue_features(df: pd.DataFrame):
+    """
+    Fatigue features for every (pitcher, game, pitch_type) in a league frame, in one grouped
+    pass: create_fatigue_features' columns plus 'pitcher'.
+    """
+    return fold_games(empty_fatigue_state(), df)[1]
+
+
+def score_pitchers(season: int, pitcher_ids: list):
+    """
+    Reads only `pitcher_ids` from the league store and scores them (one pool task).
+    """
+    df = read_league(season, columns=fatigue_input_columns, filter=ds.field('pitcher').isin(pitcher_ids))
+    return league_fatigue_features(df)
+
+
+def scan_league_fatigue(season: int, workers: int = 1):
+    """
+    Fatigue features for every pitcher in the league store. With `workers > 1` pitchers are
+    split into that many partitions and scored in a process pool, each worker reading its
+    own partition from the store. The single pass already takes a few seconds for a league
+    season, so the pool only pays off with several cores to spread it over.
+    """
+    if workers <= 1:
+        return league_fatigue_features(read_league(season, columns=fatigue_input_columns))
+
+    partitions = [part.tolist() for part in np.array_split(stored_pitchers(season), workers) if len(part)]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        frames = list(pool.map(score_pitchers, [season] * len(partitions), partitions))
+    return pd.concat(frames, ignore_index=True)
+
+
+def rank_fatigued_pitchers(features: pd.DataFrame, recent_games: int = default_recent_games):
+    """
+    Pitchers with a fatigue flag in any of their last `recent_games` games, most flagged
+    first (ties broken by the largest velocity drop among the flagged pitch types).
+
+    Returns one row per pitcher: last game date, flagged games and pitch types, and the mean
+    velocity, spin and command drops of the flagged rows.
+    """
+    last_game = features.groupby('pitcher')['game_number'].transform('max')
+    recent = features[(features['game_number'] > last_game - recent_games) & (features['fatigue_flag'] == 1)]
+    ranked = recent.groupby('pitcher').agg(
+        last_flagged=('game_date', 'max'),
+        flagged_games=('game_pk', 'nunique'),
+        flagged_pitch_types=('pitch_type', lambda s: ', '.join(sorted(s.unique()))),
+        velocity_drop=('velocity_drop', 'mean'),
+        spin_drop=('spin_drop', 'mean'),
+        command_drop=('command_drop', 'mean'),
+    )
+    ranked.insert(0, 'last_game', features.groupby('pitcher')['game_date'].max().reindex(ranked.index))
+    ranked = ranked.sort_values(['flagged_games', 'velocity_drop'], ascending=[False, True]).reset_index()
+    ranked.insert(0, 'rank', np.arange(1, len(ranked) + 1))
+    return ranked
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rank the league's currently fatigued pitchers.")
+    parser.add_argument('--season', type=int, required=True)
+    parser.add_argument('--workers', type=int, default=1, help="Processes to score pitcher partitions with")
+    parser.add_argument('--recent-games', type=int, default=default_recent_games)
+    parser.add_argument('--top', type=int, default=25)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    features = scan_league_fatigue(args.season, args.workers)
+    ranked = rank_fatigued_pitchers(features, args.recent_games)
+    logging.info(f"Scored {features['pitcher'].nunique()} pitchers in {time.perf_counter() - start:.1f}s; "
+                 f"{len(ranked)} flagged in their last {args.recent_games} games")
+    print(ranked.head(args.top).to_string(index=False))
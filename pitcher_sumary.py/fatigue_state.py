@@ -0,0 +1,246 @@
+import argparse
+import logging
+import os
+import shutil
+import time
+import pandas as pd
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from fatigue import fatigue_columns, sum_columns, sum_aggregations, pitch_measurements, fatigue_from_sums
+from store import extend_league_store, read_league
+from instrumentation import count
+from constants import cache_dir
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# Pitch-level columns the fatigue state reads
+fatigue_input_columns = ['pitcher', 'game_pk', 'game_date', 'pitch_type', 'release_speed', 'release_spin_rate',
+                         'balls', 'strikes', 'at_bat_number', 'pitch_number']
+
+# Stored state: running totals per (pitcher, pitch_type), the games already folded in, and
+# every scored (pitcher, game, pitch_type) row so far. On disk the totals and games of update N
+# are in v<N>/, the rows each update scored in features/part-<N>.parquet, and CURRENT holds N.
+state_tables = {
+    'totals': ['pitcher', 'pitch_type', 'pitch_order'] + sum_columns,
+    'games': ['pitcher', 'game_pk', 'game_date', 'game_number'],
+    'features': ['pitcher'] + fatigue_columns,
+}
+
+
+def fatigue_state_dir(season: int):
+    return os.path.join(cache_dir, 'fatigue_state', str(season))
+
+
+def current_version(season: int):
+    """
+    The number of the last committed update, 0 before the first. It is stored in a file that
+    is replaced as a whole, so it always names a complete update.
+    """
+    path = os.path.join(fatigue_state_dir(season), 'CURRENT')
+    if not os.path.exists(path):
+        return 0
+    with open(path) as f:
+        return int(f.read())
+
+
+def features_parts(season: int, version: int):
+    """
+    The features files of updates 1 through `version`, oldest first. Files of an update that
+    was never committed are left out.
+    """
+    path = os.path.join(fatigue_state_dir(season), 'features')
+    if not os.path.isdir(path):
+        return []
+    parts = sorted(f for f in os.listdir(path) if f.startswith('part-') and f.endswith('.parquet'))
+    return [os.path.join(path, f) for f in parts if int(f[len('part-'):-len('.parquet')]) <= version]
+
+
+def empty_fatigue_state():
+    return {name: pd.DataFrame(columns=columns) for name, columns in state_tables.items()}
+
+
+def load_fatigue_state(season: int, features: bool = True):
+    """
+    Returns the stored fatigue state for a season as a dict of DataFrames (see
+    state_tables); tables that do not exist yet come back empty. With `features=False`
+    the scored rows are not read (fold_games does not need them).
+    """
+    state = empty_fatigue_state()
+    version = current_version(season)
+    if not version:
+        return state
+    for name in ('totals', 'games'):
+        state[name] = pd.read_parquet(os.path.join(fatigue_state_dir(season), f"v{version}", f"{name}.parquet"))
+    parts = features_parts(season, version) if features else []
+    if parts:
+        state['features'] = pq.read_table(parts).to_pandas()
+    return state
+
+
+def save_fatigue_state(state: dict, scored: pd.DataFrame, season: int):
+    """
+    Commits one update: the new totals and games list, plus the rows it scored.
+
+    Every file is written under the next version number first and the update only takes
+    effect when CURRENT is replaced, so a run killed part way leaves the previous state
+    whole (and the unfinished files are overwritten by the next update). Scored rows are
+    appended as one file per update rather than rewriting the season's features.
+    """
+    path = fatigue_state_dir(season)
+    previous = current_version(season)
+    version = previous + 1
+    os.makedirs(os.path.join(path, 'features'), exist_ok=True)
+    os.makedirs(os.path.join(path, f"v{version}"), exist_ok=True)
+
+    part_path = os.path.join(path, 'features', f"part-{version:06d}.parquet")
+    scored.to_parquet(part_path + '.tmp', index=False)
+    os.replace(part_path + '.tmp', part_path)
+    for name in ('totals', 'games'):
+        state[name].to_parquet(os.path.join(path, f"v{version}", f"{name}.parquet"), index=False)
+
+    with open(os.path.join(path, 'CURRENT.tmp'), 'w') as f:
+        f.write(str(version))
+    os.replace(os.path.join(path, 'CURRENT.tmp'), os.path.join(path, 'CURRENT'))
+    if previous:
+        shutil.rmtree(os.path.join(path, f"v{previous}"), ignore_errors=True)
+
+
+def fold_games(state: dict, df: pd.DataFrame):
+    """
+    Scores the games in `df` that the state has not seen and folds them into its totals.
+
+    `df` is pitch-level data for any number of pitchers. Each new game is compared to the
+    pitcher's running totals from the games before it, exactly as create_fatigue_features
+    compares it to the season to date, so the work per game does not grow with the season.
+    A pitcher's rows come out in create_fatigue_features' order too.
+    Games dated before a pitcher's latest folded game are skipped, since they would change
+    baselines already scored.
+
+    Returns (new state, scored rows in fatigue_columns plus 'pitcher').
+    """
+    totals, games = state['totals'], state['games']
+    keys = ['pitcher', 'game_pk']
+
+    # New games only, numbered after each pitcher's games so far
+    new_games = df[keys + ['game_date']].drop_duplicates(keys)
+    seen = pd.MultiIndex.from_frame(games[keys].astype('int64'))
+    new_games = new_games[~pd.MultiIndex.from_frame(new_games[keys].astype('int64')).isin(seen)]
+    last_dates = games.groupby('pitcher')['game_date'].max()
+    stale = (new_games['game_date'] < pd.to_datetime(new_games['pitcher'].map(last_dates))).to_numpy()
+    if stale.any():
+        logging.warning(f"Skipping {int(stale.sum())} games dated before games already folded in")
+        new_games = new_games[~stale]
+    if new_games.empty:
+        return state, pd.DataFrame(columns=state_tables['features'])
+
+    # Stable, so games on the same date keep their row order as in create_fatigue_features
+    new_games = new_games.sort_values(['pitcher', 'game_date'], kind='stable')
+    games_so_far = new_games['pitcher'].map(games.groupby('pitcher').size()).fillna(0).astype(int)
+    new_games['game_number'] = games_so_far + new_games.groupby('pitcher').cumcount() + 1
+
+    # Per (pitcher, game, pitch_type) sums of the new games
+    df_pitch = pitch_measurements(df, keys + ['game_date', 'pitch_type'])
+    df_pitch['row'] = range(len(df_pitch))
+    df_pitch = df_pitch.merge(new_games[keys + ['game_number']], on=keys)
+    count('rows_processed.fatigue_state', len(df_pitch))
+    sums = df_pitch.groupby(['pitcher', 'game_number', 'pitch_type'], sort=True, observed=True).agg(
+        game_pk=('game_pk', 'first'), first_row=('row', 'min'), **sum_aggregations).reset_index()
+    sums['pitch_type'] = sums['pitch_type'].astype(object)
+
+    # Totals before each game: the stored totals plus earlier new games of the same pitch type
+    type_keys = ['pitcher', 'pitch_type']
+    stored = sums[type_keys].merge(totals, on=type_keys, how='left')[sum_columns].fillna(0).astype('float64')
+    earlier = sums.groupby(type_keys, sort=False)[sum_columns].cumsum() - sums[sum_columns]
+    past = stored.set_axis(sums.index) + earlier
+
+    # Pitch types keep the order the pitcher first threw them in
+    first_thrown = sums.sort_values(['pitcher', 'game_number', 'first_row']).drop_duplicates(type_keys)
+    first_thrown = first_thrown.merge(totals[type_keys], on=type_keys, how='left', indicator=True)
+    new_types = first_thrown.loc[first_thrown['_merge'] == 'left_only', type_keys].copy()
+    next_order = new_types['pitcher'].map(totals.groupby('pitcher')['pitch_order'].max() + 1).fillna(0).astype(int)
+    new_types['pitch_order'] = next_order + new_types.groupby('pitcher').cumcount()
+    pitch_orders = pd.concat([totals[type_keys + ['pitch_order']], new_types], ignore_index=True)
+
+    scored = fatigue_from_sums(sums, past)
+    scored.insert(0, 'pitcher', sums.loc[scored.index, 'pitcher'])
+    scored = scored.merge(pitch_orders, on=type_keys, how='left')
+    scored = scored.sort_values(['pitcher', 'game_number', 'pitch_order'])[state_tables['features']]
+    scored = scored.reset_index(drop=True)
+
+    new_totals = pd.concat([totals[type_keys + sum_columns], sums[type_keys + sum_columns]], ignore_index=True)
+    new_totals = new_totals.groupby(type_keys, as_index=False)[sum_columns].sum()
+    new_totals = new_totals.merge(pitch_orders, on=type_keys)[state_tables['totals']]
+
+    new_state = {
+        'totals': new_totals,
+        'games': pd.concat([games, new_games[state_tables['games']]], ignore_index=True),
+        'features': pd.concat([state['features'], scored], ignore_index=True) if len(state['features']) else scored,
+    }
+    return new_state, scored
+
+
+def update_fatigue_state(season: int, df: pd.DataFrame = None):
+    """
+    Folds games not yet seen into the stored fatigue state and returns their scored rows.
+
+    With `df=None` the games are read from the league store, starting at the latest date
+    already folded in (later games on that date may be new).
+    """
+    state = load_fatigue_state(season, features=False)
+    if df is None:
+        last_date = state['games']['game_date'].max() if len(state['games']) else None
+        date_filter = ds.field('game_date') >= last_date if last_date is not None else None
+        df = read_league(season, columns=fatigue_input_columns, filter=date_filter)
+    state, scored = fold_games(state, df)
+    if not scored.empty:
+        save_fatigue_state(state, scored, season)
+    return scored
+
+
+def fatigue_history(pitcher_id: int, season: int):
+    """
+    The stored fatigue features for one pitcher, in create_fatigue_features' layout.
+    """
+    parts = features_parts(season, current_version(season))
+    if not parts:
+        return pd.DataFrame(columns=fatigue_columns)
+    features = pq.read_table(parts, filters=[('pitcher', '=', pitcher_id)]).to_pandas()
+    return features[fatigue_columns].reset_index(drop=True)
+
+
+def watch_fatigue(season: int, interval_minutes: float = 60, fetch: bool = True):
+    """
+    Every `interval_minutes`, pulls newly finished dates into the league store (if `fetch`)
+    and scores only the games not seen before, logging any fatigue flags.
+    """
+    while True:
+        start = time.perf_counter()
+        if fetch:
+            added = extend_league_store(season)
+            if added:
+                logging.info(f"Added {added} pitches to the {season} league store")
+        scored = update_fatigue_state(season)
+        flagged = scored[scored['fatigue_flag'] == 1]
+        logging.info(f"Scored {scored['game_pk'].nunique()} new games in {time.perf_counter() - start:.1f}s, "
+                     f"{flagged['pitcher'].nunique()} pitchers flagged")
+        for row in flagged.itertuples():
+            logging.info(f"Fatigue: pitcher {row.pitcher}, {row.game_date:%Y-%m-%d} {row.pitch_type}: "
+                         f"velo {row.velocity_drop:+.2f}, spin {row.spin_drop:+.0f}, command {row.command_drop:+.2f}")
+        time.sleep(interval_minutes * 60)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Update per-pitcher fatigue state with games not seen yet.")
+    parser.add_argument('--season', type=int, required=True)
+    parser.add_argument('--watch', action='store_true', help="Keep running and update every --interval minutes")
+    parser.add_argument('--interval', type=float, default=60)
+    parser.add_argument('--no-fetch', action='store_true', help="Only use games already in the league store")
+    args = parser.parse_args()
+
+    if args.watch:
+        watch_fatigue(args.season, args.interval, fetch=not args.no_fetch)
+    else:
+        if not args.no_fetch:
+            extend_league_store(args.season)
+        scored = update_fatigue_state(args.season)
+        print(scored[scored['fatigue_flag'] == 1].to_string(index=False))
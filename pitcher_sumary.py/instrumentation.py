@@ -0,0 +1,147 @@
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+
+# Metrics are collected only when enabled; otherwise stage() and count() return immediately.
+# Setting PITCHER_METRICS_DIR turns collection on and is where run reports are written.
+metrics_dir = os.environ.get('PITCHER_METRICS_DIR')
+enabled = bool(metrics_dir)
+
+timings = defaultdict(float)
+calls = defaultdict(int)
+counters = defaultdict(float)
+local = threading.local()
+# The dashboard server updates metrics from several request threads at once
+lock = threading.Lock()
+
+
+def enable(flag: bool = True):
+    global enabled
+    enabled = flag
+
+
+def reset():
+    with lock:
+        timings.clear()
+        calls.clear()
+        counters.clear()
+
+
+class Stage:
+    """
+    Times a named pipeline stage. Nested stages are recorded as 'outer/inner'.
+    """
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        stack = getattr(local, 'stack', None)
+        if stack is None:
+            stack = local.stack = []
+        stack.append(self.name)
+        self.path = '/'.join(stack)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self.start
+        with lock:
+            timings[self.path] += elapsed
+            calls[self.path] += 1
+        local.stack.pop()
+        return False
+
+
+class NoStage:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+no_stage = NoStage()
+
+
+def stage(name: str):
+    return Stage(name) if enabled else no_stage
+
+
+def count(name: str, value: float = 1):
+    if enabled:
+        with lock:
+            counters[name] += value
+
+
+def count_http(response):
+    """
+    Records one HTTP request and the size of its body.
+    """
+    if enabled:
+        with lock:
+            counters['http_requests'] += 1
+            counters['http_bytes'] += len(response.content)
+
+
+def count_cache(cache: str, hit: bool):
+    if enabled:
+        with lock:
+            counters[f"cache_{'hits' if hit else 'misses'}.{cache}"] += 1
+
+
+def report():
+    with lock:
+        return {
+            'stages': {path: {'seconds': timings[path], 'calls': calls[path]} for path in timings},
+            'counters': dict(counters),
+        }
+
+
+def prometheus_text(prefix: str = 'pitcher_dashboard'):
+    """
+    The current metrics in Prometheus text exposition format.
+
+    Counters named 'metric.kind' are exported as one metric with a kind label, so all of a
+    metric's samples follow its single TYPE line.
+    """
+    with lock:
+        stage_timings, stage_calls = sorted(timings.items()), sorted(calls.items())
+        by_metric = defaultdict(list)
+        for name, value in counters.items():
+            metric, _, kind = name.partition('.')
+            by_metric[metric].append((kind, value))
+
+    lines = [f"# TYPE {prefix}_stage_seconds gauge"]
+    for path, seconds in stage_timings:
+        lines.append(f'{prefix}_stage_seconds{{stage="{path}"}} {seconds:.6f}')
+    lines.append(f"# TYPE {prefix}_stage_calls counter")
+    for path, n in stage_calls:
+        lines.append(f'{prefix}_stage_calls{{stage="{path}"}} {n}')
+    for metric in sorted(by_metric):
+        lines.append(f"# TYPE {prefix}_{metric} counter")
+        for kind, value in sorted(by_metric[metric]):
+            labels = f'{{kind="{kind}"}}' if kind else ''
+            lines.append(f"{prefix}_{metric}{labels} {value:g}")
+    return '\n'.join(lines) + '\n'
+
+
+def write_report(run_name: str, directory: str = None, prometheus: bool = True):
+    """
+    Writes the run's metrics as JSON (and optionally a Prometheus .prom file) and returns the JSON path.
+    """
+    directory = directory or metrics_dir
+    if not enabled or not directory:
+        return None
+    os.makedirs(directory, exist_ok=True)
+    data = report()
+    data['run'] = run_name
+    data['finished_at'] = time.strftime('%Y-%m-%dT%H:%M:%S')
+    path = os.path.join(directory, f"{run_name}.json")
+    with open(path, 'w') as f:
+        json.dump(data, f, indent=2)
+    if prometheus:
+        with open(os.path.join(directory, f"{run_name}.prom"), 'w') as f:
+            f.write(prometheus_text())
+    return path
@@ -0,0 +1,280 @@
+import os
+import numpy as np
+import pandas as pd
+import pyarrow.dataset as ds
+from preprocessing import df_processing, add_group_rates
+from store import has_league_store, read_league
+from kde import linear_bins, kde_from_counts, velocity_grid
+from sketch import QuantileDigest, default_compression, digests_from_table, table_from_digests
+from constants import cache_dir, color_stats
+
+# Reference table column -> raw Statcast column averaged into it
+mean_columns = {
+    'release_speed': 'release_speed',
+    'pfx_z': 'pfx_z',
+    'pfx_x': 'pfx_x',
+    'release_spin_rate': 'release_spin_rate',
+    'release_pos_x': 'release_pos_x',
+    'release_pos_z': 'release_pos_z',
+    'release_extension': 'release_extension',
+    'xwoba': 'estimated_woba_using_speedangle',
+}
+count_columns = ['swing', 'whiff', 'in_zone', 'out_zone', 'chase']
+
+# Raw columns the league aggregation reads
+league_columns = ['game_date', 'pitch_type', 'description', 'zone', 'delta_run_exp'] + list(dict.fromkeys(mean_columns.values()))
+velocity_columns = ['game_date', 'pitch_type', 'release_speed']
+pitcher_columns = league_columns + ['pitcher']
+
+# A pitcher's pitch type counts towards the league percentiles once it has this many pitches
+min_percentile_pitches = 50
+
+
+def league_reference_dir(season: int):
+    return os.path.join(cache_dir, 'league_reference', str(season))
+
+
+def daily_sums(df: pd.DataFrame, by: str = None):
+    """
+    Reduces raw league pitches to additive totals per (game_date, pitch_type), or per
+    (game_date, `by`, pitch_type) with `by` set (e.g. 'pitcher').
+
+    Rows without a pitch_type are kept in their own group so the 'All' row counts them,
+    as df_grouping does.
+    """
+    df = df_processing(df)
+    keys = ['game_date'] + ([by] if by else []) + ['pitch_type']
+    sums = pd.DataFrame({
+        'game_date': pd.to_datetime(df['game_date']).to_numpy(),
+        **({by: df[by].to_numpy()} if by else {}),
+        'pitch_type': df['pitch_type'].astype(object).to_numpy(),
+        'pitch': df['pitch_type'].notna().to_numpy(),
+        'delta_run_exp': df['delta_run_exp'].to_numpy(dtype='float64'),
+    })
+    for name, col in mean_columns.items():
+        sums[f"{name}_sum"] = df[col].to_numpy(dtype='float64')
+        sums[f"{name}_n"] = df[col].notna().to_numpy()
+    for col in count_columns:
+        sums[col] = df[col].to_numpy()
+    return sums.groupby(keys, dropna=False).sum().reset_index()
+
+
+def reference_from_sums(sums: pd.DataFrame):
+    """
+    Builds the league reference table (df_grouping's columns, plus an 'All' row) from daily sums.
+    """
+    value_columns = [c for c in sums.columns if c not in ('game_date', 'pitch_type')]
+    totals = sums.groupby('pitch_type', dropna=False)[value_columns].sum()
+    grand_total = totals.sum()
+    totals = totals[totals.index.notna()]
+
+    means = {name: totals[f"{name}_sum"] / totals[f"{name}_n"].replace(0, np.nan) for name in mean_columns}
+    df_group = pd.DataFrame({'pitch': totals['pitch']})
+    for name in mean_columns:
+        if name != 'xwoba':
+            df_group[name] = means[name]
+    df_group['delta_run_exp'] = totals['delta_run_exp']
+    for col in count_columns:
+        df_group[col] = totals[col]
+    df_group['xwoba'] = means['xwoba']
+    df_group = add_group_rates(df_group.rename_axis('pitch_type').reset_index())
+
+    pitch = grand_total['pitch']
+    all_row = pd.DataFrame(data={
+        'pitch_type': 'All',
+        'pitch_description': 'All',
+        'pitch': pitch,
+        'pitch_usage': 1,
+        'release_extension': grand_total['release_extension_sum'] / grand_total['release_extension_n'],
+        'delta_run_exp_per_100': grand_total['delta_run_exp'] / pitch * -100,
+        'whiff_rate': grand_total['whiff'] / grand_total['swing'],
+        'in_zone_rate': grand_total['in_zone'] / pitch,
+        'chase_rate': grand_total['chase'] / grand_total['out_zone'],
+        'xwoba': grand_total['xwoba_sum'] / grand_total['xwoba_n'],
+    }, index=[0])
+    return pd.concat([df_group, all_row], ignore_index=True)
+
+
+def pitcher_values_from_sums(sums: pd.DataFrame, min_pitches: int = min_percentile_pitches):
+    """
+    Each pitcher's season value of every colored stat, per pitch type and overall ('All'),
+    from per-pitcher daily sums (daily_sums(df, by='pitcher')). Pitch types thrown fewer
+    than `min_pitches` times are left out.
+    """
+    value_columns = [c for c in sums.columns if c not in ('game_date', 'pitcher', 'pitch_type')]
+    overall = sums.groupby('pitcher')[value_columns].sum().assign(pitch_type='All')
+    by_type = sums[sums['pitch_type'].notna()].groupby(['pitcher', 'pitch_type'])[value_columns].sum()
+    totals = pd.concat([by_type.reset_index('pitch_type'), overall]).reset_index()
+    totals = totals[totals['pitch'] >= min_pitches]
+
+    values = totals[['pitcher', 'pitch_type']].copy()
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for name in mean_columns:
+            values[name] = totals[f"{name}_sum"] / totals[f"{name}_n"]
+        values['whiff_rate'] = totals['whiff'] / totals['swing']
+        values['in_zone_rate'] = totals['in_zone'] / totals['pitch']
+        values['chase_rate'] = totals['chase'] / totals['out_zone']
+        values['delta_run_exp_per_100'] = -totals['delta_run_exp'] / totals['pitch'] * 100
+    return values.replace([np.inf, -np.inf], np.nan).reset_index(drop=True)
+
+
+def percentile_table(values: pd.DataFrame, compression: int = default_compression):
+    """
+    One QuantileDigest per (pitch_type, stat) over pitchers' values (see pitcher_values_from_sums),
+    stored as a long table of centroids: pitch_type, stat, mean, weight.
+    """
+    digests = {(pitch_type, stat): QuantileDigest.from_values(group[stat].to_numpy(dtype='float64'),
+                                                             compression=compression)
+               for pitch_type, group in values.groupby('pitch_type')
+               for stat in color_stats if stat in group.columns}
+    return table_from_digests(digests)
+
+
+def merge_percentile_tables(tables: list):
+    """
+    Merges percentile tables (e.g. of several seasons) digest by digest.
+    """
+    merged = {}
+    for table in tables:
+        for key, digest in digests_from_table(table).items():
+            merged[key] = merged[key].merge(digest) if key in merged else digest
+    return table_from_digests(merged)
+
+
+def daily_velocity_bins(df: pd.DataFrame):
+    """
+    Reduces raw league pitches to linearly binned velocity counts per (game_date, pitch_type),
+    kept sparse: one row per occupied grid point.
+    """
+    df = df[df['pitch_type'].notna() & df['release_speed'].notna()]
+    lower, lower_weight = linear_bins(df['release_speed'].to_numpy(dtype='float64'))
+    game_date = pd.to_datetime(df['game_date']).to_numpy()
+    pitch_type = df['pitch_type'].astype(object).to_numpy()
+    bins = pd.DataFrame({
+        'game_date': np.concatenate([game_date, game_date]),
+        'pitch_type': np.concatenate([pitch_type, pitch_type]),
+        'bin': np.concatenate([lower, lower + 1]).astype('int16'),
+        'weight': np.concatenate([lower_weight, 1 - lower_weight]),
+    })
+    bins = bins.groupby(['game_date', 'pitch_type', 'bin']).sum().reset_index()
+    return bins[bins['weight'] > 0].reset_index(drop=True)
+
+
+def velocity_curves_from_bins(bins: pd.DataFrame):
+    """
+    League velocity density per pitch type on kde.velocity_grid: one row per pitch type,
+    one column per grid point (named by its speed, e.g. '94.5').
+    """
+    totals = bins.groupby(['pitch_type', 'bin'])['weight'].sum()
+    pitch_types = totals.index.get_level_values('pitch_type').unique()
+    counts = np.zeros((len(pitch_types), len(velocity_grid)))
+    counts[pitch_types.get_indexer(totals.index.get_level_values('pitch_type')),
+           totals.index.get_level_values('bin')] = totals.to_numpy()
+    densities = kde_from_counts(counts)
+    return pd.DataFrame(densities, index=pd.Index(pitch_types, name='pitch_type'),
+                        columns=[f"{v:.1f}" for v in velocity_grid])
+
+
+def write_parquet(df: pd.DataFrame, path: str, index: bool = False):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    df.to_parquet(path + '.tmp', index=index)
+    os.replace(path + '.tmp', path)
+
+
+def update_daily_table(table_path: str, season: int, df: pd.DataFrame, reduce, columns: list):
+    """
+    Folds new game dates into a stored per-date table and returns the whole table.
+
+    With `df=None` the new dates are read from the league store; otherwise `df` is raw
+    league pitch data holding only whole game dates; dates already aggregated are skipped,
+    so each date is reduced once. Returns None if there is nothing stored or new.
+    """
+    table = pd.read_parquet(table_path) if os.path.exists(table_path) else None
+    last_date = table['game_date'].max() if table is not None else None
+
+    if df is None:
+        # Re-read the last aggregated date too, in case its games were still in progress
+        date_filter = ds.field('game_date') >= last_date if last_date is not None else None
+        df = read_league(season, columns=columns, filter=date_filter)
+        if table is not None and not df.empty:
+            table = table[table['game_date'] < last_date]
+    elif last_date is not None:
+        df = df[pd.to_datetime(df['game_date']) > last_date]
+
+    if not df.empty:
+        new_rows = reduce(df)
+        table = new_rows if table is None else pd.concat([table, new_rows], ignore_index=True)
+        write_parquet(table, table_path)
+    return table
+
+
+def update_league_reference(season: int, df: pd.DataFrame = None):
+    """
+    Folds new game dates into the stored daily sums, per-pitcher daily sums and velocity
+    bins, and rewrites the reference table, the league percentile digests and the league
+    velocity curves.
+
+    With `df=None` the new dates are read from the league store; otherwise `df` is raw
+    league pitch data holding only whole game dates (see update_daily_table).
+    """
+    path = league_reference_dir(season)
+    sums = update_daily_table(os.path.join(path, 'daily_sums.parquet'), season, df, daily_sums, league_columns)
+    bins = update_daily_table(os.path.join(path, 'velocity_bins.parquet'), season, df, daily_velocity_bins,
+                              velocity_columns)
+    if bins is not None and not bins.empty:
+        write_parquet(velocity_curves_from_bins(bins), os.path.join(path, 'velocity_curves.parquet'), index=True)
+    pitcher_sums = update_daily_table(os.path.join(path, 'pitcher_sums.parquet'), season, df,
+                                      lambda df: daily_sums(df, by='pitcher'), pitcher_columns)
+    if pitcher_sums is not None and not pitcher_sums.empty:
+        write_parquet(percentile_table(pitcher_values_from_sums(pitcher_sums)), os.path.join(path, 'percentiles.parquet'))
+
+    if sums is None:
+        return pd.DataFrame()
+
+    reference = reference_from_sums(sums)
+    write_parquet(reference, os.path.join(path, 'reference.parquet'))
+    return reference
+
+
+def load_league_reference(season: int):
+    """
+    Returns the stored league reference table for a season, building it from the league
+    store the first time. Returns None if neither exists.
+    """
+    reference_path = os.path.join(league_reference_dir(season), 'reference.parquet')
+    if os.path.exists(reference_path):
+        return pd.read_parquet(reference_path)
+    if has_league_store(season):
+        return update_league_reference(season)
+    return None
+
+
+def load_league_velocity_curves(season: int):
+    """
+    Returns the stored league velocity curves for a season (see velocity_curves_from_bins),
+    building them from the league store if needed. Returns None if neither exists.
+    """
+    curves_path = os.path.join(league_reference_dir(season), 'velocity_curves.parquet')
+    if not os.path.exists(curves_path) and has_league_store(season):
+        update_league_reference(season)
+    if os.path.exists(curves_path):
+        return pd.read_parquet(curves_path)
+    return None
+
+
+def load_league_percentiles(season: int, prior_seasons: int = 0):
+    """
+    Returns the league percentile digests for a season (see percentile_table), merged with
+    those of the `prior_seasons` seasons before it that are available, building them from
+    the league store if needed. Returns None if none exist.
+    """
+    tables = []
+    for year in range(season - prior_seasons, season + 1):
+        path = os.path.join(league_reference_dir(year), 'percentiles.parquet')
+        if not os.path.exists(path) and has_league_store(year):
+            update_league_reference(year)
+        if os.path.exists(path):
+            tables.append(pd.read_parquet(path))
+    if not tables:
+        return None
+    return tables[0] if len(tables) == 1 else merge_percentile_tables(tables)
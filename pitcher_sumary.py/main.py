@@ -1,11 +1,14 @@
 import logging
 import sys
+import time
+import pandas as pd
 from data_load import load_pitch_data, load_statcast_grouped
-from preprocessing import df_processing
 from dashboard import pitching_dashboard
 from data_load import get_player_id
 from constants import stats
-from fatigue import create_fatigue_features
+from pipeline import build_artifacts
+from league import load_league_velocity_curves, load_league_percentiles
+from instrumentation import stage, write_report
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -22,33 +25,44 @@ def main(pitcher_id, season, stats):
     """
     try:
         logging.info(f"Loading Statcast data for pitcher ID {pitcher_id} and season {season}...")
-        df_pyb = load_pitch_data(pitcher_id, season)
+        with stage('load_pitch_data'):
+            df_pyb = load_pitch_data(pitcher_id, season)
         if df_pyb.empty:
             logging.error("Pitcher data is empty. Please check the pitcher ID or data source.")
             return
 
         logging.info("Loading league-wide grouped Statcast data...")
-        statcast_grouped_df = load_statcast_grouped(season)
+        with stage('load_statcast_grouped'):
+            statcast_grouped_df = load_statcast_grouped(season)
         if statcast_grouped_df.empty:
             logging.error("League-wide data is empty. Please check the data source.")
             return
+        league_curves = load_league_velocity_curves(season)
+        league_percentiles = load_league_percentiles(season)
 
         logging.info("Processing pitcher's game-by-game data...")
-        df_processed = df_processing(df_pyb)
+        df_processed = build_artifacts(['processed'], raw=df_pyb)['processed']
         if df_processed.empty:
             logging.error("Processed data is empty. Please check the input data or processing logic.")
             return
         logging.info("Calculating fatigue features...")
         try:
-            fatigue_df = create_fatigue_features(df_processed)
+            fatigue_df = build_artifacts(['fatigue'], raw=df_pyb)['fatigue']
         except Exception as e:
             logging.warning(f"Could not calculate fatigue features: {e}")
+            fatigue_df = pd.DataFrame()
 
         logging.info("Running the pitching dashboard...")
-        pitching_dashboard(pitcher_id, df_processed, stats, statcast_grouped_df, season, fatigue_df)
+        with stage('pitching_dashboard'):
+            pitching_dashboard(pitcher_id, df_pyb, stats, statcast_grouped_df, season, fatigue_df,
+                               league_curves=league_curves, league_percentiles=league_percentiles)
         logging.info("Dashboard successfully launched.")
     except Exception as e:
         logging.exception(f"An error occurred: {e}")
+    finally:
+        report_path = write_report(f"dashboard_{pitcher_id}_{season}_{time.strftime('%Y%m%dT%H%M%S')}")
+        if report_path:
+            logging.info(f"Run metrics written to {report_path}")
 
 
 if __name__ == "__main__":
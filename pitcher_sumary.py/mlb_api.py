@@ -0,0 +1,180 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import Future
+from io import BytesIO
+import numpy as np
+import requests
+from PIL import Image
+from requests.adapters import HTTPAdapter
+from instrumentation import count_cache, count_http
+from constants import cache_dir, image_dict, image_max_age_hours, mlb_api_max_age_hours
+
+
+def new_session():
+    s = requests.Session()
+    s.mount('https://', HTTPAdapter(pool_connections=8, pool_maxsize=32))
+    return s
+
+
+# One keep-alive session shared by every request the visuals make
+session = new_session()
+
+
+def reset_session():
+    """
+    Replaces the shared session; forked worker processes call this so they do not
+    reuse sockets opened by the parent.
+    """
+    global session
+    session = new_session()
+
+
+# Completed results (key -> (fetch time, max age in hours, value)) and requests currently being
+# fetched (key -> Future). Least recently used results are dropped past max_memo_entries so a
+# long-running process holds a bounded number of decoded images.
+memo = {}
+in_flight = {}
+lock = threading.Lock()
+max_memo_entries = 512
+
+
+def remember(key: str, value, max_age_hours: float = mlb_api_max_age_hours):
+    """
+    Stores a value in the memo for `max_age_hours` (also used to seed it for offline renders).
+    """
+    with lock:
+        memo.pop(key, None)
+        memo[key] = (time.time(), max_age_hours, value)
+        while len(memo) > max_memo_entries:
+            del memo[next(iter(memo))]
+
+
+def fetch_once(key: str, fetch, max_age_hours: float = mlb_api_max_age_hours):
+    """
+    Returns the memoized value for `key` if it was fetched less than `max_age_hours` ago,
+    otherwise calls `fetch()`.
+
+    Concurrent callers asking for a key that is already being fetched wait on that fetch
+    instead of starting their own.
+    """
+    with lock:
+        entry = memo.get(key)
+        if entry is not None and time.time() - entry[0] < entry[1] * 3600:
+            count_cache('mlb_api_memory', hit=True)
+            # Move to the end so eviction drops the least recently used
+            memo[key] = memo.pop(key)
+            return entry[2]
+        future = in_flight.get(key)
+        owner = future is None
+        if owner:
+            future = Future()
+            in_flight[key] = future
+
+    if not owner:
+        return future.result()
+
+    try:
+        value = fetch()
+    except Exception as e:
+        future.set_exception(e)
+        raise
+    else:
+        remember(key, value, max_age_hours)
+        future.set_result(value)
+        return value
+    finally:
+        with lock:
+            in_flight.pop(key, None)
+
+
+def disk_path(kind: str, key: str, ext: str):
+    name = hashlib.sha1(key.encode('utf-8')).hexdigest()
+    return os.path.join(cache_dir, kind, f"{name}.{ext}")
+
+
+def is_fresh(path: str, max_age_hours: float):
+    return os.path.exists(path) and time.time() - os.path.getmtime(path) < max_age_hours * 3600
+
+
+def get_json(url: str, persist: bool = False, max_age_hours: float = mlb_api_max_age_hours):
+    """
+    GETs a JSON endpoint through the shared session; responses are reused for `max_age_hours`.
+    With `persist=True` the response is also kept on disk, for data that rarely changes such
+    as team records.
+    """
+    def fetch():
+        path = disk_path('mlb_api', url, 'json')
+        if persist and os.path.exists(path):
+            count_cache('mlb_api_disk', hit=True)
+            with open(path) as f:
+                return json.load(f)
+        response = session.get(url)
+        count_http(response)
+        response.raise_for_status()
+        data = response.json()
+        if persist:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path + '.tmp', 'w') as f:
+                json.dump(data, f)
+            os.replace(path + '.tmp', path)
+        return data
+
+    return fetch_once(url, fetch, max_age_hours)
+
+
+def get_image(url: str, max_age_hours: float = image_max_age_hours):
+    """
+    Returns an image as a decoded NumPy array, cached in memory and on disk as .npy, both
+    for `max_age_hours`.
+    """
+    def fetch():
+        path = disk_path('images', url, 'npy')
+        if is_fresh(path, max_age_hours):
+            count_cache('images_disk', hit=True)
+            return np.load(path)
+        count_cache('images_disk', hit=False)
+        response = session.get(url)
+        count_http(response)
+        response.raise_for_status()
+        img = np.asarray(Image.open(BytesIO(response.content)))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path + '.tmp', 'wb') as f:
+            np.save(f, img)
+        os.replace(path + '.tmp', path)
+        return img
+
+    return fetch_once('image:' + url, fetch, max_age_hours)
+
+
+def get_person(pitcher_id):
+    url = f"https://statsapi.mlb.com/api/v1/people?personIds={pitcher_id}&hydrate=currentTeam"
+    return get_json(url)['people'][0]
+
+
+def get_team_abbreviation(pitcher_id):
+    team_link = get_person(pitcher_id)['currentTeam']['link']
+    team_data = get_json('https://statsapi.mlb.com/' + team_link, persist=True)
+    return team_data['teams'][0]['abbreviation']
+
+
+def headshot_url(pitcher_id):
+    return f'https://img.mlbstatic.com/mlb-photos/image/upload/d_people:generic:headshot:67:current.png/w_640,q_auto:best/v1/people/{pitcher_id}/headshot/silo/current.png'
+
+
+def get_headshot(pitcher_id):
+    return get_image(headshot_url(pitcher_id))
+
+
+def get_team_logo(team_abb: str):
+    return get_image(image_dict[team_abb])
+
+
+def prefetch_team_logos():
+    """
+    Warms the image cache with every team logo in `image_dict`.
+    """
+    for team_abb in image_dict:
+        get_team_logo(team_abb)
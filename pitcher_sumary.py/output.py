@@ -0,0 +1,111 @@
+import logging
+import os
+import time
+import matplotlib.pyplot as plt
+from matplotlib.collections import PathCollection, PolyCollection
+from instrumentation import count
+
+output_formats = ['pdf', 'png', 'svg']
+
+# Resolutions tried, highest first, when a save is over its size budget
+fallback_dpis = [200, 150, 100, 72]
+
+# Highest resolution of rasterized layers in vector files. Each axes holding one is drawn
+# into a full-figure image, so on the 20 x 28 in dashboard a save takes ~1.6s at 150 dpi
+# and ~10s at 300 dpi.
+max_raster_dpi = 150
+
+
+def dashboard_path(pitcher_id: int, season: int, output_dir: str = '.', fmt: str = 'pdf'):
+    """
+    Per-pitcher output file, so renders of different pitchers never overwrite each other.
+    """
+    return os.path.join(output_dir, f"pitching_dashboard_{pitcher_id}_{season}.{fmt}")
+
+
+def rasterize_data_layers(fig: plt.Figure, rasterize: bool = True):
+    """
+    Marks scatter layers and filled areas (e.g. the pitch break scatter and KDE fills) to be
+    drawn as images inside vector output, or unmarks them. Text, lines and tables stay
+    vectors. Returns the number of layers marked.
+    """
+    marked = 0
+    for ax in fig.axes:
+        for collection in ax.collections:
+            if isinstance(collection, (PathCollection, PolyCollection)):
+                collection.set_rasterized(rasterize)
+                marked += 1 if rasterize else 0
+    return marked
+
+
+def save_figure(fig: plt.Figure, path: str, fmt: str, dpi: int, crop: bool = True):
+    start = time.perf_counter()
+    fig.savefig(path, format=fmt, bbox_inches="tight" if crop else None, dpi=dpi)
+    return time.perf_counter() - start, os.path.getsize(path)
+
+
+def save_dashboard(fig: plt.Figure, output_path: str, fmt: str = None, dpi: int = 300, rasterize: bool = False,
+                   max_bytes: int = None, warn_seconds: float = None, crop: bool = True):
+    """
+    Saves a dashboard figure and reports how long the save took and how big the file is.
+
+    The format comes from `fmt` or the file extension (pdf, png or svg). With `rasterize`,
+    scatter and fill layers are embedded as images in vector formats, at `dpi` up to
+    max_raster_dpi. If the file is larger than `max_bytes` it is saved again: a vector file
+    first with those layers rasterized, then at lower resolutions until it fits or the lowest
+    resolution is reached. A vector file with no layers to rasterize is not saved again,
+    since its size does not depend on the resolution.
+
+    `warn_seconds` only reports: a save slower than it is logged and counted as over budget,
+    but the file is not saved differently.
+
+    `crop` trims the file to the drawn content, which costs matplotlib a second draw of the
+    figure; a figure whose layout already fills it can be saved whole instead.
+
+    Returns a dict with the path, format, dpi, number of rasterized layers, bytes, seconds and
+    whether the budget was met.
+    """
+    fmt = fmt or os.path.splitext(output_path)[1].lstrip('.').lower() or 'pdf'
+    if fmt not in output_formats:
+        raise ValueError(f"Unsupported dashboard format {fmt!r}; expected one of {output_formats}")
+    if os.path.dirname(output_path):
+        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+
+    rasterized_layers = rasterize_data_layers(fig, rasterize)
+    if fmt != 'png' and rasterized_layers and dpi > max_raster_dpi:
+        logging.info(f"Rasterized layers in {output_path} are drawn at {max_raster_dpi} dpi, "
+                     f"not the requested {dpi} (see max_raster_dpi)")
+        dpi = max_raster_dpi
+    seconds, size = save_figure(fig, output_path, fmt, dpi, crop)
+    total_seconds = seconds
+
+    if max_bytes and size > max_bytes:
+        retry_dpis = [d for d in fallback_dpis if d < dpi]
+        if fmt != 'png' and not rasterized_layers:
+            # Rasterizing alone may be enough for vector formats; without any layer to
+            # rasterize, a lower resolution would not change the file
+            rasterized_layers = rasterize_data_layers(fig, True)
+            if rasterized_layers and dpi > max_raster_dpi:
+                logging.info(f"Rasterized layers in {output_path} are drawn at {max_raster_dpi} dpi, "
+                             f"not the requested {dpi} (see max_raster_dpi)")
+            dpi = min(dpi, max_raster_dpi)
+            retry_dpis = [dpi] + [d for d in retry_dpis if d < dpi] if rasterized_layers else []
+        for fallback_dpi in retry_dpis:
+            dpi = fallback_dpi
+            seconds, size = save_figure(fig, output_path, fmt, dpi, crop)
+            total_seconds += seconds
+            if size <= max_bytes:
+                break
+
+    within_budget = (not max_bytes or size <= max_bytes) and (not warn_seconds or total_seconds <= warn_seconds)
+    report = {'path': output_path, 'format': fmt, 'dpi': dpi, 'rasterized_layers': rasterized_layers, 'bytes': size,
+              'seconds': total_seconds, 'within_budget': within_budget}
+
+    count('output_bytes', size)
+    count('output_files')
+    logging.info(f"Saved {output_path}: {size / 2 ** 20:.2f} MB in {total_seconds:.2f}s "
+                 f"({fmt}, dpi={dpi}{f', {rasterized_layers} layers rasterized' if rasterized_layers else ''})")
+    if not within_budget:
+        logging.warning(f"{output_path} is over its output budget: {size / 2 ** 20:.2f} MB "
+                        f"in {total_seconds:.2f}s")
+    return report
@@ -0,0 +1,202 @@
+import hashlib
+import logging
+import os
+import pickle
+import time
+import pandas as pd
+import pyarrow.parquet as pq
+from preprocessing import df_processing, df_grouping, pitch_table_cells, tto_grouping
+from fatigue import create_fatigue_features
+from usage import rolling_usage
+from instrumentation import stage, count_cache
+from constants import cache_dir
+
+# Bump when an artifact's computation changes so stale persisted artifacts are not reused
+artifact_version = 2
+
+# Persist derived artifacts under cache_dir so later runs can reuse them
+persist_artifacts = True
+
+# Persisted artifacts unused for this long are deleted, as are the least recently used ones
+# past the size cap. Pruning runs at most once per prune_interval_seconds in a process.
+max_artifact_age_days = 14
+max_artifact_bytes = 2 * 2 ** 30
+prune_interval_seconds = 3600
+last_pruned = 0
+
+
+def table_cells(grouped, league_reference, league_percentiles):
+    df_group, _ = grouped
+    return pitch_table_cells(df_group, league_reference, league_percentiles)
+
+
+# The dashboard's dependency graph: artifact -> (function, input artifacts).
+# Inputs that are not artifacts here ('raw', 'league_reference', 'league_percentiles', 'usage_window') are sources.
+dashboard_graph = {
+    'processed': (df_processing, ['raw']),
+    'grouped': (df_grouping, ['processed']),
+    'table_cells': (table_cells, ['grouped', 'league_reference', 'league_percentiles']),
+    'tto': (tto_grouping, ['processed']),
+    'fatigue': (create_fatigue_features, ['processed']),
+    'usage': (rolling_usage, ['processed', 'usage_window']),
+}
+
+# Computed artifacts by key; the key is a hash of the artifact name and its inputs' keys.
+# Least recently used entries are dropped past max_memo_artifacts so long-running processes stay bounded.
+artifact_memo = {}
+max_memo_artifacts = 256
+
+
+def content_hash(value):
+    """
+    Hashes a source value by content: DataFrames by their values, index, columns and dtypes.
+    """
+    h = hashlib.sha1()
+    if isinstance(value, pd.DataFrame):
+        h.update(pd.util.hash_pandas_object(value, index=True).to_numpy().tobytes())
+        h.update(repr([(str(c), str(t)) for c, t in value.dtypes.items()]).encode('utf-8'))
+    else:
+        h.update(repr(value).encode('utf-8'))
+    return h.hexdigest()
+
+
+def artifact_path(name: str, key: str, ext: str = 'pkl'):
+    return os.path.join(cache_dir, 'artifacts', f"{name}-{key}.{ext}")
+
+
+def read_frame(path: str):
+    """
+    Reads a parquet artifact, turning string columns that were stored from object columns
+    back into object columns (pandas would otherwise read them as its string dtype).
+    """
+    df = pd.read_parquet(path)
+    stored = pq.read_schema(path).pandas_metadata or {}
+    object_names = {c['name'] for c in stored.get('columns', []) if c.get('numpy_type') == 'object'}
+    df = df.astype({c: object for c in df.columns if c in object_names})
+    if df.index.name in object_names:
+        df.index = df.index.astype(object)
+    return df
+
+
+def load_persisted(name: str, key: str):
+    """
+    Returns (True, value) for an artifact persisted by an earlier run, else (False, None).
+    Reading an artifact refreshes its modification time, so pruning drops the least recently used.
+    """
+    for ext in ('parquet', 'pkl'):
+        path = artifact_path(name, key, ext)
+        if not os.path.exists(path):
+            continue
+        if ext == 'parquet':
+            value = read_frame(path)
+        else:
+            with open(path, 'rb') as f:
+                value = pickle.load(f)
+        os.utime(path)
+        return True, value
+    return False, None
+
+
+def persist(name: str, key: str, value):
+    """
+    Writes an artifact under cache_dir: DataFrames as parquet, anything else pickled.
+    """
+    if isinstance(value, pd.DataFrame):
+        path = artifact_path(name, key, 'parquet')
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        value.to_parquet(path + '.tmp')
+    else:
+        path = artifact_path(name, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path + '.tmp', 'wb') as f:
+            pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(path + '.tmp', path)
+
+
+def prune_artifacts(max_age_days: float = max_artifact_age_days, max_bytes: int = max_artifact_bytes):
+    """
+    Deletes persisted artifacts not used for `max_age_days`, then the least recently used
+    ones until the rest fit in `max_bytes`. Returns the number of files deleted.
+    """
+    root = os.path.join(cache_dir, 'artifacts')
+    if not os.path.isdir(root):
+        return 0
+    files = []
+    for entry in os.scandir(root):
+        if entry.is_file():
+            stat = entry.stat()
+            files.append((stat.st_mtime, stat.st_size, entry.path))
+    files.sort(reverse=True)
+
+    cutoff = time.time() - max_age_days * 86400
+    kept_bytes, removed = 0, 0
+    for mtime, size, path in files:
+        kept_bytes += size
+        if mtime < cutoff or kept_bytes > max_bytes:
+            try:
+                os.remove(path)
+                removed += 1
+            except OSError:
+                pass
+            kept_bytes -= size
+    return removed
+
+
+def compute_artifact(name: str, key: str, fn, inputs: list):
+    global last_pruned
+    if key in artifact_memo:
+        count_cache('artifacts_memory', hit=True)
+        # Move to the end so eviction drops the least recently used
+        artifact_memo[key] = artifact_memo.pop(key)
+        return artifact_memo[key]
+
+    found, value = load_persisted(name, key) if persist_artifacts else (False, None)
+    if found:
+        count_cache('artifacts_disk', hit=True)
+    else:
+        count_cache('artifacts_disk', hit=False)
+        with stage(name):
+            value = fn(*inputs)
+        if persist_artifacts:
+            try:
+                persist(name, key, value)
+                if time.time() - last_pruned > prune_interval_seconds:
+                    last_pruned = time.time()
+                    prune_artifacts()
+            except (OSError, ValueError, TypeError) as e:
+                logging.warning(f"Could not persist artifact {name}: {e}")
+
+    artifact_memo[key] = value
+    while len(artifact_memo) > max_memo_artifacts:
+        del artifact_memo[next(iter(artifact_memo))]
+    return value
+
+
+def build_artifacts(targets: list, graph: dict = dashboard_graph, **sources):
+    """
+    Computes the requested artifacts and everything they depend on, each at most once.
+
+    Sources are hashed by content; a derived artifact's key is the hash of its name and its
+    inputs' keys. An artifact whose key was already computed (in this process, or on disk
+    from an earlier run) is reused instead of recomputed.
+
+    Returns a dict of artifact name -> value covering the targets and their dependencies.
+    """
+    keys = {name: content_hash(value) for name, value in sources.items()}
+    values = dict(sources)
+
+    def resolve(name):
+        if name in values:
+            return values[name]
+        if name not in graph:
+            raise KeyError(f"Unknown artifact or missing source: {name}")
+        fn, input_names = graph[name]
+        inputs = [resolve(input_name) for input_name in input_names]
+        key_text = '|'.join([str(artifact_version), name] + [keys[i] for i in input_names])
+        keys[name] = hashlib.sha1(key_text.encode('utf-8')).hexdigest()
+        values[name] = compute_artifact(name, keys[name], fn, inputs)
+        return values[name]
+
+    for target in targets:
+        resolve(target)
+    return {name: value for name, value in values.items() if name not in sources}
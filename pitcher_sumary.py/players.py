@@ -0,0 +1,174 @@
+import argparse
+import bisect
+import difflib
+import logging
+import os
+import re
+import unicodedata
+import pandas as pd
+import pybaseball as pyb
+from instrumentation import count_cache
+from constants import cache_dir
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+register_path = os.path.join(cache_dir, 'register', 'players.parquet')
+
+register_columns = ['key_mlbam', 'key_fangraphs', 'name_first', 'name_last', 'name_suffix', 'mlb_played_first',
+                    'mlb_played_last']
+
+# Name suffixes, matched as the last token after a name and used to tell e.g. Jr. from Sr.
+name_suffixes = {'jr', 'sr', 'ii', 'iii', 'iv', 'v'}
+
+# Minimum difflib similarity for a fuzzy match
+fuzzy_cutoff = 0.85
+
+
+def normalize_name(name: str):
+    """
+    Lower-cases a name and strips accents and punctuation ("José Ramírez" -> "jose ramirez").
+    """
+    name = unicodedata.normalize('NFKD', str(name))
+    name = ''.join(c for c in name if not unicodedata.combining(c)).lower()
+    return ' '.join(re.sub(r"[^a-z0-9 ]+", ' ', name.replace("'", '').replace('.', ' ')).split())
+
+
+def split_suffix(name: str):
+    """
+    Normalizes a name and splits off a trailing suffix: "Luis Castillo Jr." -> ("luis castillo",
+    "jr"). Only a token after the name counts, so the initial in "V. Nunez" is kept.
+    """
+    tokens = normalize_name(name).split()
+    if len(tokens) > 1 and tokens[-1] in name_suffixes:
+        return ' '.join(tokens[:-1]), tokens[-1]
+    return ' '.join(tokens), ''
+
+
+def build_register(path: str = register_path):
+    """
+    Downloads the Chadwick register once and keeps the players with an MLBAM id on disk.
+    """
+    df = pyb.chadwick_register()
+    # Some pybaseball versions leave name_suffix out of the register
+    df = df.loc[df['key_mlbam'].fillna(-1).astype(int) > 0, [c for c in register_columns if c in df]].copy()
+    df['key_mlbam'] = df['key_mlbam'].astype(int)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    df.to_parquet(path + '.tmp', index=False)
+    os.replace(path + '.tmp', path)
+    logging.info(f"Stored {len(df)} players in {path}")
+    return df
+
+
+class PlayerRegister:
+    """
+    In-memory indexes over the player register: exact normalized full names, last names,
+    and a sorted list of full names for prefix matches. Players who played most recently
+    come first wherever a name is shared, unless a suffix tells them apart.
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        df = df.assign(last_played=df['mlb_played_last'].fillna(0)).sort_values('last_played', ascending=False)
+        self.ids = df['key_mlbam'].to_numpy()
+        firsts = [normalize_name(n) for n in df['name_first'].fillna('')]
+        # Registers without name_suffix may carry it in the last name ("Griffey Jr.")
+        lasts, suffixes = zip(*(split_suffix(n) for n in df['name_last'].fillna(''))) if len(df) else ((), ())
+        if 'name_suffix' in df:
+            suffixes = [normalize_name(s) or t for s, t in zip(df['name_suffix'].fillna(''), suffixes)]
+        self.full_names = [f"{f} {l}".strip() for f, l in zip(firsts, lasts)]
+        self.first_names = firsts
+        self.suffixes = list(suffixes)
+
+        self.by_full, self.by_last = {}, {}
+        for row, (full, last) in enumerate(zip(self.full_names, lasts)):
+            self.by_full.setdefault(full, []).append(row)
+            self.by_last.setdefault(last, []).append(row)
+        self.sorted_names = sorted(self.by_full)
+
+    def with_suffix(self, rows: list, suffix: str):
+        """
+        The rows whose suffix is `suffix` ('' for none) if there are any, otherwise all of them.
+        """
+        matching = [r for r in rows if self.suffixes[r] == suffix]
+        return matching or rows
+
+    def match_rows(self, name: str):
+        """
+        Register rows for a name, best first: an exact full name, then a last name with a
+        matching first name or initial, then a unique prefix, then a close spelling.
+
+        A suffix picks between players who share a name (Sr. or Jr.). A last name alone only
+        matches if one player has it; otherwise nothing is returned and a warning is logged.
+        """
+        key, suffix = split_suffix(name)
+        if not key:
+            return []
+        if key in self.by_full:
+            return self.with_suffix(self.by_full[key], suffix)
+
+        tokens = key.split()
+        # "J deGrom", "Jake deGrom", or a last name alone; multi-word last names included
+        for split in range(len(tokens)):
+            first, last = ' '.join(tokens[:split]), ' '.join(tokens[split:])
+            rows = [r for r in self.by_last.get(last, []) if self.first_names[r].startswith(first)]
+            if not rows:
+                continue
+            rows = self.with_suffix(rows, suffix)
+            if not first and len(rows) > 1:
+                logging.warning(f"{name!r} matches {len(rows)} players by last name; add a first name or initial")
+                return []
+            return rows
+
+        start = bisect.bisect_left(self.sorted_names, key)
+        prefixed = []
+        for full in self.sorted_names[start:]:
+            if not full.startswith(key):
+                break
+            prefixed.append(full)
+        if len(prefixed) == 1:
+            return self.with_suffix(self.by_full[prefixed[0]], suffix)
+
+        close = difflib.get_close_matches(key, prefixed or self.sorted_names, n=1, cutoff=fuzzy_cutoff)
+        return self.with_suffix(self.by_full[close[0]], suffix) if close else []
+
+    def lookup(self, name: str):
+        rows = self.match_rows(name)
+        return int(self.ids[rows[0]]) if rows else None
+
+    def lookup_many(self, names: list):
+        """
+        Resolves a batch of names (e.g. a roster) to MLBAM ids; unresolved names map to None.
+        """
+        return {name: self.lookup(name) for name in names}
+
+
+# Loaded once per process
+register = None
+
+
+def load_register(refresh: bool = False):
+    """
+    Returns the indexed player register, building the on-disk copy on first use.
+    """
+    global register
+    if register is not None and not refresh:
+        count_cache('register_memory', hit=True)
+        return register
+    if refresh or not os.path.exists(register_path):
+        count_cache('register_disk', hit=False)
+        df = build_register()
+    else:
+        count_cache('register_disk', hit=True)
+        df = pd.read_parquet(register_path)
+    register = PlayerRegister(df)
+    return register
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Resolve player names to MLBAM ids with the local register.")
+    parser.add_argument('names', nargs='*', help='Names to resolve, e.g. "Luis Castillo Jr."')
+    parser.add_argument('--refresh', action='store_true', help="Download the register again")
+    args = parser.parse_args()
+
+    players = load_register(args.refresh)
+    for name, player_id in players.lookup_many(args.names).items():
+        print(f"{name}: {player_id if player_id is not None else 'not found'}")
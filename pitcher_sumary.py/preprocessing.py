@@ -1,11 +1,42 @@
 import pandas as pd
 import matplotlib.colors as mcolors
 import numpy as np
-from constants import dict_color, dict_pitch, table_columns, pitch_stats_dict
+from instrumentation import count
+from constants import dict_color, dict_pitch, table_columns, pitch_stats_dict, color_stats, statcast_schema
+from constants import tto_table_columns, tto_stats_dict
+from sketch import digests_from_table
+
+# Passes through the batting order after this one are pooled into it
+max_times_through = 3
+times_through_labels = {1: '1st', 2: '2nd', 3: '3rd+'}
+
+
+def compact_statcast(df: pd.DataFrame):
+    """
+    Projects a Statcast frame to the columns in `statcast_schema` and stores each one in its
+    compact dtype. Columns missing from `df` are skipped; categories not present are dropped.
+    """
+    columns = {}
+    for col, dtype in statcast_schema.items():
+        if col not in df.columns:
+            continue
+        values = df[col]
+        if dtype == 'category':
+            values = values.astype('category').cat.remove_unused_categories()
+        elif dtype.startswith('datetime'):
+            values = pd.to_datetime(values)
+        elif dtype.startswith('int') and values.isna().any():
+            values = values.astype('float32')
+        else:
+            values = values.astype(dtype)
+        columns[col] = values
+    return pd.DataFrame(columns, index=df.index)
 
 
 def df_processing(df_pyb: pd.DataFrame):
-    df = df_pyb.copy()
+    count('rows_processed.df_processing', len(df_pyb))
+    # Shallow copy: the new and rescaled columns below are added without copying the rest of the frame
+    df = df_pyb.copy(deep=False)
 
     swing_code = [
         'foul_bunt', 'foul', 'hit_into_play', 'swinging_strike',
@@ -25,8 +56,22 @@ def df_processing(df_pyb: pd.DataFrame):
     return df
 
 
+def add_group_rates(df_group: pd.DataFrame):
+    """
+    Adds the rate columns, descriptions and colors to per-pitch-type totals and sorts by usage.
+    """
+    df_group['pitch_description'] = df_group['pitch_type'].map(dict_pitch)
+    df_group['pitch_usage'] = df_group['pitch'] / df_group['pitch'].sum()
+    df_group['whiff_rate'] = df_group['whiff'] / df_group['swing']
+    df_group['in_zone_rate'] = df_group['in_zone'] / df_group['pitch']
+    df_group['chase_rate'] = df_group['chase'] / df_group['out_zone']
+    df_group['delta_run_exp_per_100'] = -df_group['delta_run_exp'] / df_group['pitch'] * 100
+    df_group['color'] = df_group['pitch_type'].map(dict_color)
+    return df_group.sort_values(by='pitch_usage', ascending=False)
+
+
 def df_grouping(df: pd.DataFrame):
-    df_group = df.groupby(['pitch_type']).agg(
+    df_group = df.groupby(['pitch_type'], observed=True).agg(
         pitch=('pitch_type', 'count'),
         release_speed=('release_speed', 'mean'),
         pfx_z=('pfx_z', 'mean'),
@@ -43,15 +88,7 @@ def df_grouping(df: pd.DataFrame):
         chase=('chase', 'sum'),
         xwoba=('estimated_woba_using_speedangle', 'mean'),
     ).reset_index()
-
-    df_group['pitch_description'] = df_group['pitch_type'].map(dict_pitch)
-    df_group['pitch_usage'] = df_group['pitch'] / df_group['pitch'].sum()
-    df_group['whiff_rate'] = df_group['whiff'] / df_group['swing']
-    df_group['in_zone_rate'] = df_group['in_zone'] / df_group['pitch']
-    df_group['chase_rate'] = df_group['chase'] / df_group['out_zone']
-    df_group['delta_run_exp_per_100'] = -df_group['delta_run_exp'] / df_group['pitch'] * 100
-    df_group['color'] = df_group['pitch_type'].map(dict_color)
-    df_group = df_group.sort_values(by='pitch_usage', ascending=False)
+    df_group = add_group_rates(df_group)
 
     color_list = df_group['color'].tolist()
 
@@ -81,60 +118,183 @@ def df_grouping(df: pd.DataFrame):
 cmap_sum = mcolors.LinearSegmentedColormap.from_list("", ['#648FFF', '#FFFFFF', '#FFB000'])
 cmap_sum_r = mcolors.LinearSegmentedColormap.from_list("", ['#FFB000', '#FFFFFF', '#648FFF'])
 
+# Color band around the league mean for each colored stat: (low factor, high factor)
+color_bands = {'release_speed': (0.95, 1.05)}
+default_color_band = (0.7, 1.3)
+# Stats colored on a fixed scale instead of relative to the league mean
+fixed_color_ranges = {'delta_run_exp_per_100': (-1.5, 1.5)}
+# Stats where lower is better for the pitcher
+reversed_color_stats = ['xwoba']
+
+hex_bytes = np.array([format(i, '02x') for i in range(256)])
 
-def get_color(value, normalize, cmap):
-    return mcolors.to_hex(cmap(normalize(value)))
+
+def to_hex_array(rgba: np.ndarray):
+    """
+    Vectorized mcolors.to_hex: converts an (..., 4) RGBA array to '#rrggbb' strings.
+    """
+    rgb = np.round(rgba[..., :3] * 255).astype(int)
+    return np.char.add(np.char.add(np.char.add('#', hex_bytes[rgb[..., 0]]), hex_bytes[rgb[..., 1]]), hex_bytes[rgb[..., 2]])
+
+
+def reference_by_pitch_type(df_statcast_group: pd.DataFrame):
+    """
+    League reference means per pitch type, indexed by pitch_type, for the colored stats.
+    """
+    ref_columns = [col for col in table_columns if col in df_statcast_group.columns]
+    df_ref = df_statcast_group[ref_columns].apply(pd.to_numeric, errors='coerce')
+    return df_ref.groupby(df_statcast_group['pitch_type'], observed=True).mean()
 
 
 def get_cell_colors(df_group: pd.DataFrame,
                      df_statcast_group: pd.DataFrame,
                      color_stats: list,
                      cmap_sum: mcolors.Colormap,
-                     cmap_sum_r: mcolors.Colormap):
-    color_list_df = []
-    for pt in df_group.pitch_type.unique():
-        row = []
-        df_pitch = df_group[df_group['pitch_type'] == pt]
-        statcast_pitch = df_statcast_group[df_statcast_group['pitch_type'] == pt]
-
-        for col in table_columns:
-            val = df_pitch[col].values[0] if col in df_pitch.columns else None
-            ref = pd.to_numeric(statcast_pitch[col], errors='coerce')
-
-            if col in color_stats and isinstance(val, (int, float)):
-                if np.isnan(val):
-                    row.append('#ffffff')
-                elif col == 'release_speed':
-                    normalize = mcolors.Normalize(vmin=ref.mean() * 0.95, vmax=ref.mean() * 1.05)
-                    row.append(get_color(val, normalize, cmap_sum))
-                elif col == 'delta_run_exp_per_100':
-                    normalize = mcolors.Normalize(vmin=-1.5, vmax=1.5)
-                    row.append(get_color(val, normalize, cmap_sum))
-                elif col == 'xwoba':
-                    normalize = mcolors.Normalize(vmin=ref.mean() * 0.7, vmax=ref.mean() * 1.3)
-                    row.append(get_color(val, normalize, cmap_sum_r))
-                else:
-                    normalize = mcolors.Normalize(vmin=ref.mean() * 0.7, vmax=ref.mean() * 1.3)
-                    row.append(get_color(val, normalize, cmap_sum))
-            else:
-                row.append('#ffffff')
-        color_list_df.append(row)
-    return color_list_df
+                     cmap_sum_r: mcolors.Colormap,
+                     league_percentiles: pd.DataFrame = None):
+    """
+    Cell colors for the pitch table, one row per df_group row and one column per table column.
+
+    With `league_percentiles` (see league.load_league_percentiles) each stat is colored by its
+    percentile among league pitchers with the same pitch type, white at the median. Stats and
+    pitch types without a digest there are colored against the league mean for the pitch type.
+    Rows are independent, so df_group may stack the grouped tables of many pitchers. Returns a
+    list of rows of hex strings.
+    """
+    df_ref = reference_by_pitch_type(df_statcast_group).reindex(df_group['pitch_type'])
+    digests = digests_from_table(league_percentiles) if league_percentiles is not None else {}
+    pitch_types = df_group['pitch_type'].to_numpy()
+    colors = np.full((len(df_group), len(table_columns)), '#ffffff', dtype=object)
+
+    for j, col in enumerate(table_columns):
+        if col not in color_stats or col not in df_ref.columns or col not in df_group.columns:
+            continue
+        val = pd.to_numeric(df_group[col], errors='coerce').to_numpy(dtype=float)
+        if col in fixed_color_ranges:
+            vmin, vmax = (np.full(len(val), v) for v in fixed_color_ranges[col])
+        else:
+            low, high = color_bands.get(col, default_color_band)
+            ref_mean = df_ref[col].to_numpy(dtype=float)
+            vmin, vmax = ref_mean * low, ref_mean * high
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            normalized = np.where(vmin == vmax, 0.0, (val - vmin) / (vmax - vmin))
+        for pitch_type in pd.unique(pitch_types):
+            if (pitch_type, col) in digests:
+                rows = pitch_types == pitch_type
+                normalized[rows] = digests[(pitch_type, col)].cdf(val[rows])
+        cmap = cmap_sum_r if col in reversed_color_stats else cmap_sum
+        has_value = ~np.isnan(val)
+        colors[has_value, j] = to_hex_array(cmap(normalized[has_value]))
+    return colors.tolist()
+
+
+def format_table(df: pd.DataFrame, columns: list, stats_dict: dict):
+    """
+    Formats `columns` of `df` as table text with the formats in `stats_dict`, one whole
+    column at a time; missing values become a dash.
+    """
+    df_table = df[columns].astype(object)
+    for column, props in stats_dict.items():
+        if column not in df_table.columns or 'format' not in props:
+            continue
+        values = pd.to_numeric(df[column], errors='coerce').to_numpy(dtype=float)
+        is_number = ~np.isnan(values)
+        spec = props['format']
+        if spec.endswith('%'):
+            text = np.char.mod(f"%{spec[:-1]}f%%", values[is_number] * 100)
+        else:
+            text = np.char.mod(f"%{spec}", values[is_number])
+        column_text = df_table[column].to_numpy(copy=True)
+        column_text[is_number] = text
+        df_table[column] = column_text
+    return df_table.fillna('—')
 
 
 def plot_pitch_format(df: pd.DataFrame):
     """
     Format the grouped DataFrame for visualization by applying column-specific formats.
     """
-    # Ensure all required columns are present and fill missing values with placeholders
-    df_group = df[table_columns].fillna('—')
+    return format_table(df, table_columns, pitch_stats_dict)
 
-    # Apply the formats defined in `pitch_stats_dict` to the DataFrame columns
-    for column, props in pitch_stats_dict.items():
-        if column in df_group.columns:
-            df_group[column] = df_group[column].apply(
-                lambda x: format(x, props['format']) if isinstance(x, (int, float)) else x
-            )
-    return df_group
 
+def times_through_order(df: pd.DataFrame) -> np.ndarray:
+    """
+    Each pitch's pass through the batting order, from Statcast's n_thruorder_pitcher.
+
+    Pitches without it (frames from before the column existed, or synthetic ones) fall back to
+    an estimate from game_pk and at_bat_number: 1 for the first nine plate appearances of the
+    pitcher's game, 2 for the next nine, and so on. The estimate is only exact for a pitcher
+    who starts the game, since a reliever's first batter is rarely the leadoff hitter.
+    """
+    passes = (df['n_thruorder_pitcher'].to_numpy(dtype='float64') if 'n_thruorder_pitcher' in df
+              else np.full(len(df), np.nan))
+    known = ~np.isnan(passes)
+    if known.all():
+        return passes.astype(np.int64)
+
+    keys = [c for c in ('pitcher', 'game_pk') if c in df] + ['at_bat_number']
+    pitches = pd.DataFrame({key: df[key].to_numpy() for key in keys})
+    plate_appearances = pitches.drop_duplicates().sort_values(keys)
+    plate_appearances['times_through'] = plate_appearances.groupby(keys[:-1]).cumcount().to_numpy() // 9 + 1
+    estimated = pitches.merge(plate_appearances, on=keys, how='left')['times_through'].to_numpy()
+    return np.where(known, passes, estimated).astype(np.int64)
+
+
+def tto_grouping(df: pd.DataFrame, by: str = None):
+    """
+    df_grouping's results and stuff metrics per pass through the order (the last pass
+    pools max_times_through and later), for every `by` group (e.g. 'pitcher') in one groupby.
+
+    Velocity is that of the group's most thrown pitch type, so pitch mix changes between
+    passes do not move it.
+    """
+    count('rows_processed.tto_grouping', len(df))
+    by_keys = [by] if by else []
+    pitch_types = df['pitch_type'].to_numpy(dtype=object)
+    usage = df.groupby(by_keys + ['pitch_type'], observed=True).size().rename('n').reset_index()
+    if by:
+        primary = usage.sort_values('n', kind='stable').drop_duplicates(by, keep='last').set_index(by)['pitch_type']
+        is_primary = pitch_types == df[by].map(primary).to_numpy(dtype=object)
+    else:
+        is_primary = pitch_types == usage.loc[usage['n'].idxmax(), 'pitch_type'] if len(usage) else np.zeros(len(df), bool)
 
+    pa_keys = [c for c in ('pitcher', 'game_pk') if c in df] + ['at_bat_number']
+    df_tto = df.assign(
+        times_through=np.minimum(times_through_order(df), max_times_through),
+        pa_start=~df[pa_keys].duplicated().to_numpy(),
+        primary_speed=df['release_speed'].where(is_primary),
+    )
+    df_tto = df_tto.groupby(by_keys + ['times_through'], observed=True).agg(
+        pa=('pa_start', 'sum'),
+        pitch=('pitch_type', 'count'),
+        primary_speed=('primary_speed', 'mean'),
+        delta_run_exp=('delta_run_exp', 'sum'),
+        swing=('swing', 'sum'),
+        whiff=('whiff', 'sum'),
+        out_zone=('out_zone', 'sum'),
+        chase=('chase', 'sum'),
+        xwoba=('estimated_woba_using_speedangle', 'mean'),
+    ).reset_index()
+    df_tto['pass'] = df_tto['times_through'].map(times_through_labels)
+    df_tto['whiff_rate'] = df_tto['whiff'] / df_tto['swing']
+    df_tto['chase_rate'] = df_tto['chase'] / df_tto['out_zone']
+    df_tto['delta_run_exp_per_100'] = -df_tto['delta_run_exp'] / df_tto['pitch'] * 100
+    return df_tto
+
+
+def tto_table_cells(df_tto: pd.DataFrame):
+    """
+    The times-through-the-order table's cell text and column headers.
+    """
+    stats_dict = {**pitch_stats_dict, **tto_stats_dict}
+    return format_table(df_tto, tto_table_columns, stats_dict), [stats_dict[c]['table_header'] for c in tto_table_columns]
+
+
+def pitch_table_cells(df_group: pd.DataFrame, df_statcast_group: pd.DataFrame, league_percentiles: pd.DataFrame = None):
+    """
+    Builds the pitch table's cell text and cell colors as two aligned arrays.
+    """
+    cell_colors = get_cell_colors(df_group, df_statcast_group, color_stats, cmap_sum, cmap_sum_r, league_percentiles)
+    cell_text = plot_pitch_format(df_group)
+    return cell_text, cell_colors
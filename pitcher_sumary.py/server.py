@@ -0,0 +1,265 @@
+import argparse
+import bisect
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import BytesIO
+from urllib.parse import urlparse, parse_qs
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+from data_load import load_pitch_data, load_statcast_grouped, fangraphs_pitching_leaderboards
+from dashboard import pitching_dashboard, DashboardTemplate
+from league import load_league_velocity_curves, load_league_percentiles
+from mlb_api import prefetch_team_logos
+from output import dashboard_path
+from pipeline import content_hash
+import instrumentation
+from instrumentation import count_cache
+from constants import stats, statcast_max_age_hours
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+content_types = {'png': 'image/png', 'pdf': 'application/pdf'}
+
+# A PNG render at this resolution takes ~2s on one core (~1s of it drawing the tables and text
+# while saving), so a request that is not in `rendered` misses a 1s target; a repeat request is
+# answered from `rendered` in ~10ms. PDFs are vectors anyway
+default_dpi = {'png': 100, 'pdf': 300}
+
+# Accepted ?dpi= values; the 20 x 28 in figure at 600 dpi is already a 200 megapixel image
+dpi_range = (50, 600)
+
+# League data kept warm per season: season -> (load time, data)
+season_cache = {}
+season_lock = threading.Lock()
+
+# pyplot is not thread-safe, so renders run one at a time; other endpoints stay responsive.
+# Every render refills the same figure.
+render_lock = threading.Lock()
+template = None
+
+# Rendered files per (pitcher, season, format, dpi): key -> (data version, bytes). A request whose
+# league and pitch data are unchanged since the render is answered from here without redrawing;
+# past max_rendered entries the least recently used is dropped.
+rendered = {}
+rendered_lock = threading.Lock()
+max_rendered = 64
+
+# Request latency histogram (seconds), plus recent latencies for percentiles
+latency_buckets = [0.1, 0.25, 0.5, 1, 2, 5, 10]
+latency_counts = [0] * (len(latency_buckets) + 1)
+latency_sum = 0.0
+recent_latencies = deque(maxlen=1000)
+latency_lock = threading.Lock()
+
+output_dir = os.path.join(tempfile.gettempdir(), 'pitcher_dashboard_service')
+
+
+def record_latency(seconds: float):
+    global latency_sum
+    with latency_lock:
+        latency_counts[bisect.bisect_left(latency_buckets, seconds)] += 1
+        latency_sum += seconds
+        recent_latencies.append(seconds)
+
+
+def latency_percentile(q: float):
+    with latency_lock:
+        latencies = sorted(recent_latencies)
+    if not latencies:
+        return None
+    return latencies[min(len(latencies) - 1, int(q * len(latencies)))]
+
+
+def metrics_text(prefix: str = 'pitcher_dashboard'):
+    """
+    The latency histogram (and pipeline metrics, when enabled) in Prometheus text format.
+    """
+    with latency_lock:
+        counts, total = list(latency_counts), latency_sum
+    lines = [f"# TYPE {prefix}_request_seconds histogram"]
+    cumulative = 0
+    for bound, n in zip(latency_buckets + ['+Inf'], counts):
+        cumulative += n
+        lines.append(f'{prefix}_request_seconds_bucket{{le="{bound}"}} {cumulative}')
+    lines.append(f"{prefix}_request_seconds_sum {total:.6f}")
+    lines.append(f"{prefix}_request_seconds_count {cumulative}")
+    for q in (0.5, 0.95):
+        value = latency_percentile(q)
+        if value is not None:
+            lines.append(f'{prefix}_request_seconds_recent{{quantile="{q}"}} {value:.6f}')
+    text = '\n'.join(lines) + '\n'
+    return text + instrumentation.prometheus_text(prefix) if instrumentation.enabled else text
+
+
+def season_data(season: int):
+    """
+    League reference, leaderboard, velocity curves and percentile digests for a season, loaded once and
+    reloaded after statcast_max_age_hours ('loaded_at' is when).
+    """
+    with season_lock:
+        cached = season_cache.get(season)
+        if cached is None or time.time() - cached[0] > statcast_max_age_hours * 3600:
+            logging.info(f"Loading league data for {season}...")
+            loaded_at = time.time()
+            cached = (loaded_at, {
+                'loaded_at': loaded_at,
+                'statcast_grouped_df': load_statcast_grouped(season),
+                'fangraphs_df': fangraphs_pitching_leaderboards(season),
+                'league_curves': load_league_velocity_curves(season),
+                'league_percentiles': load_league_percentiles(season),
+            })
+            season_cache[season] = cached
+        return cached[1]
+
+
+def render_dashboard(pitcher_id: int, season: int, fmt: str = 'png', dpi: int = None):
+    """
+    Renders one dashboard with the Agg backend and returns the file's bytes. An earlier render
+    of the same dashboard is returned instead while the season's league data and the
+    pitcher's pitches are unchanged.
+
+    Raises LookupError if the pitcher has no pitch data for the season.
+    """
+    data = season_data(season)
+    df_pyb = load_pitch_data(pitcher_id, season)
+    if df_pyb.empty:
+        raise LookupError(f"No pitch data for pitcher {pitcher_id} in {season}")
+
+    dpi = dpi or default_dpi[fmt]
+    key = (pitcher_id, season, fmt, dpi)
+    version = (data['loaded_at'], content_hash(df_pyb))
+    with rendered_lock:
+        cached = rendered.get(key)
+        if cached is not None and cached[0] == version:
+            count_cache('rendered', hit=True)
+            # Move to the end so eviction drops the least recently used
+            rendered[key] = rendered.pop(key)
+            return cached[1]
+    count_cache('rendered', hit=False)
+
+    global template
+    output_path = dashboard_path(pitcher_id, season, output_dir, fmt)
+    with render_lock:
+        if template is None:
+            template = DashboardTemplate()
+        pitching_dashboard(pitcher_id, df_pyb, stats, data['statcast_grouped_df'], season,
+                           fangraphs_df=data['fangraphs_df'], output_path=output_path, show=False,
+                           league_curves=data['league_curves'], league_percentiles=data['league_percentiles'],
+                           template=template,
+                           fmt=fmt, dpi=dpi)
+        with open(output_path, 'rb') as f:
+            body = f.read()
+
+    with rendered_lock:
+        rendered.pop(key, None)
+        rendered[key] = (version, body)
+        while len(rendered) > max_rendered:
+            del rendered[next(iter(rendered))]
+    return body
+
+
+def warm_up(seasons: list):
+    """
+    Loads league data for `seasons`, team logos and matplotlib's fonts before the first request.
+    """
+    for season in seasons:
+        season_data(season)
+    prefetch_team_logos()
+    fig = plt.figure()
+    fig.text(0.5, 0.5, 'warm up', fontsize=20, fontstyle='italic')
+    fig.savefig(BytesIO(), format='png')
+    plt.close(fig)
+
+
+class DashboardHandler(BaseHTTPRequestHandler):
+    """
+    GET /dashboard?pitcher_id=&season=[&format=png|pdf][&dpi=50..600] returns a rendered dashboard.
+    GET /metrics returns the latency histogram; GET /health returns 'ok'.
+    """
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path == '/health':
+            self.respond(200, b'ok\n', 'text/plain')
+        elif url.path == '/metrics':
+            self.respond(200, metrics_text().encode('utf-8'), 'text/plain; version=0.0.4')
+        elif url.path == '/dashboard':
+            self.dashboard(parse_qs(url.query))
+        else:
+            self.respond(404, b'not found\n', 'text/plain')
+
+    def dashboard(self, query: dict):
+        start = time.perf_counter()
+        try:
+            self.serve_dashboard(query, start)
+        finally:
+            # Failed and rejected requests count too, so slow failures show up in the histogram
+            record_latency(time.perf_counter() - start)
+
+    def serve_dashboard(self, query: dict, start: float):
+        try:
+            pitcher_id = int(query['pitcher_id'][0])
+            season = int(query['season'][0])
+            fmt = query.get('format', ['png'])[0].lower()
+            dpi = int(query['dpi'][0]) if 'dpi' in query else None
+            if fmt not in content_types:
+                raise ValueError(f"format must be one of {list(content_types)}")
+            if dpi is not None and not dpi_range[0] <= dpi <= dpi_range[1]:
+                raise ValueError(f"dpi must be between {dpi_range[0]} and {dpi_range[1]}")
+        except (KeyError, ValueError) as e:
+            self.respond(400, f"bad request: {e}\n".encode('utf-8'), 'text/plain')
+            return
+
+        try:
+            body = render_dashboard(pitcher_id, season, fmt, dpi)
+        except LookupError as e:
+            self.respond(404, f"{e}\n".encode('utf-8'), 'text/plain')
+            return
+        except Exception as e:
+            logging.exception(f"Render failed for pitcher {pitcher_id}, {season}")
+            self.respond(500, f"render failed: {type(e).__name__}: {e}\n".encode('utf-8'), 'text/plain')
+            return
+
+        logging.info(f"Rendered {pitcher_id} {season} as {fmt} in {time.perf_counter() - start:.2f}s")
+        self.respond(200, body, content_types[fmt])
+
+    def respond(self, status: int, body: bytes, content_type: str):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logging.debug(format % args)
+
+
+def serve(host: str = '127.0.0.1', port: int = 8050, warm_seasons: list = None):
+    os.makedirs(output_dir, exist_ok=True)
+    warm_up(warm_seasons or [])
+    server = ThreadingHTTPServer((host, port), DashboardHandler)
+    logging.info(f"Serving dashboards on http://{host}:{port}/dashboard?pitcher_id=&season=")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        p50 = latency_percentile(0.5)
+        if p50 is not None:
+            logging.info(f"Served {len(recent_latencies)} recent renders, p50 {p50:.2f}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve pitching dashboards over HTTP.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8050)
+    parser.add_argument('--warm-season', type=int, nargs='*', default=[], help="Seasons to load before serving")
+    args = parser.parse_args()
+    serve(args.host, args.port, args.warm_season)
@@ -0,0 +1,106 @@
+import numpy as np
+import pandas as pd
+
+# Scale parameter of the digest. About compression / 2 centroids are kept whatever the number
+# of values, with the smallest ones in the tails, where percentiles need the most resolution.
+default_compression = 200
+
+
+class QuantileDigest:
+    """
+    A mergeable quantile sketch (a merging t-digest): weighted centroids in ascending order.
+
+    Digests built from separate parts of the data (date ranges, seasons, pitcher partitions)
+    merge into the digest of their union, up to the sketch's accuracy, so league percentiles
+    never need the full distribution in memory.
+    """
+
+    def __init__(self, means: np.ndarray, weights: np.ndarray, compression: int = default_compression):
+        self.means = np.asarray(means, dtype='float64')
+        self.weights = np.asarray(weights, dtype='float64')
+        self.compression = compression
+        # Cumulative weight at each centroid's centre, for rank lookups
+        self.ranks = np.cumsum(self.weights) - self.weights / 2
+
+    @classmethod
+    def from_values(cls, values: np.ndarray, weights: np.ndarray = None, compression: int = default_compression):
+        """
+        Builds a digest from raw values (NaNs are skipped), optionally weighted.
+        """
+        values = np.asarray(values, dtype='float64')
+        weights = np.ones(len(values)) if weights is None else np.asarray(weights, dtype='float64')
+        keep = ~np.isnan(values) & (weights > 0)
+        return cls(*compress(values[keep], weights[keep], compression), compression)
+
+    def merge(self, *others):
+        """
+        The digest of this digest's values together with the others'.
+        """
+        digests = (self,) + others
+        means = np.concatenate([d.means for d in digests])
+        weights = np.concatenate([d.weights for d in digests])
+        return QuantileDigest(*compress(means, weights, self.compression), self.compression)
+
+    @property
+    def total(self):
+        return float(self.weights.sum())
+
+    def cdf(self, values: np.ndarray):
+        """
+        Share of the sketched values below each value (0 to 1), NaN where the value is NaN
+        or the digest is empty. Values outside the sketched range get 0 or 1. Each lookup is
+        a binary search over the centroids.
+        """
+        values = np.asarray(values, dtype='float64')
+        if not len(self.means):
+            return np.full(values.shape, np.nan)
+        shares = np.interp(values, self.means, self.ranks, left=0, right=self.total) / self.total
+        return np.where(np.isnan(values), np.nan, shares)
+
+    def quantile(self, q: np.ndarray):
+        """
+        The values at shares `q` (0 to 1) of the sketched distribution.
+        """
+        if not len(self.means):
+            return np.full(np.shape(q), np.nan)
+        return np.interp(np.asarray(q, dtype='float64') * self.total, self.ranks, self.means)
+
+
+def compress(means: np.ndarray, weights: np.ndarray, compression: int = default_compression):
+    """
+    Sorts weighted points and merges neighbours whose cumulative share falls in the same
+    unit step of the t-digest scale function k(q) = compression / (2 pi) * asin(2q - 1).
+
+    Steps are narrow near q = 0 and q = 1 and wide around the median, so centroids stay
+    small in the tails. Returns the merged (means, weights).
+    """
+    if not len(means):
+        return np.array([]), np.array([])
+    order = np.argsort(means, kind='stable')
+    means, weights = means[order], weights[order]
+    q = (np.cumsum(weights) - weights / 2) / weights.sum()
+    k = np.floor(compression / (2 * np.pi) * np.arcsin(2 * q - 1)).astype(np.int64)
+    _, cluster = np.unique(k, return_inverse=True)
+    merged_weights = np.bincount(cluster, weights=weights)
+    merged_means = np.bincount(cluster, weights=means * weights) / merged_weights
+    return merged_means, merged_weights
+
+
+def table_from_digests(digests: dict):
+    """
+    Stores digests keyed by (pitch_type, stat) as one long table of centroids: pitch_type,
+    stat, mean, weight (float32, so each digest takes about a kilobyte).
+    """
+    frames = [pd.DataFrame({'pitch_type': pitch_type, 'stat': stat, 'mean': d.means, 'weight': d.weights})
+              for (pitch_type, stat), d in digests.items() if len(d.means)]
+    if not frames:
+        return pd.DataFrame({'pitch_type': [], 'stat': [], 'mean': [], 'weight': []})
+    return pd.concat(frames, ignore_index=True).astype({'mean': 'float32', 'weight': 'float32'})
+
+
+def digests_from_table(table: pd.DataFrame):
+    """
+    The digests in a table written by table_from_digests, as a dict of (pitch_type, stat) -> QuantileDigest.
+    """
+    return {key: QuantileDigest(group['mean'].to_numpy(), group['weight'].to_numpy())
+            for key, group in table.groupby(['pitch_type', 'stat'], sort=False)}
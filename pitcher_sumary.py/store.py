@@ -0,0 +1,287 @@
+import json
+import os
+import shutil
+import time
+import uuid
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+import pybaseball as pyb
+from preprocessing import compact_statcast
+from downloader import download_range, pending_downloads, default_chunk_days, default_workers
+from constants import cache_dir
+
+# Rows per Parquet row group; small groups let game_date filters skip most of a pitcher's file
+store_row_group_size = 512
+
+
+def league_store_path(season: int):
+    return os.path.join(cache_dir, 'league', f"season={season}")
+
+
+def has_league_store(season: int):
+    return os.path.isdir(league_store_path(season))
+
+
+def partition_path(season: int, pitcher_id):
+    return os.path.join(league_store_path(season), f"pitcher={pitcher_id}")
+
+
+def new_partition_version(season: int, pitcher_id):
+    # Partition files live in versioned directories under _versions; pitcher=<id> is a
+    # symlink to the current one, so compaction can swap a partition in with one rename
+    path = os.path.join(league_store_path(season), '_versions', f"pitcher={pitcher_id}.{uuid.uuid4().hex}")
+    os.makedirs(path)
+    return path
+
+
+def coverage_path(season: int):
+    # Names starting with '_' are skipped by dataset readers and stored_pitchers
+    return os.path.join(league_store_path(season), '_coverage.json')
+
+
+def store_coverage(season: int):
+    """
+    Returns (through, written): the last date the season store holds every game through,
+    and when that was recorded (epoch seconds). None without a store.
+
+    Stores built before coverage was recorded report their latest game_date, with an
+    unknown (None) write time.
+    """
+    if not has_league_store(season):
+        return None
+    path = coverage_path(season)
+    if os.path.exists(path):
+        with open(path) as f:
+            return pd.Timestamp(json.load(f)['through']), os.path.getmtime(path)
+    last_date = read_league(season, columns=['game_date'])['game_date'].max()
+    return None if pd.isna(last_date) else (pd.Timestamp(last_date), None)
+
+
+def record_coverage(season: int, through: pd.Timestamp):
+    path = coverage_path(season)
+    with open(path + '.tmp', 'w') as f:
+        json.dump({'through': through.strftime('%Y-%m-%d')}, f)
+    os.replace(path + '.tmp', path)
+
+
+def league_store_current(season: int, end_date: str, max_age_hours: float):
+    """
+    Whether the season store can serve games through `end_date`: either it covers that
+    date, or it was extended through the day before less than `max_age_hours` ago (the
+    latest a store can be, since games in progress are not stored).
+    """
+    coverage = store_coverage(season)
+    if coverage is None:
+        return False
+    through, written = coverage
+    if through >= pd.Timestamp(end_date):
+        return True
+    if written is None:
+        return False
+    age_hours = (time.time() - written) / 3600
+    return age_hours < max_age_hours and through >= pd.Timestamp.fromtimestamp(written).normalize() - pd.Timedelta(days=1)
+
+
+def write_league_store(df: pd.DataFrame, season: int, part_name: str = None):
+    """
+    Appends league pitch data to the season store, partitioned by pitcher.
+
+    Only the columns in `statcast_schema` are kept, in their compact dtypes. Each write adds
+    new files rather than rewriting old ones, so date chunks can be streamed in as they arrive.
+    Rows are sorted by game_date so row-group statistics prune date ranges.
+    Writes with the same `part_name` replace each other's files until the partition is
+    compacted, so a chunk re-sunk by a resumed download does not duplicate it (downloads
+    compact only once every chunk is written, see build_league_store).
+    """
+    if df.empty:
+        return
+    df = compact_statcast(df).sort_values(by=['pitcher', 'game_date'])
+    for pitcher_id in df['pitcher'].unique():
+        link = partition_path(season, pitcher_id)
+        if not os.path.exists(link):
+            os.symlink(os.path.relpath(new_partition_version(season, pitcher_id), league_store_path(season)), link)
+    # Categories differ between writes, so store them as plain strings and re-categorize on read
+    for col in df.select_dtypes('category').columns:
+        df[col] = df[col].astype(object)
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    ds.write_dataset(
+        table,
+        league_store_path(season),
+        format='parquet',
+        partitioning=ds.partitioning(pa.schema([('pitcher', table.schema.field('pitcher').type)]), flavor='hive'),
+        basename_template=f"part-{part_name or uuid.uuid4().hex}-{{i}}.parquet",
+        existing_data_behavior='overwrite_or_ignore',
+        min_rows_per_group=store_row_group_size,
+        max_rows_per_group=store_row_group_size,
+    )
+
+
+def fetch_statcast(start_date: str, end_date: str):
+    # Chunks are already fetched concurrently, so pybaseball's own per-day threads are off
+    return pyb.statcast(start_dt=start_date, end_dt=end_date, verbose=False, parallel=False)
+
+
+def build_league_store(season: int, start_date: str = None, end_date: str = None, postseason: bool = False,
+                       chunk_days: int = default_chunk_days, workers: int = default_workers):
+    """
+    Downloads the full league Statcast season (or a date range of it) into the local store.
+    The season ends with the regular season unless `postseason`.
+
+    The range is fetched in `chunk_days` chunks, `workers` at a time, and each chunk is
+    written to the store as it arrives (see download_range). An interrupted build resumes
+    where it stopped when called again with the same range.
+
+    Once the range is stored, the store's coverage (see store_coverage) is moved up to its
+    end, or to yesterday if the range runs into the future. A range that leaves a gap after
+    the covered dates does not move it.
+
+    Returns the number of pitches downloaded.
+    """
+    from data_load import season_dates
+    season_start, season_end = season_dates(season, postseason)
+    start_date, end_date = start_date or season_start, end_date or season_end
+    coverage = store_coverage(season)
+
+    def sink(df, chunk):
+        write_league_store(df, season, part_name=f"{chunk[0]}_{chunk[1]}")
+
+    rows = download_range(f"league_{season}_{start_date}_{end_date}", start_date, end_date, fetch_statcast, sink,
+                          chunk_days, workers)
+    compact_league_store(season)
+
+    covered_to = coverage[0] if coverage else pd.Timestamp(season_start) - pd.Timedelta(days=1)
+    through = min(pd.Timestamp(end_date), pd.Timestamp.today().normalize() - pd.Timedelta(days=1))
+    if pd.Timestamp(start_date) <= covered_to + pd.Timedelta(days=1) and has_league_store(season):
+        record_coverage(season, max(through, covered_to))
+    return rows
+
+
+def compact_league_store(season: int):
+    """
+    Rewrites every pitcher partition made of several files (one per downloaded chunk) as a
+    single file sorted by game_date, so reads open one file per pitcher instead of dozens.
+
+    The file is written to a new version of the partition, which replaces the old one in a
+    single rename of the pitcher=<id> link, so readers see either every chunk or the merged
+    file. The replaced version is kept until the next compaction, for readers that listed it
+    just before the swap.
+    """
+    root = league_store_path(season)
+    if not os.path.isdir(root):
+        return
+    for partition in os.listdir(root):
+        if not partition.startswith('pitcher='):
+            continue
+        path = os.path.join(root, partition)
+        files = sorted(f for f in os.listdir(path) if f.endswith('.parquet') and not f.startswith(('_', '.')))
+        if len(files) < 2:
+            continue
+        # The partition values are in the directory names, not the files; don't read them in as columns
+        table = pq.read_table([os.path.join(path, f) for f in files], partitioning=None).sort_by('game_date')
+        pitcher_id = partition.split('=', 1)[1]
+        version = new_partition_version(season, pitcher_id)
+        pq.write_table(table, os.path.join(version, 'part-compacted-0.parquet'), row_group_size=store_row_group_size)
+
+        previous = os.path.realpath(path)
+        if not os.path.islink(path):
+            # Partitions written before versioning are plain directories, which a link cannot
+            # replace in place; move it aside first (readers briefly see no partition)
+            previous = os.path.join(root, '_versions', f"{partition}.{uuid.uuid4().hex}")
+            os.rename(path, previous)
+        tmp_link = os.path.join(root, f"_{partition}.tmp")
+        if os.path.lexists(tmp_link):
+            os.remove(tmp_link)
+        os.symlink(os.path.relpath(version, root), tmp_link)
+        os.replace(tmp_link, path)
+
+        keep = {os.path.basename(version), os.path.basename(previous)}
+        versions = os.path.join(root, '_versions')
+        for name in os.listdir(versions):
+            if name.startswith(f"{partition}.") and name not in keep:
+                shutil.rmtree(os.path.join(versions, name), ignore_errors=True)
+
+
+def resume_league_store(season: int):
+    """
+    Finishes any interrupted downloads into the season store. Returns the pitches added.
+    """
+    rows = 0
+    for name in pending_downloads(f"league_{season}_"):
+        _, _, start_date, end_date = name.split('_')
+        rows += build_league_store(season, start_date, end_date)
+    return rows
+
+
+def extend_league_store(season: int, through: str = None, postseason: bool = False):
+    """
+    Downloads the dates after the ones the store covers, through `through` (default:
+    yesterday, so only finished games are stored) or the end of the season (see
+    build_league_store for `postseason`).
+
+    Interrupted downloads are finished first, so no gap is left before the last stored date.
+
+    Returns the number of pitches added.
+    """
+    from data_load import season_dates
+    season_start, season_end = season_dates(season, postseason)
+    resumed = resume_league_store(season)
+    coverage = store_coverage(season)
+    start = coverage[0] + pd.Timedelta(days=1) if coverage else pd.Timestamp(season_start)
+    end = min(pd.Timestamp(through) if through else pd.Timestamp.today().normalize() - pd.Timedelta(days=1),
+              pd.Timestamp(season_end))
+    if start > end:
+        return resumed
+    return resumed + build_league_store(season, start.strftime('%Y-%m-%d'), end.strftime('%Y-%m-%d'), postseason)
+
+
+def stored_pitchers(season: int):
+    """
+    IDs of the pitchers with a partition in the season store, read from the directory names.
+    """
+    root = league_store_path(season)
+    if not os.path.isdir(root):
+        return []
+    return sorted(int(name.split('=', 1)[1]) for name in os.listdir(root) if name.startswith('pitcher='))
+
+
+def read_pitcher(pitcher_id, season: int, columns: list = None, start_date: str = None, end_date: str = None):
+    """
+    Reads one pitcher's pitches from the league store.
+
+    Only that pitcher's partition is opened, and only the requested columns are decoded.
+    Returns an empty DataFrame if the pitcher has no partition in the store.
+    """
+    path = partition_path(season, pitcher_id)
+    if not os.path.isdir(path):
+        return pd.DataFrame(columns=columns)
+
+    read_columns = None
+    if columns is not None:
+        read_columns = [c for c in columns if c != 'pitcher']
+        if start_date or end_date:
+            read_columns = list(dict.fromkeys(read_columns + ['game_date']))
+
+    filters = []
+    if start_date:
+        filters.append(('game_date', '>=', pd.Timestamp(start_date)))
+    if end_date:
+        filters.append(('game_date', '<=', pd.Timestamp(end_date)))
+
+    table = pq.read_table(path, columns=read_columns, filters=filters or None)
+    df = table.to_pandas()
+    if columns is None or 'pitcher' in columns:
+        df['pitcher'] = int(pitcher_id)
+    if columns is not None:
+        df = df[columns]
+    return df
+
+
+def read_league(season: int, columns: list = None, filter=None):
+    """
+    Reads the whole league season from the store, optionally projected to `columns`
+    and filtered with a pyarrow dataset expression.
+    """
+    dataset = ds.dataset(league_store_path(season), format='parquet', partitioning='hive')
+    return compact_statcast(dataset.to_table(columns=columns, filter=filter).to_pandas())
@@ -0,0 +1,168 @@
+import numpy as np
+import pandas as pd
+from constants import image_dict, stats
+
+# Typical league shape of each pitch type: velocity (mph), spin (rpm), pfx_x / pfx_z (feet, as Statcast reports them)
+pitch_shapes = {
+    'FF': (94.0, 2300, -0.55, 1.30),
+    'SI': (93.2, 2150, -1.25, 0.65),
+    'FC': (89.0, 2400, 0.20, 0.70),
+    'SL': (85.5, 2450, 0.35, 0.15),
+    'ST': (82.0, 2600, 1.10, 0.05),
+    'CU': (79.5, 2550, 0.55, -0.80),
+    'CH': (85.5, 1750, -1.20, 0.45),
+    'FS': (86.0, 1300, -0.90, 0.25),
+}
+
+descriptions = ['ball', 'called_strike', 'swinging_strike', 'foul', 'hit_into_play',
+                'blocked_ball', 'foul_tip', 'swinging_strike_blocked']
+description_weights = [0.34, 0.16, 0.10, 0.18, 0.17, 0.02, 0.01, 0.02]
+
+teams = list(image_dict)
+
+# Scales used by the benchmark suite: (pitchers, games per pitcher, pitches per game)
+scales = {
+    'start': (1, 1, 95),
+    'season': (1, 32, 95),
+    'league': (260, 30, 96),
+}
+
+
+def synthetic_statcast(n_pitchers: int = 1, n_games: int = 32, pitches_per_game: int = 95,
+                       season: int = 2024, seed: int = 0) -> pd.DataFrame:
+    """
+    Generates deterministic pitch-level data shaped like a pybaseball Statcast frame.
+
+    Each pitcher gets a 3-7 pitch arsenal with its own usage, velocity, spin and movement,
+    and loses a little velocity as the pitch count rises within a game. The same arguments
+    always produce the same frame.
+    """
+    rng = np.random.default_rng(seed)
+    pitch_types = np.array(list(pitch_shapes))
+    shapes = np.array(list(pitch_shapes.values()))
+
+    # Pitcher-level traits
+    pitcher_ids = 600000 + np.arange(n_pitchers)
+    arsenal_size = rng.integers(3, 8, n_pitchers)
+    usage = rng.dirichlet(np.ones(len(pitch_types)), n_pitchers)
+    usage[np.arange(len(pitch_types)) >= arsenal_size[:, None]] = 0
+    usage[:, 0] += 0.35  # everyone throws a four-seamer, and throws it most
+    usage /= usage.sum(axis=1, keepdims=True)
+    pitcher_offsets = rng.normal(0, [1.5, 120, 0.15, 0.15], (n_pitchers, 4))
+    throws = np.where(rng.random(n_pitchers) < 0.7, 'R', 'L')
+    team_idx = rng.integers(0, len(teams), n_pitchers)
+
+    # Pitcher-game structure
+    n_appearances = n_pitchers * n_games
+    game_pitcher = np.repeat(np.arange(n_pitchers), n_games)
+    game_index = np.tile(np.arange(n_games), n_pitchers)
+    game_sizes = np.maximum(10, rng.normal(pitches_per_game, 8, n_appearances).round().astype(int))
+    game_starts = pd.Timestamp(f"{season}-03-28") + pd.to_timedelta(game_index * 5 + game_pitcher % 5, unit='D')
+    is_home = rng.random(n_appearances) < 0.5
+    opponent_idx = (team_idx[game_pitcher] + rng.integers(1, len(teams), n_appearances)) % len(teams)
+
+    # Pitch-level rows
+    pitch_game = np.repeat(np.arange(n_appearances), game_sizes)
+    n = len(pitch_game)
+    pitcher = game_pitcher[pitch_game]
+    first_pitch = np.repeat(np.cumsum(game_sizes) - game_sizes, game_sizes)
+    pitch_count = np.arange(n) - first_pitch + 1
+
+    cumulative_usage = usage.cumsum(axis=1)[pitcher]
+    type_idx = (rng.random(n)[:, None] > cumulative_usage).sum(axis=1).clip(max=len(pitch_types) - 1)
+    shape = shapes[type_idx] + pitcher_offsets[pitcher]
+    hand_sign = np.where(throws[pitcher] == 'R', 1.0, -1.0)
+
+    # Plate appearances: split each game into runs of 1-10 pitches
+    pa_lengths = np.clip(rng.poisson(2.9, n) + 1, 1, 10)
+    pa_id = np.searchsorted(np.cumsum(pa_lengths), np.arange(n), side='right')
+    new_pa = np.r_[True, (pa_id[1:] != pa_id[:-1]) | (pitch_game[1:] != pitch_game[:-1])]
+    pa_global = np.cumsum(new_pa)
+    pa_first_row = np.flatnonzero(new_pa)
+    pitch_number = np.arange(n) - pa_first_row[pa_global - 1] + 1
+    at_bat_number = pa_global - pa_global[first_pitch] + 1
+
+    prior_pitches = pitch_number - 1
+    balls = np.minimum(3, rng.binomial(prior_pitches, 0.45))
+    strikes = np.minimum(2, prior_pitches - balls)
+
+    description = np.array(descriptions)[rng.choice(len(descriptions), n, p=description_weights)]
+    in_zone = rng.random(n) < 0.48
+    zone = np.where(in_zone, rng.integers(1, 10, n), rng.integers(11, 15, n)).astype(float)
+    in_play = description == 'hit_into_play'
+
+    df = pd.DataFrame({
+        'pitch_type': pitch_types[type_idx],
+        'game_date': game_starts[pitch_game],
+        'release_speed': (shape[:, 0] - 0.012 * pitch_count + rng.normal(0, 0.8, n)).round(1),
+        'release_pos_x': (-1.9 * hand_sign + rng.normal(0, 0.15, n)).round(2),
+        'release_pos_z': (5.8 + rng.normal(0, 0.12, n)).round(2),
+        'pitcher': pitcher_ids[pitcher],
+        'batter': rng.integers(500000, 700000, n),
+        'description': description,
+        'zone': zone,
+        'stand': np.where(rng.random(n) < 0.55, 'R', 'L'),
+        'p_throws': throws[pitcher],
+        'home_team': np.where(is_home, np.array(teams)[team_idx[game_pitcher]], np.array(teams)[opponent_idx])[pitch_game],
+        'away_team': np.where(is_home, np.array(teams)[opponent_idx], np.array(teams)[team_idx[game_pitcher]])[pitch_game],
+        'balls': balls,
+        'strikes': strikes,
+        'pfx_x': (shape[:, 2] * hand_sign + rng.normal(0, 0.12, n)).round(2),
+        'pfx_z': (shape[:, 3] + rng.normal(0, 0.12, n)).round(2),
+        'inning': np.minimum(9, (at_bat_number - 1) // 4 + 1),
+        'inning_topbot': np.where(is_home, 'Top', 'Bot')[pitch_game],
+        'estimated_woba_using_speedangle': np.where(in_play, rng.beta(2, 4, n) * 1.2, np.nan).round(3),
+        'release_spin_rate': (shape[:, 1] - 0.4 * pitch_count + rng.normal(0, 60, n)).round(),
+        'release_extension': (6.3 + rng.normal(0, 0.25, n)).round(1),
+        'game_pk': 745000 + pitch_game,
+        'at_bat_number': at_bat_number,
+        'pitch_number': pitch_number,
+        'delta_run_exp': rng.normal(0, 0.08, n).round(3),
+    })
+    # pybaseball returns the newest pitches first
+    return df.iloc[::-1].reset_index(drop=True)
+
+
+def synthetic_scale(scale: str, seed: int = 0) -> pd.DataFrame:
+    n_pitchers, n_games, pitches_per_game = scales[scale]
+    return synthetic_statcast(n_pitchers, n_games, pitches_per_game, seed=seed)
+
+
+def synthetic_leaderboard(pitcher_ids: list, seed: int = 0) -> pd.DataFrame:
+    """
+    A FanGraphs-style leaderboard with the dashboard's `stats` columns, indexed by xMLBAMID.
+    """
+    rng = np.random.default_rng(seed)
+    n = len(pitcher_ids)
+    k_rate, bb_rate = rng.uniform(0.15, 0.32, n), rng.uniform(0.05, 0.11, n)
+    df = pd.DataFrame({
+        'xMLBAMID': pitcher_ids,
+        'IP': rng.uniform(60, 200, n).round(1),
+        'TBF': rng.integers(250, 800, n),
+        'WHIP': rng.uniform(0.9, 1.5, n),
+        'ERA': rng.uniform(2.5, 5.5, n),
+        'FIP': rng.uniform(2.5, 5.5, n),
+        'K%': k_rate,
+        'BB%': bb_rate,
+        'K-BB%': k_rate - bb_rate,
+    })
+    df.index = df['xMLBAMID'].to_numpy()
+    return df[['xMLBAMID'] + stats]
+
+
+def seed_offline_mlb_api(pitcher_id: int, team_abb: str = 'NYY'):
+    """
+    Fills the MLB API client's in-memory cache with a synthetic person, team, headshot and
+    logo, so a dashboard can be rendered without network access.
+    """
+    import mlb_api
+    team_link = f"/api/v1/teams/{team_abb}"
+    person_url = f"https://statsapi.mlb.com/api/v1/people?personIds={pitcher_id}&hydrate=currentTeam"
+    mlb_api.remember(person_url, {'people': [{
+        'fullName': f"Synthetic Pitcher {pitcher_id}", 'pitchHand': {'code': 'R'}, 'currentAge': 28,
+        'height': "6' 3\"", 'weight': 215, 'currentTeam': {'link': team_link},
+    }]})
+    mlb_api.remember('https://statsapi.mlb.com/' + team_link, {'teams': [{'abbreviation': team_abb}]})
+    image = np.full((64, 64, 4), 200, dtype=np.uint8)
+    mlb_api.remember('image:' + mlb_api.headshot_url(pitcher_id), image)
+    mlb_api.remember('image:' + image_dict[team_abb], image)
@@ -0,0 +1,61 @@
+import pandas as pd
+import pytest
+
+pytest.importorskip('pybaseball')
+import pipeline
+from career import career_fatigue_features
+from fatigue import create_fatigue_features, fatigue_columns, sum_columns
+from synthetic import synthetic_statcast
+
+
+@pytest.fixture
+def season_frames(monkeypatch):
+    monkeypatch.setattr(pipeline, 'persist_artifacts', False)
+    return {season: synthetic_statcast(n_pitchers=1, n_games=6, pitches_per_game=70, season=season, seed=season)
+            for season in (2022, 2023, 2024)}
+
+
+def hand_totals(df: pd.DataFrame):
+    """
+    A season's sum_columns per pitch type, straight from the pitches.
+    """
+    df = df[df['pitch_type'].notna()].assign(ball=df['balls'] > 0, strike=df['strikes'] > 0)
+    totals = df.groupby('pitch_type', observed=True).agg(
+        total_pitches=('pitch_type', 'size'),
+        speed_sum=('release_speed', 'sum'),
+        speed_n=('release_speed', 'count'),
+        spin_sum=('release_spin_rate', 'sum'),
+        spin_n=('release_spin_rate', 'count'),
+        balls=('ball', 'sum'),
+        strikes=('strike', 'sum'),
+    )
+    totals.index = totals.index.astype(object)
+    return totals[sum_columns].astype('float64')
+
+
+def season_rows(features: pd.DataFrame, season: int):
+    return features.loc[features['season'] == season, fatigue_columns].reset_index(drop=True)
+
+
+def test_zero_prior_weight_scores_each_season_alone(season_frames):
+    features = career_fatigue_features(season_frames, prior_weight=0)
+    for season, df in season_frames.items():
+        pd.testing.assert_frame_equal(season_rows(features, season), create_fatigue_features(df), check_dtype=False)
+
+
+def test_prior_baseline_is_weighted_sum_of_earlier_seasons(season_frames):
+    weight = 0.5
+    features = career_fatigue_features(season_frames, prior_weight=weight)
+    totals = {season: hand_totals(df) for season, df in season_frames.items()}
+    priors = {
+        2023: weight * totals[2022],
+        2024: (weight * totals[2023]).add(weight ** 2 * totals[2022], fill_value=0),
+    }
+
+    pd.testing.assert_frame_equal(season_rows(features, 2022), create_fatigue_features(season_frames[2022]),
+                                  check_dtype=False)
+    for season, prior in priors.items():
+        expected = create_fatigue_features(season_frames[season], prior_totals=prior)
+        pd.testing.assert_frame_equal(season_rows(features, season), expected, check_dtype=False, rtol=1e-6)
+        # With a prior, a season's first game has a baseline to be compared to
+        assert season_rows(features, season).query('game_number == 1')['velocity_drop'].notna().all()
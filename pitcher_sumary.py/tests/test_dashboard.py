@@ -0,0 +1,50 @@
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+import pytest
+import pipeline
+from dashboard import pitching_dashboard, DashboardTemplate
+from preprocessing import df_processing, df_grouping
+from synthetic import synthetic_statcast, synthetic_leaderboard, seed_offline_mlb_api
+from constants import stats
+
+
+@pytest.fixture(scope='module')
+def league_df():
+    df = synthetic_statcast(n_pitchers=3, n_games=12, pitches_per_game=60, seed=5)
+    for pitcher_id in df['pitcher'].unique():
+        seed_offline_mlb_api(int(pitcher_id))
+    return df
+
+
+@pytest.fixture
+def render(league_df, tmp_path, monkeypatch):
+    monkeypatch.setattr(pipeline, 'persist_artifacts', False)
+    reference, _ = df_grouping(df_processing(league_df))
+    leaderboard = synthetic_leaderboard(sorted(league_df['pitcher'].unique()))
+    path = str(tmp_path / 'dashboard.png')
+
+    def render(pitcher_id, template=None, fatigue_df=None):
+        pitching_dashboard(pitcher_id, league_df[league_df['pitcher'] == pitcher_id], stats, reference, 2024,
+                           fatigue_df, fangraphs_df=leaderboard, output_path=path, show=False, template=template,
+                           dpi=30)
+        if template is None:
+            plt.close('all')
+        return plt.imread(path)
+
+    return render
+
+
+def test_template_render_matches_new_figure(league_df, render):
+    first, second = [int(p) for p in league_df['pitcher'].unique()[:2]]
+    template = DashboardTemplate()
+    try:
+        render(first, template)
+        np.testing.assert_array_equal(render(second, template), render(second))
+        # Panels without data hide their axes, which needs a different spacing
+        np.testing.assert_array_equal(render(second, template, pd.DataFrame()), render(second, None, pd.DataFrame()))
+        assert len(template.layouts) == 2
+    finally:
+        template.close()
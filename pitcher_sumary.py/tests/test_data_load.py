@@ -0,0 +1,71 @@
+import os
+import time
+import pandas as pd
+import pytest
+
+pytest.importorskip('pybaseball')
+import data_load
+import downloader
+import store
+from synthetic import synthetic_statcast
+
+
+@pytest.fixture
+def league_df(tmp_path, monkeypatch):
+    for module in (store, downloader, data_load):
+        monkeypatch.setattr(module, 'cache_dir', str(tmp_path))
+    return synthetic_statcast(n_pitchers=2, n_games=6, pitches_per_game=40, seed=3)
+
+
+@pytest.fixture
+def cache_loads(monkeypatch):
+    loads = []
+
+    def load_cached_pitch_data(pitcher_id, season, refresh, max_age_hours):
+        loads.append((pitcher_id, season))
+        return pd.DataFrame()
+
+    monkeypatch.setattr(data_load, 'load_cached_pitch_data', load_cached_pitch_data)
+    return loads
+
+
+def test_complete_store_serves_only_its_season_view(league_df, cache_loads):
+    pitcher_id = int(league_df['pitcher'].iloc[0])
+    store.write_league_store(league_df, 2024)
+    store.record_coverage(2024, pd.Timestamp(data_load.season_dates(2024)[1]))
+
+    df = data_load.load_pitch_data(pitcher_id, 2024)
+    assert len(df) == (league_df['pitcher'] == pitcher_id).sum()
+    assert cache_loads == []
+
+    # A regular season store does not hold the postseason
+    data_load.load_pitch_data(pitcher_id, 2024, postseason=True)
+    assert cache_loads == [(pitcher_id, 2024)]
+
+
+def test_store_in_progress_is_current_until_max_age(league_df, cache_loads):
+    pitcher_id = int(league_df['pitcher'].iloc[0])
+    season = pd.Timestamp.today().year + 1
+    store.write_league_store(league_df, season)
+    store.record_coverage(season, pd.Timestamp.today().normalize() - pd.Timedelta(days=1))
+
+    data_load.load_pitch_data(pitcher_id, season, max_age_hours=12)
+    assert cache_loads == []
+
+    written = time.time() - 13 * 3600
+    os.utime(store.coverage_path(season), (written, written))
+    data_load.load_pitch_data(pitcher_id, season, max_age_hours=12)
+    assert cache_loads == [(pitcher_id, season)]
+
+
+def test_build_moves_coverage_only_over_contiguous_ranges(league_df, monkeypatch):
+    dates = pd.to_datetime(league_df['game_date'])
+    monkeypatch.setattr(store, 'fetch_statcast',
+                        lambda start, end: league_df[(dates >= start) & (dates <= end)].reset_index(drop=True))
+
+    store.build_league_store(2024, end_date='2024-04-10')
+    assert store.store_coverage(2024)[0] == pd.Timestamp('2024-04-10')
+    store.build_league_store(2024, '2024-04-20', '2024-04-30')
+    assert store.store_coverage(2024)[0] == pd.Timestamp('2024-04-10')
+    store.build_league_store(2024, '2024-04-11', '2024-04-19')
+    assert store.store_coverage(2024)[0] == pd.Timestamp('2024-04-19')
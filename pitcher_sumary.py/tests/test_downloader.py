@@ -0,0 +1,64 @@
+import os
+import pytest
+import downloader
+
+
+@pytest.fixture
+def checkpoints(tmp_path, monkeypatch):
+    monkeypatch.setattr(downloader, 'cache_dir', str(tmp_path))
+    monkeypatch.setattr(downloader, 'backoff_seconds', 0)
+    return tmp_path / 'downloads'
+
+
+class FakeFetch:
+    def __init__(self, failing=()):
+        self.failing = set(failing)
+        self.calls = []
+
+    def __call__(self, start_date, end_date):
+        self.calls.append((start_date, end_date))
+        if (start_date, end_date) in self.failing:
+            raise ConnectionError('fetch failed')
+        return [start_date] * 3
+
+
+def test_date_chunks_cover_range_inclusively():
+    assert downloader.date_chunks('2024-04-01', '2024-04-17', 7) == [
+        ('2024-04-01', '2024-04-07'), ('2024-04-08', '2024-04-14'), ('2024-04-15', '2024-04-17')]
+    assert downloader.date_chunks('2024-04-01', '2024-04-01', 7) == [('2024-04-01', '2024-04-01')]
+    assert downloader.date_chunks('2024-04-02', '2024-04-01', 7) == []
+
+
+def test_retries_then_succeeds(checkpoints):
+    attempts = []
+
+    def flaky(start_date, end_date):
+        attempts.append(start_date)
+        if len(attempts) < 3:
+            raise ConnectionError('fetch failed')
+        return 'rows'
+
+    assert downloader.fetch_with_retry(flaky, '2024-04-01', '2024-04-07') == 'rows'
+    assert len(attempts) == 3
+
+
+def test_exhausted_chunk_is_fetched_on_resume(checkpoints):
+    chunks = downloader.date_chunks('2024-04-01', '2024-04-21', 7)
+    fetch, sunk = FakeFetch(failing=[chunks[1]]), []
+    with pytest.raises(ConnectionError):
+        downloader.download_range('test', '2024-04-01', '2024-04-21', fetch,
+                                  lambda df, chunk: sunk.append(chunk), chunk_days=7, workers=1)
+    assert fetch.calls.count(chunks[1]) == downloader.max_attempts
+    assert sunk == [chunks[0]]
+    assert os.path.exists(checkpoints / 'test' / f"{chunks[0][0]}_{chunks[0][1]}.done")
+    assert downloader.pending_downloads('te') == ['test']
+
+    # The manifest's chunks are resumed even if the chunk size changes, and done chunks are skipped
+    fetch = FakeFetch()
+    rows = downloader.download_range('test', '2024-04-01', '2024-04-21', fetch,
+                                     lambda df, chunk: sunk.append(chunk), chunk_days=3, workers=2)
+    assert sorted(fetch.calls) == chunks[1:]
+    assert sorted(sunk) == chunks
+    assert rows == 6
+    assert downloader.pending_downloads() == []
+    assert not os.path.exists(checkpoints / 'test')
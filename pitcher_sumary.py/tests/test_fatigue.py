@@ -0,0 +1,61 @@
+import numpy as np
+import pandas as pd
+import pytest
+from fatigue import create_fatigue_features, pitch_count_in_game, decay_pitches, min_decay_pitches
+from synthetic import synthetic_statcast
+
+
+def loop_fatigue_features(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    The original game-by-game implementation of create_fatigue_features, kept as a reference.
+    """
+    df = df.sort_values(by='game_date', kind='stable')
+    games = df['game_pk'].unique()
+    pitch_types = df['pitch_type'].dropna().unique()
+    rows = []
+    for idx, game_id in enumerate(games):
+        game_df = df[df['game_pk'] == game_id]
+        past_df = df[df['game_pk'].isin(games[:idx])]
+        for pt in pitch_types:
+            game_pitch_df = game_df[game_df['pitch_type'] == pt]
+            past_pitch_df = past_df[past_df['pitch_type'] == pt]
+            if game_pitch_df.empty or past_pitch_df.empty:
+                continue
+            balls, strikes = (game_pitch_df['balls'] > 0).sum(), (game_pitch_df['strikes'] > 0).sum()
+            past_balls, past_strikes = (past_pitch_df['balls'] > 0).sum(), (past_pitch_df['strikes'] > 0).sum()
+            rows.append({
+                'game_pk': game_id,
+                'game_number': idx + 1,
+                'pitch_type': pt,
+                'total_pitches': len(game_pitch_df),
+                'release_speed_mean': game_pitch_df['release_speed'].mean(),
+                'release_spin_mean': game_pitch_df['release_spin_rate'].mean(),
+                'season_avg_velocity': past_pitch_df['release_speed'].mean(),
+                'season_avg_spin': past_pitch_df['release_spin_rate'].mean(),
+                'ball_strike_ratio': balls / (balls + strikes) if balls + strikes else np.nan,
+                'season_ball_strike_ratio': past_balls / (past_balls + past_strikes) if past_balls + past_strikes else np.nan,
+            })
+    return pd.DataFrame(rows)
+
+
+@pytest.fixture(scope='module')
+def season():
+    return synthetic_statcast(n_pitchers=1, n_games=12, pitches_per_game=60, seed=3)
+
+
+def test_create_fatigue_features_matches_loop(season):
+    expected = loop_fatigue_features(season)
+    result = create_fatigue_features(season)
+    pd.testing.assert_frame_equal(result[expected.columns], expected, check_dtype=False, rtol=1e-5)
+
+
+def test_decay_slopes_match_least_squares(season):
+    result = create_fatigue_features(season).set_index(['game_pk', 'pitch_type'])
+    pitch_count = pitch_count_in_game(season)
+    for (game_pk, pitch_type), row in result.iterrows():
+        rows = ((season['game_pk'] == game_pk) & (season['pitch_type'] == pitch_type)).to_numpy()
+        if rows.sum() < min_decay_pitches:
+            assert np.isnan(row['velocity_decay'])
+            continue
+        slope = np.polyfit(pitch_count[rows], season['release_speed'].to_numpy(dtype='float64')[rows], 1)[0]
+        assert row['velocity_decay'] == pytest.approx(slope * decay_pitches, rel=1e-6)
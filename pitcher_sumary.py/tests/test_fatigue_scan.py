@@ -0,0 +1,66 @@
+import pandas as pd
+import pytest
+
+pytest.importorskip('pybaseball')
+import store
+from fatigue import create_fatigue_features, fatigue_columns
+from fatigue_scan import league_fatigue_features, rank_fatigued_pitchers, scan_league_fatigue
+from synthetic import synthetic_statcast
+
+
+def fatigue_game(df: pd.DataFrame, pitcher_id, game_number: int, velocity_loss: float = 3.0):
+    """
+    Makes a pitcher's `game_number`-th game (1-based, by date) fatigued: slower, lower spin,
+    and every pitch thrown in a ball count.
+    """
+    games = df.loc[df['pitcher'] == pitcher_id].sort_values('game_date')['game_pk'].unique()
+    rows = (df['pitcher'] == pitcher_id) & (df['game_pk'] == games[game_number - 1])
+    df = df.copy()
+    df.loc[rows, 'release_speed'] -= velocity_loss
+    df.loc[rows, 'release_spin_rate'] -= 200
+    df.loc[rows, ['balls', 'strikes']] = [3, 0]
+    return df
+
+
+@pytest.fixture(scope='module')
+def league_df():
+    return synthetic_statcast(n_pitchers=4, n_games=8, pitches_per_game=60, seed=13)
+
+
+def test_rank_orders_recent_flags_by_games_then_velocity_drop(league_df):
+    first, second, third, fourth = league_df['pitcher'].unique()
+    df = league_df
+    # Two recent fatigued games; one big drop; one small drop; one outside the recent window
+    df = fatigue_game(fatigue_game(df, first, 7), first, 8)
+    df = fatigue_game(df, second, 8, velocity_loss=6.0)
+    df = fatigue_game(df, third, 8, velocity_loss=2.5)
+    df = fatigue_game(df, fourth, 3)
+
+    features = league_fatigue_features(df)
+    assert features.loc[features['pitcher'] == fourth, 'fatigue_flag'].sum() > 0
+    ranked = rank_fatigued_pitchers(features, recent_games=3)
+    assert ranked['pitcher'].tolist() == [first, second, third]
+    assert ranked['rank'].tolist() == [1, 2, 3]
+    assert ranked['flagged_games'].tolist() == [2, 1, 1]
+    assert ranked.loc[1, 'velocity_drop'] < ranked.loc[2, 'velocity_drop']
+
+    # A wider window reaches the older fatigued game too
+    assert fourth in rank_fatigued_pitchers(features, recent_games=6)['pitcher'].tolist()
+
+
+def test_league_features_match_each_pitcher(league_df):
+    df = fatigue_game(league_df, league_df['pitcher'].iloc[0], 6)
+    features = league_fatigue_features(df)
+    for pitcher_id, pitcher_df in df.groupby('pitcher'):
+        result = features.loc[features['pitcher'] == pitcher_id, fatigue_columns].reset_index(drop=True)
+        pd.testing.assert_frame_equal(result, create_fatigue_features(pitcher_df), check_dtype=False, rtol=1e-9)
+
+
+def test_pool_scan_matches_single_pass(league_df, tmp_path, monkeypatch):
+    monkeypatch.setattr(store, 'cache_dir', str(tmp_path))
+    store.write_league_store(fatigue_game(league_df, league_df['pitcher'].iloc[0], 6), 2024)
+    keys = ['pitcher', 'game_pk', 'pitch_type']
+    single = scan_league_fatigue(2024).sort_values(keys).reset_index(drop=True)
+    pooled = scan_league_fatigue(2024, workers=2).sort_values(keys).reset_index(drop=True)
+    assert single['fatigue_flag'].sum() > 0
+    pd.testing.assert_frame_equal(pooled, single)
@@ -0,0 +1,81 @@
+import pandas as pd
+import pytest
+
+pytest.importorskip('pybaseball')
+from fatigue import create_fatigue_features, fatigue_columns
+import fatigue_state
+from fatigue_state import empty_fatigue_state, fold_games, update_fatigue_state, fatigue_history, load_fatigue_state
+from synthetic import synthetic_statcast
+
+
+@pytest.fixture(scope='module', params=['oldest_first', 'newest_first'])
+def league_df(request):
+    df = synthetic_statcast(n_pitchers=3, n_games=10, pitches_per_game=60, seed=11)
+    # Statcast downloads list the newest pitches first
+    return df if request.param == 'oldest_first' else df.iloc[::-1].reset_index(drop=True)
+
+
+def assert_matches_batch(features: pd.DataFrame, df: pd.DataFrame):
+    for pitcher_id, pitcher_df in df.groupby('pitcher'):
+        expected = create_fatigue_features(pitcher_df)
+        result = features.loc[features['pitcher'] == pitcher_id, fatigue_columns].reset_index(drop=True)
+        pd.testing.assert_frame_equal(result, expected, check_dtype=False, rtol=1e-9)
+
+
+def test_fold_games_matches_create_fatigue_features(league_df):
+    state, _ = fold_games(empty_fatigue_state(), league_df)
+    assert_matches_batch(state['features'], league_df)
+
+
+def test_incremental_folds_match_one_fold(league_df):
+    dates = pd.to_datetime(league_df['game_date'])
+    cut = dates.sort_values().iloc[len(dates) // 2]
+    state, _ = fold_games(empty_fatigue_state(), league_df[dates < cut])
+    state, scored = fold_games(state, league_df[dates >= cut])
+    assert set(scored['game_pk']) == set(league_df.loc[dates >= cut, 'game_pk'])
+    assert_matches_batch(state['features'], league_df)
+
+
+def halves(df: pd.DataFrame):
+    dates = pd.to_datetime(df['game_date'])
+    cut = dates.sort_values().iloc[len(dates) // 2]
+    return df[dates < cut], df[dates >= cut]
+
+
+def test_stored_updates_match_one_fold(league_df, tmp_path, monkeypatch):
+    monkeypatch.setattr(fatigue_state, 'cache_dir', str(tmp_path))
+    for half in halves(league_df):
+        update_fatigue_state(2024, half)
+    assert len(fatigue_state.features_parts(2024, fatigue_state.current_version(2024))) == 2
+    expected, _ = fold_games(empty_fatigue_state(), league_df)
+    for pitcher_id in league_df['pitcher'].unique():
+        pd.testing.assert_frame_equal(fatigue_history(pitcher_id, 2024),
+                                      create_fatigue_features(league_df[league_df['pitcher'] == pitcher_id]),
+                                      check_dtype=False, rtol=1e-9)
+    pd.testing.assert_frame_equal(load_fatigue_state(2024)['totals'], expected['totals'], check_dtype=False)
+
+
+def test_interrupted_update_leaves_previous_state(league_df, tmp_path, monkeypatch):
+    monkeypatch.setattr(fatigue_state, 'cache_dir', str(tmp_path))
+    first, second = halves(league_df)
+    update_fatigue_state(2024, first)
+    saved = load_fatigue_state(2024)
+
+    replace = fatigue_state.os.replace
+
+    def killed_before_commit(src, dst):
+        if dst.endswith('CURRENT'):
+            raise KeyboardInterrupt
+        replace(src, dst)
+
+    monkeypatch.setattr(fatigue_state.os, 'replace', killed_before_commit)
+    with pytest.raises(KeyboardInterrupt):
+        update_fatigue_state(2024, second)
+    monkeypatch.setattr(fatigue_state.os, 'replace', replace)
+
+    for name, table in load_fatigue_state(2024).items():
+        pd.testing.assert_frame_equal(table, saved[name])
+    # The retried update folds the second half in once
+    update_fatigue_state(2024, second)
+    expected, _ = fold_games(empty_fatigue_state(), league_df)
+    pd.testing.assert_frame_equal(load_fatigue_state(2024)['totals'], expected['totals'], check_dtype=False)
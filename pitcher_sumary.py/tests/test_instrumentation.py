@@ -0,0 +1,48 @@
+import threading
+import pytest
+import instrumentation
+
+
+@pytest.fixture
+def metrics(monkeypatch):
+    monkeypatch.setattr(instrumentation, 'enabled', True)
+    instrumentation.reset()
+    yield instrumentation
+    instrumentation.reset()
+
+
+def test_prometheus_groups_counters_under_one_type_line(metrics):
+    metrics.count_cache('statcast', hit=True)
+    metrics.count('rows_processed.pitches', 10)
+    metrics.count_cache('league_store', hit=True)
+    metrics.count('download_chunks')
+    metrics.count('rows_processed.games', 2)
+    with metrics.stage('load'):
+        pass
+
+    lines = metrics.prometheus_text('test').splitlines()
+    assert lines[4:] == [
+        '# TYPE test_cache_hits counter',
+        'test_cache_hits{kind="league_store"} 1',
+        'test_cache_hits{kind="statcast"} 1',
+        '# TYPE test_download_chunks counter',
+        'test_download_chunks 1',
+        '# TYPE test_rows_processed counter',
+        'test_rows_processed{kind="games"} 2',
+        'test_rows_processed{kind="pitches"} 10',
+    ]
+    assert sum(line.startswith('# TYPE') for line in lines) == 5
+
+
+def test_concurrent_counts_are_not_lost(metrics):
+    def work():
+        for _ in range(20_000):
+            metrics.count('requests')
+            metrics.count_cache('rendered', hit=False)
+
+    threads = [threading.Thread(target=work) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert metrics.report()['counters'] == {'requests': 80_000, 'cache_misses.rendered': 80_000}
@@ -0,0 +1,35 @@
+import pandas as pd
+import pytest
+
+pytest.importorskip('pybaseball')
+import league
+from preprocessing import df_processing, df_grouping
+from synthetic import synthetic_statcast
+
+reference_columns = ['pitch', 'release_speed', 'pfx_z', 'pfx_x', 'release_spin_rate', 'release_extension',
+                     'pitch_usage', 'whiff_rate', 'in_zone_rate', 'chase_rate', 'delta_run_exp_per_100', 'xwoba']
+
+
+@pytest.fixture(scope='module')
+def league_df():
+    return synthetic_statcast(n_pitchers=12, n_games=8, pitches_per_game=80, seed=7)
+
+
+def by_pitch_type(df: pd.DataFrame):
+    return df.set_index('pitch_type')[reference_columns].sort_index()
+
+
+def test_reference_from_daily_sums_matches_grouping(league_df):
+    expected, _ = df_grouping(df_processing(league_df))
+    result = league.reference_from_sums(league.daily_sums(league_df))
+    pd.testing.assert_frame_equal(by_pitch_type(result), by_pitch_type(expected), check_dtype=False, rtol=1e-5)
+
+
+def test_incremental_reference_matches_full_build(league_df, tmp_path, monkeypatch):
+    monkeypatch.setattr(league, 'cache_dir', str(tmp_path))
+    dates = pd.to_datetime(league_df['game_date'])
+    cut = dates.sort_values().iloc[len(dates) // 2]
+    league.update_league_reference(2024, league_df[dates < cut])
+    result = league.update_league_reference(2024, league_df[dates >= cut])
+    expected = league.reference_from_sums(league.daily_sums(league_df))
+    pd.testing.assert_frame_equal(by_pitch_type(result), by_pitch_type(expected), check_dtype=False, rtol=1e-9)
@@ -0,0 +1,31 @@
+import time
+import pytest
+import mlb_api
+
+
+@pytest.fixture(autouse=True)
+def empty_memo(monkeypatch):
+    monkeypatch.setattr(mlb_api, 'memo', {})
+
+
+def test_fetch_once_reuses_fresh_values():
+    calls = []
+    for _ in range(3):
+        value = mlb_api.fetch_once('key', lambda: calls.append(1) or 'value')
+    assert value == 'value'
+    assert len(calls) == 1
+
+
+def test_fetch_once_refetches_expired_values():
+    mlb_api.memo['key'] = (time.time() - 2 * 3600, 1, 'old team')
+    assert mlb_api.fetch_once('key', lambda: 'new team', max_age_hours=1) == 'new team'
+    assert mlb_api.memo['key'][2] == 'new team'
+
+
+def test_memo_drops_least_recently_used(monkeypatch):
+    monkeypatch.setattr(mlb_api, 'max_memo_entries', 3)
+    for i in range(3):
+        mlb_api.remember(f"key{i}", i)
+    mlb_api.fetch_once('key0', lambda: None)  # key0 becomes the most recently used
+    mlb_api.remember('key3', 3)
+    assert list(mlb_api.memo) == ['key2', 'key0', 'key3']
@@ -0,0 +1,58 @@
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+import numpy as np
+import pytest
+import output
+
+
+@pytest.fixture
+def saves(monkeypatch):
+    dpis = []
+    save_figure = output.save_figure
+
+    def counting(fig, path, fmt, dpi, crop=True):
+        dpis.append(dpi)
+        return save_figure(fig, path, fmt, dpi, crop)
+
+    monkeypatch.setattr(output, 'save_figure', counting)
+    return dpis
+
+
+def scatter_figure():
+    fig, ax = plt.subplots()
+    x = np.linspace(0, 1, 500)
+    ax.scatter(x, np.sin(x * 20))
+    ax.fill_between(x, 0, x)
+    ax.plot(x, x)
+    return fig
+
+
+def test_rasterize_marks_scatter_and_fills(tmp_path, saves, caplog):
+    fig = scatter_figure()
+    with caplog.at_level('INFO'):
+        report = output.save_dashboard(fig, str(tmp_path / 'out.pdf'), dpi=300, rasterize=True)
+    assert report['rasterized_layers'] == 2
+    assert report['dpi'] == output.max_raster_dpi
+    assert "not the requested 300" in caplog.text
+    assert all(c.get_rasterized() for c in fig.axes[0].collections)
+    assert not fig.axes[0].lines[0].get_rasterized()
+    plt.close(fig)
+
+
+def test_vector_file_without_layers_is_saved_once(tmp_path, saves):
+    fig, ax = plt.subplots()
+    ax.plot([0, 1], [0, 1])
+    report = output.save_dashboard(fig, str(tmp_path / 'out.pdf'), dpi=300, max_bytes=10)
+    assert saves == [300]
+    assert report['rasterized_layers'] == 0
+    assert not report['within_budget']
+    plt.close(fig)
+
+
+def test_over_budget_steps_down_resolution(tmp_path, saves):
+    fig = scatter_figure()
+    report = output.save_dashboard(fig, str(tmp_path / 'out.png'), dpi=300, max_bytes=10)
+    assert saves == [300] + output.fallback_dpis
+    assert report['dpi'] == output.fallback_dpis[-1]
+    plt.close(fig)
@@ -0,0 +1,41 @@
+import os
+import time
+import pandas as pd
+import pytest
+import pipeline
+from synthetic import synthetic_statcast
+
+
+@pytest.fixture(autouse=True)
+def artifact_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(pipeline, 'cache_dir', str(tmp_path))
+    monkeypatch.setattr(pipeline, 'artifact_memo', {})
+    return tmp_path / 'artifacts'
+
+
+def test_persisted_artifacts_round_trip(artifact_dir):
+    raw = synthetic_statcast(n_pitchers=1, n_games=8, pitches_per_game=60, seed=2)
+    targets = ['processed', 'fatigue', 'usage', 'tto', 'table_cells']
+    sources = dict(raw=raw, league_reference=pipeline.df_grouping(pipeline.df_processing(raw))[0],
+                   league_percentiles=None, usage_window=5)
+    computed = pipeline.build_artifacts(targets, **sources)
+    assert any(name.endswith('.parquet') for name in os.listdir(artifact_dir))
+
+    pipeline.artifact_memo.clear()
+    loaded = pipeline.build_artifacts(targets, **sources)
+    for name in ['processed', 'fatigue', 'usage', 'tto']:
+        pd.testing.assert_frame_equal(loaded[name], computed[name])
+    pd.testing.assert_frame_equal(loaded['table_cells'][0], computed['table_cells'][0])
+    assert loaded['table_cells'][1] == computed['table_cells'][1]
+
+
+def test_prune_drops_old_then_least_recently_used(artifact_dir):
+    artifact_dir.mkdir()
+    now = time.time()
+    for name, age_days in [('old', 30), ('a', 3), ('b', 2), ('c', 1)]:
+        path = artifact_dir / f"{name}.pkl"
+        path.write_bytes(b'x' * 100)
+        os.utime(path, (now - age_days * 86400,) * 2)
+
+    assert pipeline.prune_artifacts(max_age_days=14, max_bytes=250) == 2
+    assert sorted(os.listdir(artifact_dir)) == ['b.pkl', 'c.pkl']
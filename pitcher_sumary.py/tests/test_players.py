@@ -0,0 +1,62 @@
+import logging
+import pandas as pd
+import pytest
+
+pytest.importorskip('pybaseball')
+from players import PlayerRegister, normalize_name, split_suffix
+
+
+@pytest.fixture(scope='module')
+def register():
+    return PlayerRegister(pd.DataFrame([
+        (115135, 'Ken', 'Griffey', 'Sr.', 1973, 1991),
+        (115136, 'Ken', 'Griffey', 'Jr.', 1989, 2010),
+        (622491, 'Luis', 'Castillo', None, 2017, 2024),
+        (111111, 'Luis', 'Castillo', None, 1996, 2010),
+        (608070, 'Jose', 'Ramirez', None, 2013, 2024),
+        (407867, 'Vladimir', 'Nunez', None, 1998, 2007),
+        (467808, 'Eduardo', 'Nunez', None, 2010, 2019),
+        (594798, 'Jacob', 'deGrom', None, 2014, 2024),
+    ], columns=['key_mlbam', 'name_first', 'name_last', 'name_suffix', 'mlb_played_first', 'mlb_played_last']))
+
+
+def test_normalize_name_keeps_suffixes_and_initials():
+    assert normalize_name("José Ramírez") == 'jose ramirez'
+    assert split_suffix("Luis Castillo Jr.") == ('luis castillo', 'jr')
+    assert split_suffix("V. Nunez") == ('v nunez', '')
+    assert split_suffix("Ken Griffey Sr.") == ('ken griffey', 'sr')
+
+
+@pytest.mark.parametrize('name, player_id', [
+    ("Ken Griffey Sr.", 115135),
+    ("Ken Griffey Jr.", 115136),
+    ("Ken Griffey", 115136),
+    ("Griffey Sr.", 115135),
+    ("Luis Castillo Jr.", 622491),
+    ("Luis Castillo", 622491),
+    ("José Ramírez", 608070),
+    ("JOSE RAMIREZ", 608070),
+    ("V. Nunez", 407867),
+    ("E Nunez", 467808),
+    ("J. deGrom", 594798),
+    ("deGrom", 594798),
+    ("Jacob deGrm", 594798),
+])
+def test_lookup(register, name, player_id):
+    assert register.lookup(name) == player_id
+
+
+def test_ambiguous_last_name_is_not_guessed(register, caplog):
+    with caplog.at_level(logging.WARNING):
+        assert register.lookup("Castillo") is None
+    assert 'last name' in caplog.text
+    assert register.lookup("Nobody Atall") is None
+
+
+def test_suffix_in_last_name_without_suffix_column():
+    register = PlayerRegister(pd.DataFrame([
+        (115135, 'Ken', 'Griffey', 1973, 1991),
+        (115136, 'Ken', 'Griffey Jr.', 1989, 2010),
+    ], columns=['key_mlbam', 'name_first', 'name_last', 'mlb_played_first', 'mlb_played_last']))
+    assert register.lookup("Ken Griffey Jr.") == 115136
+    assert register.lookup("Ken Griffey") == 115135
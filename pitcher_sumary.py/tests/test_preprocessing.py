@@ -0,0 +1,153 @@
+import matplotlib.colors as mcolors
+import numpy as np
+import pandas as pd
+import pytest
+from preprocessing import (df_processing, df_grouping, get_cell_colors, plot_pitch_format, cmap_sum, cmap_sum_r,
+                           times_through_order, tto_grouping, max_times_through)
+from constants import table_columns, color_stats, pitch_stats_dict
+from sketch import QuantileDigest, table_from_digests
+from synthetic import synthetic_statcast
+
+
+def loop_cell_colors(df_group: pd.DataFrame, df_statcast_group: pd.DataFrame):
+    """
+    The original cell-by-cell implementation of get_cell_colors, kept as a reference.
+    """
+    rows = []
+    for pt in df_group['pitch_type'].unique():
+        df_pitch = df_group[df_group['pitch_type'] == pt]
+        ref_pitch = df_statcast_group[df_statcast_group['pitch_type'] == pt]
+        row = []
+        for col in table_columns:
+            val = df_pitch[col].values[0]
+            ref = pd.to_numeric(ref_pitch[col], errors='coerce').mean()
+            if col not in color_stats or not isinstance(val, (int, float)) or np.isnan(val):
+                row.append('#ffffff')
+                continue
+            if col == 'release_speed':
+                normalize, cmap = mcolors.Normalize(vmin=ref * 0.95, vmax=ref * 1.05), cmap_sum
+            elif col == 'delta_run_exp_per_100':
+                normalize, cmap = mcolors.Normalize(vmin=-1.5, vmax=1.5), cmap_sum
+            else:
+                normalize = mcolors.Normalize(vmin=ref * 0.7, vmax=ref * 1.3)
+                cmap = cmap_sum_r if col == 'xwoba' else cmap_sum
+            row.append(mcolors.to_hex(cmap(normalize(val))))
+        rows.append(row)
+    return rows
+
+
+@pytest.fixture(scope='module')
+def tables():
+    league_df = df_processing(synthetic_statcast(n_pitchers=6, n_games=6, pitches_per_game=80, seed=11))
+    df_statcast_group, _ = df_grouping(league_df)
+    df_group, _ = df_grouping(league_df[league_df['pitcher'] == league_df['pitcher'].iloc[0]])
+    return df_group, df_statcast_group
+
+
+def test_cell_colors_match_cell_loop(tables):
+    df_group, df_statcast_group = tables
+    assert get_cell_colors(df_group, df_statcast_group, color_stats, cmap_sum, cmap_sum_r) == \
+        loop_cell_colors(df_group, df_statcast_group)
+
+
+def test_cell_colors_use_league_percentiles(tables):
+    df_group, df_statcast_group = tables
+    pitch_type = df_group['pitch_type'].iloc[0]
+    rng = np.random.default_rng(2)
+    digests = {(pitch_type, 'whiff_rate'): QuantileDigest.from_values(rng.uniform(0, 0.5, 1000)),
+               (pitch_type, 'xwoba'): QuantileDigest.from_values(rng.uniform(0.2, 0.45, 1000))}
+    colors = get_cell_colors(df_group, df_statcast_group, color_stats, cmap_sum, cmap_sum_r,
+                             league_percentiles=table_from_digests(digests))
+
+    expected = loop_cell_colors(df_group, df_statcast_group)
+    for stat, cmap in (('whiff_rate', cmap_sum), ('xwoba', cmap_sum_r)):
+        # The table stores float32 centroids, so compare against a digest read back the same way
+        digest = QuantileDigest(digests[(pitch_type, stat)].means.astype('float32'),
+                                digests[(pitch_type, stat)].weights.astype('float32'))
+        share = digest.cdf(df_group[stat].iloc[0])
+        expected[0][table_columns.index(stat)] = mcolors.to_hex(cmap(share))
+    # Other pitch types and stats keep the league mean coloring
+    assert colors == expected
+
+
+def test_table_format_matches_cell_loop(tables):
+    df_group, _ = tables
+    expected = df_group[table_columns].fillna('—')
+    for column, props in pitch_stats_dict.items():
+        if column in expected.columns:
+            expected[column] = expected[column].apply(
+                lambda x: format(x, props['format']) if isinstance(x, (int, float)) else x)
+    pd.testing.assert_frame_equal(plot_pitch_format(df_group).astype(str), expected.astype(str))
+
+
+def reliever_game():
+    """
+    A reliever entering with the seventh batter up: 12 plate appearances of 2 pitches each,
+    with the passes Statcast records for them.
+    """
+    at_bats = np.repeat(np.arange(40, 52), 2)
+    passes = np.where(at_bats < 43, 1, 2)
+    return pd.DataFrame({'pitcher': 1, 'game_pk': 7, 'at_bat_number': at_bats, 'n_thruorder_pitcher': passes})
+
+
+def test_times_through_order_uses_statcast_passes():
+    df = reliever_game()
+    np.testing.assert_array_equal(times_through_order(df), df['n_thruorder_pitcher'])
+
+
+def test_times_through_order_estimates_missing_passes():
+    df = reliever_game()
+    estimated = np.where(df['at_bat_number'] < 49, 1, 2)
+    np.testing.assert_array_equal(times_through_order(df.drop(columns='n_thruorder_pitcher')), estimated)
+    # Pitches missing a pass take the estimate; the rest keep Statcast's
+    missing = df['at_bat_number'].between(46, 48).to_numpy()
+    passes = df['n_thruorder_pitcher'].to_numpy()
+    df['n_thruorder_pitcher'] = df['n_thruorder_pitcher'].astype('float32').mask(missing)
+    np.testing.assert_array_equal(times_through_order(df), np.where(missing, estimated, passes))
+
+
+@pytest.fixture(scope='module')
+def passes_df():
+    # Long outings, so some pitchers face the order a fourth time
+    return df_processing(synthetic_statcast(n_pitchers=3, n_games=4, pitches_per_game=100, seed=4))
+
+
+def grouping_by_pass(df: pd.DataFrame):
+    """
+    tto_grouping's columns computed with df_grouping on each pass's rows, the last pass
+    pooling max_times_through and later.
+    """
+    passes = np.minimum(times_through_order(df), max_times_through)
+    primary = df['pitch_type'].value_counts().idxmax()
+    rows = []
+    for times_through in sorted(np.unique(passes)):
+        df_pass = df[passes == times_through]
+        df_group, _ = df_grouping(df_pass)
+        pitch_rows, all_row = df_group.iloc[:-1].set_index('pitch_type'), df_group.iloc[-1]
+        rows.append({
+            'times_through': times_through,
+            'pa': len(df_pass[['game_pk', 'at_bat_number']].drop_duplicates()),
+            'pitch': all_row['pitch'],
+            'primary_speed': pitch_rows['release_speed'].get(primary, np.nan),
+            'whiff_rate': all_row['whiff_rate'],
+            'chase_rate': all_row['chase_rate'],
+            'xwoba': all_row['xwoba'],
+            'delta_run_exp_per_100': all_row['delta_run_exp_per_100'],
+        })
+    return pd.DataFrame(rows)
+
+
+def test_tto_grouping_matches_grouping_each_pass(passes_df):
+    fourth_pass = passes_df['pitcher'][times_through_order(passes_df) > max_times_through].iloc[0]
+    df = passes_df[passes_df['pitcher'] == fourth_pass]
+    expected = grouping_by_pass(df)
+    result = tto_grouping(df)[expected.columns]
+    pd.testing.assert_frame_equal(result, expected, check_dtype=False)
+
+
+def test_tto_grouping_by_pitcher_matches_each_pitcher(passes_df):
+    result = tto_grouping(passes_df, by='pitcher')
+    for pitcher_id, df in passes_df.groupby('pitcher'):
+        expected = grouping_by_pass(df)
+        pitcher_rows = result[result['pitcher'] == pitcher_id].reset_index(drop=True)[expected.columns]
+        pd.testing.assert_frame_equal(pitcher_rows, expected, check_dtype=False)
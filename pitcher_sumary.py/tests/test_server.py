@@ -0,0 +1,95 @@
+import threading
+import urllib.error
+import urllib.request
+from http.server import ThreadingHTTPServer
+from types import SimpleNamespace
+import pandas as pd
+import pytest
+
+pytest.importorskip('pybaseball')
+import server
+
+
+@pytest.fixture
+def stub(tmp_path, monkeypatch):
+    """
+    Stubs out data loading and drawing; `drawn` lists the renders actually drawn.
+    """
+    drawn = []
+    data = {'loaded_at': 1.0, 'statcast_grouped_df': None, 'fangraphs_df': None, 'league_curves': None,
+            'league_percentiles': None}
+    pitches = {1: pd.DataFrame({'release_speed': [95.0, 88.0]}), 2: pd.DataFrame({'release_speed': [91.0]})}
+
+    def pitching_dashboard(pitcher_id, df, *args, output_path=None, dpi=None, **kwargs):
+        drawn.append((pitcher_id, dpi))
+        with open(output_path, 'wb') as f:
+            f.write(f"{pitcher_id}:{len(drawn)}".encode('utf-8'))
+
+    monkeypatch.setattr(server, 'season_data', lambda season: data)
+    monkeypatch.setattr(server, 'load_pitch_data', lambda pitcher_id, season: pitches[pitcher_id])
+    monkeypatch.setattr(server, 'pitching_dashboard', pitching_dashboard)
+    monkeypatch.setattr(server, 'DashboardTemplate', lambda: None)
+    monkeypatch.setattr(server, 'output_dir', str(tmp_path))
+    monkeypatch.setattr(server, 'rendered', {})
+    return SimpleNamespace(drawn=drawn, data=data, pitches=pitches)
+
+
+def test_repeat_request_is_served_from_rendered(stub):
+    first = server.render_dashboard(1, 2024)
+    assert server.render_dashboard(1, 2024) == first
+    assert stub.drawn == [(1, server.default_dpi['png'])]
+    server.render_dashboard(1, 2024, dpi=72)
+    assert len(stub.drawn) == 2
+
+
+def test_changed_data_renders_again(stub):
+    first = server.render_dashboard(1, 2024)
+    stub.pitches[1] = pd.DataFrame({'release_speed': [95.0, 88.0, 90.0]})
+    assert server.render_dashboard(1, 2024) != first
+    stub.data['loaded_at'] = 2.0
+    server.render_dashboard(1, 2024)
+    assert len(stub.drawn) == 3
+
+
+def test_rendered_drops_least_recently_used(stub, monkeypatch):
+    monkeypatch.setattr(server, 'max_rendered', 2)
+    server.render_dashboard(1, 2024)
+    server.render_dashboard(2, 2024)
+    server.render_dashboard(1, 2024)
+    server.render_dashboard(1, 2024, dpi=72)
+    assert list(server.rendered) == [(1, 2024, 'png', 100), (1, 2024, 'png', 72)]
+
+
+@pytest.fixture
+def get(stub, monkeypatch):
+    """
+    Serves DashboardHandler on a free port; returns a function giving (status, body) for a path.
+    """
+    monkeypatch.setattr(server, 'recent_latencies', server.deque(maxlen=1000))
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), server.DashboardHandler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+
+    def get(path):
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{httpd.server_port}{path}") as response:
+                return response.status, response.read()
+        except urllib.error.HTTPError as e:
+            return e.code, e.read()
+
+    yield get
+    httpd.shutdown()
+    httpd.server_close()
+
+
+@pytest.mark.parametrize('dpi', [-10, 0, 49, 601, 100000])
+def test_out_of_range_dpi_is_rejected(stub, get, dpi):
+    status, _ = get(f"/dashboard?pitcher_id=1&season=2024&dpi={dpi}")
+    assert status == 400
+    assert stub.drawn == []
+
+
+def test_every_dashboard_response_is_timed(stub, get):
+    assert get("/dashboard?pitcher_id=1&season=2024&dpi=72")[0] == 200
+    assert get("/dashboard?pitcher_id=1&season=2024&format=gif")[0] == 400
+    assert get("/dashboard?pitcher_id=3&season=2024")[0] == 404
+    assert len(server.recent_latencies) == 3
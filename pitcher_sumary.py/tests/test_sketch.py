@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+from sketch import QuantileDigest, table_from_digests, digests_from_table
+
+shares = np.array([0.001, 0.01, 0.1, 0.25, 0.5, 0.75, 0.9, 0.99, 0.999])
+
+
+@pytest.fixture(scope='module')
+def values():
+    return np.random.default_rng(3).gamma(2.0, 1.5, 50_000)
+
+
+def test_cdf_and_quantile_match_exact_ranks(values):
+    digest = QuantileDigest.from_values(values)
+    assert len(digest.means) <= digest.compression
+    np.testing.assert_allclose(digest.cdf(np.quantile(values, shares)), shares, atol=1e-3)
+    ranks = np.searchsorted(np.sort(values), digest.quantile(shares)) / len(values)
+    np.testing.assert_allclose(ranks, shares, atol=1e-3)
+
+
+def test_merge_matches_digest_of_union(values):
+    parts = [QuantileDigest.from_values(part) for part in np.array_split(values, 7)]
+    merged = parts[0].merge(*parts[1:])
+    union = QuantileDigest.from_values(values)
+    grid = np.quantile(values, np.linspace(0, 1, 101))
+    assert merged.total == union.total == len(values)
+    np.testing.assert_allclose(merged.cdf(grid), union.cdf(grid), atol=1e-3)
+
+
+def test_table_round_trip_keeps_digests(values):
+    digests = {('FF', 'release_speed'): QuantileDigest.from_values(values + 90),
+               ('SL', 'whiff_rate'): QuantileDigest.from_values(values[:500] / 10),
+               ('CU', 'whiff_rate'): QuantileDigest.from_values([])}
+    table = table_from_digests(digests)
+    assert list(table.columns) == ['pitch_type', 'stat', 'mean', 'weight']
+    result = digests_from_table(table)
+    # Empty digests are not stored
+    assert set(result) == {('FF', 'release_speed'), ('SL', 'whiff_rate')}
+    for key, digest in result.items():
+        np.testing.assert_allclose(digest.means, digests[key].means, rtol=1e-6)
+        np.testing.assert_allclose(digest.weights, digests[key].weights, rtol=1e-6)
+    assert table_from_digests({}).empty
+
+
+def test_empty_and_single_value_digests():
+    empty = QuantileDigest.from_values([np.nan, np.nan])
+    assert empty.total == 0
+    assert np.isnan(empty.cdf([1.0])).all() and np.isnan(empty.quantile([0.5])).all()
+    assert empty.merge(QuantileDigest.from_values([2.0])).total == 1
+
+    single = QuantileDigest.from_values([3.0])
+    np.testing.assert_array_equal(single.cdf([2.0, 3.0, 4.0, np.nan]), [0.0, 0.5, 1.0, np.nan])
+    np.testing.assert_array_equal(single.quantile([0.0, 0.5, 1.0]), [3.0, 3.0, 3.0])
+
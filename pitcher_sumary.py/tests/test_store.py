@@ -0,0 +1,53 @@
+import os
+import pandas as pd
+import pytest
+
+pytest.importorskip('pybaseball')
+import store
+from synthetic import synthetic_statcast
+
+
+@pytest.fixture
+def league_df(tmp_path, monkeypatch):
+    monkeypatch.setattr(store, 'cache_dir', str(tmp_path))
+    return synthetic_statcast(n_pitchers=3, n_games=8, pitches_per_game=40, seed=11)
+
+
+def write_in_chunks(df, season, n_chunks):
+    chunks = pd.qcut(pd.to_datetime(df['game_date']).rank(method='first'), n_chunks, labels=False)
+    for i in range(n_chunks):
+        store.write_league_store(df[chunks == i], season, part_name=f"chunk{i}")
+
+
+def stored(pitcher_id, season=2024):
+    df = store.read_pitcher(pitcher_id, season)
+    return df.sort_values(['game_date', 'at_bat_number', 'pitch_number']).reset_index(drop=True)
+
+
+def test_compaction_swaps_in_one_file_per_partition(league_df):
+    pitcher_id = int(league_df['pitcher'].iloc[0])
+    write_in_chunks(league_df, 2024, 3)
+    before = stored(pitcher_id)
+    old_version = os.path.realpath(store.partition_path(2024, pitcher_id))
+    assert len(os.listdir(old_version)) == 3
+
+    store.compact_league_store(2024)
+    path = store.partition_path(2024, pitcher_id)
+    assert os.path.islink(path)
+    assert os.listdir(path) == ['part-compacted-0.parquet']
+    pd.testing.assert_frame_equal(stored(pitcher_id), before)
+    # A reader that listed the old version just before the swap can still open its files
+    assert len(os.listdir(old_version)) == 3
+    assert len(store.read_league(2024)) == len(league_df)
+
+    # Chunks written after a compaction land in the new version and are merged by the next one
+    store.write_league_store(league_df[league_df['pitcher'] == pitcher_id].iloc[:5], 2024, part_name='late')
+    store.compact_league_store(2024)
+    assert len(stored(pitcher_id)) == len(before) + 5
+    assert not os.path.exists(old_version)
+
+
+def test_rewritten_chunk_replaces_its_files(league_df):
+    write_in_chunks(league_df, 2024, 2)
+    write_in_chunks(league_df, 2024, 2)
+    assert len(store.read_league(2024)) == len(league_df)
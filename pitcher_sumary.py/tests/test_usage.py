@@ -0,0 +1,52 @@
+import pandas as pd
+import pytest
+from usage import rolling_usage, rolling_usage_table, usage_modes
+from synthetic import synthetic_statcast
+
+
+def reference_rolling_usage(df: pd.DataFrame, window: int) -> pd.DataFrame:
+    """
+    The original per-pitch-type rolling usage from rolling_pitch_usage, kept as a reference.
+    """
+    df = df.assign(pitch_type=df['pitch_type'].astype(object))
+    df_game_group = pd.DataFrame((df.groupby(['game_pk', 'game_date', 'pitch_type'])['release_speed'].count() /
+                                  df.groupby(['game_pk', 'game_date'])['release_speed'].count()).reset_index())
+    all_games = pd.Series(df_game_group['game_pk'].unique())
+    all_pitch_types = pd.Series(df_game_group['pitch_type'].unique())
+    all_combinations = pd.MultiIndex.from_product([all_games, all_pitch_types],
+                                                  names=['game_pk', 'pitch_type']).to_frame(index=False)
+    df_complete = pd.merge(all_combinations, df_game_group, on=['game_pk', 'pitch_type'], how='left')
+    df_complete['release_speed'] = df_complete['release_speed'].fillna(0)
+
+    game_list = df.sort_values(by='game_date')['game_pk'].unique()
+    game_to_range = dict(zip(game_list, range(1, len(game_list) + 1)))
+    game_to_date = df.set_index('game_pk')['game_date'].to_dict()
+    df_complete['game_date'] = df_complete['game_pk'].map(game_to_date)
+    df_complete = df_complete.sort_values(by='game_date')
+    df_complete['game_number'] = df_complete['game_pk'].map(game_to_range)
+
+    usage = {}
+    for pitch_type in df['pitch_type'].value_counts().index:
+        pitch_data = df_complete[df_complete['pitch_type'] == pitch_type]
+        usage[pitch_type] = (pitch_data['release_speed'].rolling(window).sum() / window).set_axis(pitch_data['game_number'])
+    return pd.DataFrame(usage).sort_index().rename_axis(None)
+
+
+@pytest.fixture(scope='module')
+def league_df():
+    return synthetic_statcast(n_pitchers=3, n_games=14, pitches_per_game=70, seed=4)
+
+
+def test_game_window_matches_reference(league_df):
+    df = league_df[league_df['pitcher'] == league_df['pitcher'].iloc[0]]
+    expected = reference_rolling_usage(df, 5)
+    pd.testing.assert_frame_equal(rolling_usage(df, 5), expected, check_dtype=False, rtol=1e-9)
+
+
+@pytest.mark.parametrize('mode', usage_modes)
+def test_league_table_matches_each_pitcher(league_df, mode):
+    table = rolling_usage_table(league_df, 4, mode)
+    for pitcher_id, df in league_df.groupby('pitcher'):
+        expected = rolling_usage(df, 4, mode)
+        result = table[table['pitcher'] == pitcher_id].set_index('game_number').rename_axis(None)
+        pd.testing.assert_frame_equal(result[expected.columns], expected, check_dtype=False, rtol=1e-9)
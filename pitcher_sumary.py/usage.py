@@ -0,0 +1,181 @@
+import argparse
+import logging
+import os
+import numpy as np
+import pandas as pd
+from instrumentation import count
+from constants import cache_dir
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# How the rolling window is measured: the last N games (mean of per-game usage), the last N
+# pitches, the last N calendar days (share of the pitches thrown in them), or an exponentially
+# weighted mean of per-game usage with a span of N games
+usage_modes = ['games', 'pitches', 'days', 'ewm']
+
+# Raw columns the usage computation reads
+usage_columns = ['pitcher', 'game_pk', 'game_date', 'pitch_type', 'release_speed', 'at_bat_number', 'pitch_number']
+
+
+def game_pitch_counts(df: pd.DataFrame, by: str = None):
+    """
+    Pitches per game and pitch type as one 2D array (only pitches with a release speed count).
+
+    Returns (games, pitch_types, counts, codes):
+        games: one row per game in date order (within each `by` group), with `by`, game_pk,
+            game_date and game_number (from 1 within each group)
+        pitch_types: most thrown first
+        counts: len(games) x len(pitch_types) pitch counts
+        codes: (game row, pitch type) of every pitch in `df`, -1 for pitches not counted
+    """
+    keys = ([by] if by else []) + ['game_pk']
+    rows = pd.DataFrame({key: df[key].to_numpy() for key in keys + ['game_date']})
+    rows['row'] = np.arange(len(rows))
+    grouper = rows.groupby(keys, sort=False)
+    first_seen = grouper.ngroup().to_numpy()
+    games = grouper.agg(game_date=('game_date', 'first'), first_row=('row', 'min')).reset_index()
+
+    # Number games by date; games on the same date keep the order they appear in
+    order = games.sort_values(([by] if by else []) + ['game_date', 'first_row'], kind='stable').index.to_numpy()
+    rank = np.empty_like(order)
+    rank[order] = np.arange(len(order))
+    games = games.loc[order, keys + ['game_date']].reset_index(drop=True)
+    games['game_number'] = games.groupby(by).cumcount().to_numpy() + 1 if by else np.arange(1, len(games) + 1)
+
+    pitch_types = df['pitch_type'].value_counts()
+    pitch_types = pitch_types[pitch_types > 0].index.astype(object).tolist()
+    type_codes = pd.Categorical(df['pitch_type'], categories=pitch_types).codes.astype(np.int64)
+    counted = (type_codes >= 0) & df['release_speed'].notna().to_numpy()
+
+    game_codes = np.where(counted, rank[first_seen], -1)
+    type_codes = np.where(counted, type_codes, -1)
+    flat = game_codes[counted] * len(pitch_types) + type_codes[counted]
+    counts = np.bincount(flat, minlength=len(games) * len(pitch_types)).reshape(len(games), len(pitch_types))
+    return games, pitch_types, counts, (game_codes, type_codes)
+
+
+def group_starts(groups: np.ndarray):
+    """
+    For rows sorted by group, the index of the first row of each row's group.
+    """
+    new_group = np.r_[True, groups[1:] != groups[:-1]] if len(groups) else np.array([], dtype=bool)
+    return np.maximum.accumulate(np.where(new_group, np.arange(len(groups)), 0))
+
+
+def window_sums(cumulative: np.ndarray, end: np.ndarray, start: np.ndarray):
+    """
+    Sums of rows [start, end) from a cumulative array with a leading zero row.
+    """
+    return cumulative[end] - cumulative[start]
+
+
+def pitch_window_counts(df: pd.DataFrame, groups: np.ndarray, counts: np.ndarray, codes: tuple, window: int):
+    """
+    Pitch type counts over the last `window` pitches up to the end of each game, and whether
+    the window is full (the pitcher had thrown that many pitches by then).
+    """
+    game_codes, type_codes = codes
+    counted = game_codes >= 0
+    # Pitches in game order, then in the order they were thrown
+    sort_keys = [game_codes[counted]]
+    if 'at_bat_number' in df and 'pitch_number' in df:
+        sort_keys = [df['pitch_number'].to_numpy()[counted], df['at_bat_number'].to_numpy()[counted]] + sort_keys
+    else:
+        sort_keys = [-np.arange(len(df))[counted]] + sort_keys  # Statcast lists a game's pitches newest first
+    pitch_types = type_codes[counted][np.lexsort(sort_keys)]
+
+    cumulative = np.zeros((len(pitch_types) + 1, counts.shape[1]), dtype=np.int32)
+    cumulative[np.arange(1, len(pitch_types) + 1), pitch_types] = 1
+    np.cumsum(cumulative, axis=0, out=cumulative)
+
+    game_end = counts.sum(axis=1).cumsum()
+    group_first = np.r_[0, game_end][group_starts(groups)]
+    start = game_end - window
+    full = start >= group_first
+    return window_sums(cumulative, game_end, np.maximum(start, 0)), full
+
+
+def rolling_usage_table(df: pd.DataFrame, window: int, mode: str = 'games', by: str = 'pitcher'):
+    """
+    Rolling pitch usage for every `by` group at once (e.g. every pitcher in a league frame).
+
+    All windows are computed on one game x pitch type count matrix (see usage_modes); games
+    before a group's first full window are NaN, except in 'ewm' mode.
+
+    Returns one row per game (`by`, game_pk, game_date, game_number) plus one usage column
+    per pitch type.
+    """
+    if mode not in usage_modes:
+        raise ValueError(f"Unknown usage mode {mode!r}; expected one of {usage_modes}")
+    count('rows_processed.usage', len(df))
+    games, pitch_types, counts, codes = game_pitch_counts(df, by)
+    groups = games[by].to_numpy() if by else np.zeros(len(games), dtype=np.int64)
+    first = group_starts(groups)
+    rows = np.arange(len(games))
+    totals = counts.sum(axis=1, keepdims=True)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        shares = np.where(totals > 0, counts / totals, 0)
+
+    if mode == 'games':
+        cumulative = np.vstack([np.zeros((1, counts.shape[1])), shares.cumsum(axis=0)])
+        start = rows - window + 1
+        usage = window_sums(cumulative, rows + 1, np.maximum(start, 0)) / window
+        full = start >= first
+    elif mode == 'days':
+        days = games['game_date'].to_numpy().astype('datetime64[D]').astype(np.int64)
+        group_rank = np.cumsum(np.r_[0, groups[1:] != groups[:-1]]) if len(games) else rows
+        key = group_rank * 1_000_000 + days
+        start = np.searchsorted(key, key - window + 1)
+        cumulative = np.vstack([np.zeros((1, counts.shape[1]), dtype=np.int64), counts.cumsum(axis=0)])
+        window_counts = window_sums(cumulative, rows + 1, start)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            usage = window_counts / window_counts.sum(axis=1, keepdims=True)
+        full = days - window + 1 >= days[first]
+    elif mode == 'pitches':
+        window_counts, full = pitch_window_counts(df, groups, counts, codes, window)
+        usage = window_counts / window
+    else:
+        usage = (pd.DataFrame(shares).groupby(groups, sort=False).ewm(span=window).mean()
+                 .reset_index(level=0, drop=True).sort_index().to_numpy())
+        full = np.ones(len(games), dtype=bool)
+
+    usage = np.where(full[:, None], usage, np.nan)
+    return pd.concat([games, pd.DataFrame(usage, columns=pitch_types)], axis=1)
+
+
+def rolling_usage(df: pd.DataFrame, window: int, mode: str = 'games'):
+    """
+    Rolling pitch usage for one pitcher, one column per pitch type (most used first),
+    indexed by game number. See usage_modes for what `window` counts.
+    """
+    table = rolling_usage_table(df, window, mode, by=None)
+    return table.drop(columns=['game_pk', 'game_date']).set_index('game_number').rename_axis(None)
+
+
+def league_usage_path(season: int, window: int, mode: str):
+    return os.path.join(cache_dir, 'usage', str(season), f"{mode}_{window}.parquet")
+
+
+def update_league_usage(season: int, window: int = 5, mode: str = 'games'):
+    """
+    Computes rolling usage for every pitcher in the league store and writes it to
+    league_usage_path. Returns the table.
+    """
+    from store import read_league
+    table = rolling_usage_table(read_league(season, columns=usage_columns), window, mode)
+    path = league_usage_path(season, window, mode)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    table.to_parquet(path + '.tmp', index=False)
+    os.replace(path + '.tmp', path)
+    return table
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Precompute rolling pitch usage for every pitcher in a season.")
+    parser.add_argument('--season', type=int, required=True)
+    parser.add_argument('--window', type=int, default=5)
+    parser.add_argument('--mode', choices=usage_modes, default='games')
+    args = parser.parse_args()
+    table = update_league_usage(args.season, args.window, args.mode)
+    logging.info(f"Wrote usage for {table['pitcher'].nunique()} pitchers to "
+                 f"{league_usage_path(args.season, args.window, args.mode)}")
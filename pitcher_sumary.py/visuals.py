@@ -2,23 +2,21 @@ import matplotlib.pyplot as plt
 import seaborn as sns
 import pandas as pd
 import numpy as np
-import requests
 import math
 import matplotlib.gridspec as gridspec
-from PIL import Image
-from io import BytesIO
 import matplotlib.ticker as mtick
 from matplotlib.ticker import MaxNLocator, FuncFormatter
-import matplotlib.colors as mcolors
-from preprocessing import df_grouping, plot_pitch_format, get_cell_colors, cmap_sum, cmap_sum_r
-from constants import dict_color, image_dict, font_properties, font_properties_titles
-from constants import font_properties_axes, pitch_stats_dict, table_columns, color_stats
+from preprocessing import df_grouping, pitch_table_cells, tto_grouping, tto_table_cells
+from kde import bin_counts, kde_from_counts, velocity_grid
+from usage import rolling_usage
+from mlb_api import get_headshot, get_person, get_team_abbreviation, get_team_logo
+from constants import dict_color, font_properties, font_properties_titles
+from constants import font_properties_axes
 #from matplotlib.offsetbox import OffsetImage, AnnotationBbox
 
 
 def player_headshot(pitcher_id: str, ax: plt.Axes):
-    url = f'https://img.mlbstatic.com/mlb-photos/image/upload/d_people:generic:headshot:67:current.png/w_640,q_auto:best/v1/people/{pitcher_id}/headshot/silo/current.png'
-    img = Image.open(BytesIO(requests.get(url).content))
+    img = get_headshot(pitcher_id)
     ax.set_xlim(0, 1.3)
     ax.set_ylim(0, 1)
     ax.imshow(img, extent=[0, 1, 0, 1], origin='upper')
@@ -26,9 +24,7 @@ def player_headshot(pitcher_id: str, ax: plt.Axes):
 
 
 def player_bio(pitcher_id: str, ax: plt.Axes):
-    url = f"https://statsapi.mlb.com/api/v1/people?personIds={pitcher_id}&hydrate=currentTeam"
-    data = requests.get(url).json()
-    p = data['people'][0]
+    p = get_person(pitcher_id)
     ax.text(0.5, 1, f"{p['fullName']}", va='top', ha='center', fontsize=56)
     ax.text(0.5, 0.65, f"{p['pitchHand']['code']}HP, Age:{p['currentAge']}, {p['height']}/{p['weight']}", va='top', ha='center', fontsize=30)
     ax.text(0.5, 0.40, f'Season Pitching Summary', va='top', ha='center', fontsize=40)
@@ -37,12 +33,8 @@ def player_bio(pitcher_id: str, ax: plt.Axes):
 
 
 def plot_logo(pitcher_id: str, ax: plt.Axes):
-    data = requests.get(f"https://statsapi.mlb.com/api/v1/people?personIds={pitcher_id}&hydrate=currentTeam").json()
-    team_url = 'https://statsapi.mlb.com/' + data['people'][0]['currentTeam']['link']
-    team_data = requests.get(team_url).json()
-    team_abb = team_data['teams'][0]['abbreviation']
-    logo_url = image_dict.get(team_abb)
-    img = Image.open(BytesIO(requests.get(logo_url).content))
+    team_abb = get_team_abbreviation(pitcher_id)
+    img = get_team_logo(team_abb)
     ax.set_xlim(0, 1.3)
     ax.set_ylim(0, 1)
     ax.imshow(img, extent=[0.3, 1.3, 0, 1], origin='upper')
@@ -55,17 +47,41 @@ def velocity_kdes(df: pd.DataFrame,
                   gs_x: list,
                   gs_y: list,
                   fig: plt.Figure,
-                  df_statcast_group: pd.DataFrame):
+                  df_statcast_group: pd.DataFrame,
+                  league_curves: pd.DataFrame = None,
+                  kde_axes: list = None):
+    """
+    One velocity density per pitch type, all evaluated in a single binned KDE pass.
+
+    With `league_curves` (see league.load_league_velocity_curves) each pitch type's
+    league distribution is overlaid; otherwise the league mean is marked. `kde_axes` is a
+    pool of cleared axes to reuse (see dashboard.DashboardTemplate); axes it lacks are
+    added to it.
+    """
     sorted_value_counts = df['pitch_type'].value_counts().sort_values(ascending=False)
+    sorted_value_counts = sorted_value_counts[sorted_value_counts > 0]
     items_in_order = sorted_value_counts.index.tolist()
     ax.axis('off')
     ax.set_title('Pitch Velocity Distribution', fontdict={'size': 20})
 
     inner_grid_1 = gridspec.GridSpecFromSubplotSpec(len(items_in_order), 1, subplot_spec=gs[gs_x[0]:gs_x[-1], gs_y[0]:gs_y[-1]])
-    ax_top = []
+    ax_top = kde_axes if kde_axes is not None else []
 
-    for inner in inner_grid_1:
-        ax_top.append(fig.add_subplot(inner))
+    for ax_number, inner in enumerate(inner_grid_1):
+        if ax_number < len(ax_top):
+            ax_top[ax_number].set_subplotspec(inner)
+            ax_top[ax_number].set_visible(True)
+        else:
+            ax_top.append(fig.add_subplot(inner))
+
+    codes = pd.Categorical(df['pitch_type'], categories=items_in_order).codes
+    speeds = df['release_speed'].to_numpy(dtype='float64')
+    densities = kde_from_counts(bin_counts(speeds, codes, len(items_in_order)))
+    speed_stats = df.groupby('pitch_type', observed=True)['release_speed'].agg(['min', 'max', 'mean'])
+
+    x_min = math.floor(np.nanmin(speeds) / 5) * 5
+    x_max = math.ceil(np.nanmax(speeds) / 5) * 5
+    in_view = (velocity_grid >= x_min) & (velocity_grid <= x_max)
 
     for ax_number, i in enumerate(items_in_order):
 
@@ -73,23 +89,29 @@ def velocity_kdes(df: pd.DataFrame,
         ax_top[ax_number].yaxis.set_visible(False)
         ax_top[ax_number].set_yticklabels([])
 
-        pitch_df = df[df['pitch_type'] == i]
-        if np.unique(pitch_df['release_speed']).size == 1:
-            ax_top[ax_number].plot([pitch_df['release_speed'].iloc[0]]*2, [0, 1], linewidth=4,
+        speed_min, speed_max, mean_speed = speed_stats.loc[i, ['min', 'max', 'mean']]
+        if np.isnan(densities[ax_number]).all():
+            ax_top[ax_number].plot([speed_min]*2, [0, 1], linewidth=4,
                                    color=dict_color[i], zorder=20)
         else:
-            sns.kdeplot(pitch_df['release_speed'], ax=ax_top[ax_number], fill=True,
-                        clip=(pitch_df['release_speed'].min(), pitch_df['release_speed'].max()),
-                        color=dict_color[i])
+            # Like seaborn's clip, draw the density only over the observed range
+            support = (velocity_grid >= speed_min) & (velocity_grid <= speed_max)
+            ax_top[ax_number].fill_between(velocity_grid[support], densities[ax_number][support],
+                                           color=dict_color[i], alpha=0.25, linewidth=0)
+            ax_top[ax_number].plot(velocity_grid[support], densities[ax_number][support], color=dict_color[i])
 
-        mean_speed = pitch_df['release_speed'].mean()
         ax_top[ax_number].axvline(mean_speed, linestyle='--', color=dict_color[i])
 
-        group_speed = df_statcast_group[df_statcast_group['pitch_type'] == i]['release_speed'].mean()
-        ax_top[ax_number].axvline(group_speed, linestyle=':', color=dict_color[i])
+        if league_curves is not None and i in league_curves.index:
+            ax_top[ax_number].plot(velocity_grid[in_view], league_curves.loc[i].to_numpy()[in_view],
+                                   linestyle=':', linewidth=1.5, color=dict_color[i])
+        else:
+            group_speed = df_statcast_group[df_statcast_group['pitch_type'] == i]['release_speed'].mean()
+            ax_top[ax_number].axvline(group_speed, linestyle=':', color=dict_color[i])
 
-        ax_top[ax_number].set_xlim(math.floor(df['release_speed'].min() / 5) * 5, math.ceil(df['release_speed'].max() / 5) * 5)
-        ax_top[ax_number].set_xticks(range(math.floor(df['release_speed'].min() / 5) * 5, math.ceil(df['release_speed'].max() / 5) * 5, 5))
+        ax_top[ax_number].set_xlim(x_min, x_max)
+        ax_top[ax_number].set_xticks(range(x_min, x_max, 5))
+        ax_top[ax_number].set_ylim(bottom=0)
         ax_top[ax_number].set_yticks([])
         ax_top[ax_number].grid(axis='x', linestyle='--')
         ax_top[ax_number].text(-0.01, 0.5, i, transform=ax_top[ax_number].transAxes, fontsize=14, va='center', ha='right')
@@ -101,41 +123,27 @@ def velocity_kdes(df: pd.DataFrame,
             ax_top[ax_number].set_xlabel('Velocity (mph)')
 
 
-def rolling_pitch_usage(df: pd.DataFrame, ax: plt.Axes, window: int):
-    df_game_group = pd.DataFrame((df.groupby(['game_pk', 'game_date', 'pitch_type'])['release_speed'].count() /
-                                df.groupby(['game_pk', 'game_date'])['release_speed'].count()).reset_index())
+usage_titles = {
+    'games': "{window} Game Rolling Pitch Usage",
+    'pitches': "{window} Pitch Rolling Pitch Usage",
+    'days': "{window} Day Rolling Pitch Usage",
+    'ewm': "{window} Game Weighted Pitch Usage",
+}
 
-    all_games = pd.Series(df_game_group['game_pk'].unique())
-    all_pitch_types = pd.Series(df_game_group['pitch_type'].unique())
-    all_combinations = pd.MultiIndex.from_product([all_games, all_pitch_types], names=['game_pk', 'pitch_type']).to_frame(index=False)
-    df_complete = pd.merge(all_combinations, df_game_group, on=['game_pk', 'pitch_type'], how='left')
-    df_complete['release_speed'] = df_complete['release_speed'].fillna(0)
 
-    game_list = df.sort_values(by='game_date')['game_pk'].unique()
-    range_list = list(range(1, len(game_list) + 1))
-    game_to_range = dict(zip(game_list, range_list))
-    game_to_date = df.set_index('game_pk')['game_date'].to_dict()
-
-    df_complete['game_date'] = df_complete['game_pk'].map(game_to_date)
-    df_complete = df_complete.sort_values(by='game_date')
-    df_complete['game_number'] = df_complete['game_pk'].map(game_to_range)
-
-    sorted_value_counts = df['pitch_type'].value_counts().sort_values(ascending=False)
-    items_in_order = sorted_value_counts.index.tolist()
-    max_roll = []
+def rolling_pitch_usage(df: pd.DataFrame, ax: plt.Axes, window: int, usage: pd.DataFrame = None, mode: str = 'games'):
+    if usage is None:
+        usage = rolling_usage(df, window, mode)
 
-    for i in items_in_order:
-        pitch_data = df_complete[df_complete['pitch_type'] == i]
-        rolling_usage = pitch_data['release_speed'].rolling(window).sum() / window
-        sns.lineplot(x=pitch_data['game_number'], y=rolling_usage,
-                     color=dict_color[i], ax=ax, linewidth=3)
-        max_roll.append(rolling_usage.max())
+    lines = ax.plot(usage.index, usage.to_numpy(), linewidth=3)
+    for line, pitch_type in zip(lines, usage.columns):
+        line.set_color(dict_color[pitch_type])
 
-    ax.set_xlim(window, len(game_list))
-    ax.set_ylim(0, math.ceil(max(max_roll) * 10) / 10)
+    ax.set_xlim(usage.dropna(how='all').index.min(), len(usage))
+    ax.set_ylim(0, math.ceil(usage.max().max() * 10) / 10)
     ax.set_xlabel('Game', fontdict=font_properties_axes)
     ax.set_ylabel('Pitch Usage', fontdict=font_properties_axes)
-    ax.set_title(f"{window} Game Rolling Pitch Usage", fontdict=font_properties_titles)
+    ax.set_title(usage_titles[mode].format(window=window), fontdict=font_properties_titles)
     ax.xaxis.set_major_locator(MaxNLocator(integer=True))
     ax.yaxis.set_major_formatter(mtick.PercentFormatter(xmax=1, decimals=0))
 
@@ -178,18 +186,32 @@ def break_plot(df: pd.DataFrame, ax: plt.Axes):
                 bbox=dict(facecolor='white', edgecolor='black'), fontsize=10, zorder=3)
 
 
-def fangraphs_pitcher_stats(pitcher_id: int, ax: plt.Axes, stats : list, season: int, fontsize: int = 20):
-    from data_load import fangraphs_pitching_leaderboards
-    df = fangraphs_pitching_leaderboards(season)
-    df_pitcher = df[df['xMLBAMID'] == pitcher_id][stats].reset_index(drop=True)
+fangraphs_formats = {
+    'IP': '.1f', 'TBF': '.0f', 'WHIP': '.2f', 'ERA': '.2f', 'FIP': '.2f',
+    'K%': '.1%', 'BB%': '.1%', 'K-BB%': '.1%'
+}
 
-    format_map = {
-        'IP': '.1f', 'TBF': '.0f', 'WHIP': '.2f', 'ERA': '.2f', 'FIP': '.2f',
-        'K%': '.1%', 'BB%': '.1%', 'K-BB%': '.1%'
-    }
 
-    df_pitcher = df_pitcher.astype('object')  # allow mixing types
-    df_pitcher.loc[0] = [str(format(df_pitcher[x][0], format_map[x])) if df_pitcher[x][0] != '---' else '---' for x in df_pitcher]
+def format_fangraphs_stats(df: pd.DataFrame, pitcher_ids: list, stats: list):
+    """
+    Formats the `stats` columns of the leaderboard for every requested pitcher at once.
+
+    `df` must be indexed by xMLBAMID, as returned by fangraphs_pitching_leaderboards.
+    Pitchers or values missing from the leaderboard are shown as '---'.
+    """
+    df_stats = df.reindex(pitcher_ids)[stats]
+    df_formatted = pd.DataFrame(index=df_stats.index)
+    for stat in stats:
+        values = pd.to_numeric(df_stats[stat], errors='coerce')
+        df_formatted[stat] = values.map(('{:' + fangraphs_formats[stat] + '}').format, na_action='ignore').fillna('---')
+    return df_formatted
+
+
+def fangraphs_pitcher_stats(pitcher_id: int, ax: plt.Axes, stats : list, season: int, fontsize: int = 20, df: pd.DataFrame = None):
+    if df is None:
+        from data_load import fangraphs_pitching_leaderboards
+        df = fangraphs_pitching_leaderboards(season)
+    df_pitcher = format_fangraphs_stats(df, [pitcher_id], stats)
 
     table_fg = ax.table(cellText=df_pitcher.values, colLabels=stats, cellLoc='center',
                         bbox=[0.00, 0.0, 1, 1])
@@ -197,60 +219,6 @@ def fangraphs_pitcher_stats(pitcher_id: int, ax: plt.Axes, stats : list, season:
     ax.axis('off')
 
 
-def plot_pitch_format(df: pd.DataFrame):
-    df_group = df[table_columns].fillna('—')
-    for column, props in pitch_stats_dict.items():
-        if column in df_group.columns:
-            df_group[column] = df_group[column].apply(
-                lambda x: format(x, props['format']) if isinstance(x, (int, float)) else x)
-    return df_group
-
-
-def get_color(value, normalize, cmap):
-    color = cmap(normalize(value))
-    return mcolors.to_hex(color)
-
-
-def get_cell_colors(df_group: pd.DataFrame,
-                     df_statcast_group: pd.DataFrame,
-                     color_stats: list,
-                     cmap_sum: mcolors.Colormap,
-                     cmap_sum_r: mcolors.Colormap):
-    color_list_df = []
-    for pt in df_group.pitch_type.unique():
-        row = []
-        df_pitch = df_group[df_group['pitch_type'] == pt]
-        statcast_pitch = df_statcast_group[df_statcast_group['pitch_type'] == pt]
-
-        for col in table_columns:
-            val = df_pitch[col].values[0] if col in df_pitch.columns else None
-
-            if col not in statcast_pitch.columns:
-                row.append('#ffffff')
-                continue
-
-            ref = pd.to_numeric(statcast_pitch[col], errors='coerce')
-
-            if col in color_stats and isinstance(val, (int, float)):
-                if np.isnan(val):
-                    row.append('#ffffff')
-                elif col == 'release_speed':
-                    normalize = mcolors.Normalize(vmin=ref.mean() * 0.95, vmax=ref.mean() * 1.05)
-                    row.append(get_color(val, normalize, cmap_sum))
-                elif col == 'delta_run_exp_per_100':
-                    normalize = mcolors.Normalize(vmin=-1.5, vmax=1.5)
-                    row.append(get_color(val, normalize, cmap_sum))
-                elif col == 'xwoba':
-                    normalize = mcolors.Normalize(vmin=ref.mean() * 0.7, vmax=ref.mean() * 1.3)
-                    row.append(get_color(val, normalize, cmap_sum_r))
-                else:
-                    normalize = mcolors.Normalize(vmin=ref.mean() * 0.7, vmax=ref.mean() * 1.3)
-                    row.append(get_color(val, normalize, cmap_sum))
-            else:
-                row.append('#ffffff')
-        color_list_df.append(row)
-    return color_list_df
-
 def plot_fatigue_trend(fatigue_df: pd.DataFrame, ax: plt.Axes):
     if fatigue_df.empty:
         ax.text(0.5, 0.5, 'No Fatigue Data Available', ha='center', va='center')
@@ -285,10 +253,36 @@ def plot_fatigue_trend(fatigue_df: pd.DataFrame, ax: plt.Axes):
                    fontsize=10, color='red')
 
 
-def pitch_table(df: pd.DataFrame, ax: plt.Axes, df_statcast_group: pd.DataFrame, fontsize: int = 20):
-    df_group, color_list = df_grouping(df)
-    color_list_df = get_cell_colors(df_group, df_statcast_group, color_stats, cmap_sum, cmap_sum_r)
-    df_plot = plot_pitch_format(df_group)
+def plot_velocity_decay(fatigue_df: pd.DataFrame, ax: plt.Axes):
+    """
+    Within-game velocity decay (fitted mph change over 100 pitches) per game and pitch type.
+    """
+    decay = (fatigue_df.pivot_table(index='game_number', columns='pitch_type', values='velocity_decay', aggfunc='first',
+                                    observed=True).dropna(how='all')
+             if not fatigue_df.empty and 'velocity_decay' in fatigue_df else pd.DataFrame())
+    if decay.empty:
+        ax.text(0.5, 0.5, 'No Velocity Decay Data Available', ha='center', va='center')
+        ax.axis('off')
+        return
+
+    for pitch_type in decay.columns:
+        points = decay[pitch_type].dropna()
+        ax.plot(points.index, points.to_numpy(), marker='o', markersize=6, linewidth=1.5, alpha=0.8,
+                color=dict_color[pitch_type], label=pitch_type)
+    ax.axhline(0, color='black', linestyle='--', linewidth=1, alpha=0.6)
+
+    ax.set_title("Within-Game Velocity Decay", fontdict=font_properties_titles)
+    ax.set_xlabel("Game Number", fontdict=font_properties_axes)
+    ax.set_ylabel("mph per 100 Pitches", fontdict=font_properties_axes)
+    ax.xaxis.set_major_locator(MaxNLocator(integer=True))
+    ax.grid(axis='y', linestyle='--', alpha=0.7)
+
+
+def pitch_table(df: pd.DataFrame, ax: plt.Axes, df_statcast_group: pd.DataFrame, fontsize: int = 20, table_cells: tuple = None):
+    if table_cells is None:
+        df_group, color_list = df_grouping(df)
+        table_cells = pitch_table_cells(df_group, df_statcast_group)
+    df_plot, color_list_df = table_cells
 
     print("df_plot shape:", df_plot.shape)
     print("color_list_df shape:", (len(color_list_df), len(color_list_df[0]) if color_list_df else 0))
@@ -303,4 +297,20 @@ def pitch_table(df: pd.DataFrame, ax: plt.Axes, df_statcast_group: pd.DataFrame,
     for i in range(len(df_plot)):
         table_plot.get_celld()[(i + 1, 0)].get_text().set_fontweight('bold')
 
-    ax.axis('off')
\ No newline at end of file
+    ax.axis('off')
+
+
+def tto_table(df: pd.DataFrame, ax: plt.Axes, fontsize: int = 16, df_tto: pd.DataFrame = None):
+    """
+    Results and primary pitch velocity for each time through the order.
+    """
+    if df_tto is None:
+        df_tto = tto_grouping(df)
+    cell_text, headers = tto_table_cells(df_tto)
+
+    table_plot = ax.table(cellText=cell_text.values, colLabels=headers, cellLoc='center', bbox=[0, 0, 1, 1])
+    table_plot.auto_set_font_size(False)
+    table_plot.set_fontsize(fontsize)
+    for i in range(len(cell_text)):
+        table_plot.get_celld()[(i + 1, 0)].get_text().set_fontweight('bold')
+    ax.axis('off')